@@ -0,0 +1,194 @@
+"""
+Module with the App class, the application shell that hosts every window of
+the process.
+
+There is a single Tk interpreter whose root window stays hidden. The level
+choice display, the boards, and the top times displays are all Toplevel
+windows of that root, so another board only costs its own widgets. Timers
+and long updates are scheduled on the root's event loop and every game
+writes through the same database connection.
+"""
+
+import functools
+import logging
+from tkinter import Tk
+from board_pool import BoardPool
+from game import Game
+from heatmap import heat_colors, load_heatmaps, np
+from maintenance import run_maintenance
+from minesweeper_displays import HeatmapDisplay, LevelChoiceDisplay
+from scheduler import Scheduler
+from storage import DATABASE_PATH, Storage
+
+
+class App():
+    """Class that represents the running application"""
+    def __init__(self, database_path=DATABASE_PATH):
+        """Initializes an App object
+
+        Args:
+            database_path (str): Path of the database file. Defaults to
+                DATABASE_PATH
+        """
+        self.root = Tk()
+        self.root.withdraw()
+        self.storage = Storage(database_path)
+        self.scheduler = Scheduler(self.root)
+        self.scheduler.run_in_thread(
+            functools.partial(run_maintenance, database_path),
+            on_done=self._maintenance_done)
+        self.games = []
+        self._pools = {}
+        # Arguments each running game was started with, for restarts
+        self._game_args = {}
+        # Game that writes each level's save file. Save files are named by
+        # level, so a second board of the level isn't saved
+        self._save_owners = {}
+
+    def _maintenance_done(self, num_games):
+        """Logs the result of the background database maintenance
+
+        Args:
+            num_games (int): Number of games rolled up, or None if the
+                maintenance wasn't due
+        """
+        if num_games is not None:
+            logging.info(f'The database maintenance rolled up {num_games} '
+                         f'games')
+
+    def warm_up(self, levels):
+        """Starts generating mine layouts in the background for the passed
+        levels
+
+        Args:
+            levels (iterable): Levels to keep mine layouts ready for
+        """
+        for level in levels:
+            if level not in self._pools:
+                self._pools[level] = BoardPool(level)
+                self._pools[level].start()
+
+    def stop_pools(self, keep=None):
+        """Stops the background layout generation
+
+        Args:
+            keep (str): Level whose pool keeps running. Defaults to None
+        """
+        for level in list(self._pools):
+            if level != keep:
+                self._pools.pop(level).stop()
+
+    def take_layout(self, level):
+        """Takes a mine layout generated ahead of time for a level
+
+        Args:
+            level (str): The difficulty level of the game
+        Returns:
+            MineLayout: A layout, or None if there isn't one ready
+        """
+        pool = self._pools.get(level)
+        return pool.take() if pool is not None else None
+
+    def choose_level(self):
+        """Shows the level choice display and waits for it to close
+
+        Returns:
+            LevelChoiceDisplay: The closed display with the user's choices
+        """
+        level_choice = LevelChoiceDisplay(self.root)
+        self.root.wait_window(level_choice.root)
+        return level_choice
+
+    def start_game(self, level, race=None, **kwargs):
+        """Opens another board
+
+        Args:
+            level (str): The difficulty level of the game
+            race (RaceClient): Connected race client if the game is part of a
+                race. Defaults to None. A restarted race game is played solo
+            **kwargs: Other Game arguments
+        Returns:
+            Game: The started game
+        """
+        game = Game(level, app=self, **kwargs)
+        game.race = race
+        self.games.append(game)
+        self._game_args[game] = (level, kwargs)
+        game.start_game()
+        return game
+
+    def claim_save_file(self, game, level):
+        """Lets a game write the save file of its level, unless another open
+        board already does
+
+        Args:
+            game (Game): The game that wants to save
+            level (str): The difficulty level of the game
+        Returns:
+            bool: If the game may write the level's save file
+        """
+        owner = self._save_owners.setdefault(level, game)
+        if owner is not game:
+            logging.info(f'Another {level} board is being saved, this one '
+                         f'won\'t be')
+        return owner is game
+
+    def show_fastest_times(self, level):
+        """Shows the fastest times of a level and waits for the display to
+        close
+
+        Args:
+            level (str): The difficulty level of the leaderboard
+        """
+        Game(level, app=self).display_fastest_times()
+
+    def show_heatmaps(self, level):
+        """Shows the click heatmaps of a level and waits for the display to
+        close
+
+        Args:
+            level (str): The difficulty level of the heatmaps
+        """
+        if np is None:
+            logging.warning('The click heatmaps require NumPy')
+            return
+        heatmaps = load_heatmaps(self.storage.conn, level=level)
+        if heatmaps is None:
+            logging.info(f'There are no recorded games for level: {level}')
+            return
+        games, arrays = heatmaps
+        display = HeatmapDisplay(level, master=self.root, games=games,
+                                 colors={kind: heat_colors(heatmap)
+                                         for kind, heatmap in arrays.items()})
+        self.root.wait_window(display.root)
+
+    def game_closed(self, game):
+        """Removes a closed game, starting its replacement if it was
+        restarted, and stops the event loop once no boards are left
+
+        Args:
+            game (Game): The game whose board was closed
+        """
+        self.games.remove(game)
+        level, kwargs = self._game_args.pop(game)
+        if self._save_owners.get(level) is game:
+            del self._save_owners[level]
+        if game.restart_game_flag:
+            self.start_game(level, **dict(kwargs, resume=False))
+        elif not game.game_run_time:
+            logging.info('The board was closed before the game finished')
+        if not self.games:
+            self.root.quit()
+
+    def run(self):
+        """Runs the event loop until every board has been closed"""
+        if self.games:
+            self.root.mainloop()
+
+    def close(self):
+        """Stops the background work, closes the database, and destroys the
+        Tk interpreter"""
+        self.stop_pools()
+        self.scheduler.cancel_all()
+        self.storage.close()
+        self.root.destroy()
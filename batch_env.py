@@ -0,0 +1,278 @@
+"""
+Module with the BatchEnv class, a Gym-style environment that plays many
+independent boards at once for reinforcement-learning agents.
+
+The state of every board lives in stacked NumPy arrays of shape
+(num_envs, rows, columns), so mine placement, neighbor counts, reveals, flood
+fills, and observations are computed for the whole batch with array
+operations instead of one Board and Tile object at a time.
+
+An action is the index of the tile to reveal, row * columns + column, which
+is the tile's position in the flattened observation. Observations hold the
+number of adjacent mines of each uncovered tile and HIDDEN for the others.
+The mines of a board are placed on its first reveal so that the first tile
+and its neighbors never have a mine, like in the game. Flags aren't needed
+by the agents and aren't modelled.
+
+Every slot has its own random generator seeded with (seed, slot), so the
+boards a slot plays only depend on the seed and that slot's own actions.
+Boards whose episode ended are reset automatically at the end of the step.
+
+NumPy is an optional dependency of the game and is only needed here.
+"""
+
+from minesweeper_details import LEVEL_INFO
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Observation value of a tile that hasn't been uncovered
+HIDDEN = -1
+# Reward for revealing a mine. Revealing safe tiles is rewarded with the
+# fraction of the board's safe tiles that were uncovered, so clearing a
+# board adds up to 1
+REWARD_LOSS = -1.0
+
+
+def _dilate(mask):
+    """Grows every set tile of a stack of boolean masks onto its neighbors
+
+    Args:
+        mask (ndarray): Boolean array of shape (boards, rows, columns)
+    Returns:
+        ndarray: The mask with the neighbors of every set tile set
+    """
+    grown = mask.copy()
+    grown[:, 1:, :] |= mask[:, :-1, :]
+    grown[:, :-1, :] |= mask[:, 1:, :]
+    rows_grown = grown.copy()
+    grown[:, :, 1:] |= rows_grown[:, :, :-1]
+    grown[:, :, :-1] |= rows_grown[:, :, 1:]
+    return grown
+
+
+def _count_neighbors(mines):
+    """Counts the adjacent mines of every tile of a stack of boards
+
+    Args:
+        mines (ndarray): Boolean array of shape (boards, rows, columns)
+    Returns:
+        ndarray: Number of adjacent mines of every tile, as int8
+    """
+    mines = mines.astype(np.int8)
+    counts = mines.copy()
+    counts[:, 1:, :] += mines[:, :-1, :]
+    counts[:, :-1, :] += mines[:, 1:, :]
+    row_sums = counts.copy()
+    counts[:, :, 1:] += row_sums[:, :, :-1]
+    counts[:, :, :-1] += row_sums[:, :, 1:]
+    return counts - mines
+
+
+class BatchEnv():
+    """Class that steps a batch of independent minesweeper boards"""
+    def __init__(self, *, num_envs, level='easy', seed=None, max_steps=None):
+        """Initializes a BatchEnv object
+
+        Args:
+            num_envs (int): Number of boards played at once
+            level (str or dict): The difficulty level of the boards, or a
+                dict with the rows, columns, and mines of a custom board.
+                Defaults to 'easy'
+            seed (int): Seed of the slots' random generators. Defaults to
+                None in which case fresh entropy is used
+            max_steps (int): Number of steps after which an episode is
+                truncated. Defaults to None in which case episodes only end
+                when the board is won or lost
+        Raises:
+            ImportError: If NumPy isn't installed
+            ValueError: If the mines don't fit outside the first tile's
+                neighborhood
+        """
+        if np is None:
+            raise ImportError('The batch environment requires NumPy')
+        level_info = LEVEL_INFO[level] if isinstance(level, str) else level
+        self.num_envs = num_envs
+        self.rows = level_info['rows']
+        self.columns = level_info['columns']
+        self.mines = level_info['mines']
+        self.max_steps = max_steps
+        self.num_tiles = self.rows * self.columns
+        if self.mines > self.num_tiles - 9:
+            raise ValueError('Too many mines to keep the first tile safe')
+        self.num_safe_tiles = self.num_tiles - self.mines
+        shape = (num_envs, self.rows, self.columns)
+        self._mines = np.zeros(shape, dtype=bool)
+        self._counts = np.zeros(shape, dtype=np.int8)
+        # Tiles without a mine or adjacent mines, which flood fills spread
+        # from
+        self._openings = np.zeros(shape, dtype=bool)
+        self._uncovered = np.zeros(shape, dtype=bool)
+        # If the mines of a slot's current board have been placed
+        self._placed = np.zeros(num_envs, dtype=bool)
+        self._num_steps = np.zeros(num_envs, dtype=np.int64)
+        self._slots = np.arange(num_envs)
+        self._rngs = []
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        """Reseeds the random generator of every slot
+
+        Args:
+            seed (int): Seed of the slots' random generators. Defaults to
+                None in which case fresh entropy is used
+        """
+        if seed is None:
+            seed = np.random.SeedSequence().entropy
+        self._rngs = [np.random.default_rng([seed, slot])
+                      for slot in range(self.num_envs)]
+
+    def reset(self, seed=None):
+        """Starts a new board in every slot
+
+        Args:
+            seed (int): Seed to reseed the slots with. Defaults to None in
+                which case the generators carry on
+        Returns:
+            tuple: The observations and an empty info dict
+        """
+        if seed is not None:
+            self.seed(seed)
+        self._reset_slots(np.ones(self.num_envs, dtype=bool))
+        return self._observe(), {}
+
+    def _reset_slots(self, done):
+        """Clears the boards of the passed slots. Their mines are placed on
+        their next reveal
+
+        Args:
+            done (ndarray): Boolean array of the slots to reset
+        """
+        self._uncovered[done] = False
+        self._placed[done] = False
+        self._num_steps[done] = 0
+
+    def _place_mines(self, slots, rows, columns):
+        """Places the mines of the passed slots' boards, keeping the tile
+        being revealed and its neighbors free of mines
+
+        Args:
+            slots (ndarray): Slots whose board was just started
+            rows (ndarray): Row of the first tile of each of those slots
+            columns (ndarray): Column of the first tile of each of those slots
+        """
+        num_boards = len(slots)
+        mines = np.zeros((num_boards, self.num_tiles), dtype=bool)
+        if self.mines:
+            # Every tile gets a random key and the mines go on the tiles with
+            # the smallest keys, after pushing the safe zone past the others
+            keys = np.stack([self._rngs[slot].random(self.num_tiles)
+                             for slot in slots])
+            safe_zone = np.zeros((num_boards, self.rows, self.columns),
+                                 dtype=bool)
+            safe_zone[np.arange(num_boards), rows, columns] = True
+            keys[_dilate(safe_zone).reshape(num_boards, -1)] = 2.0
+            mine_indices = np.argpartition(keys, self.mines - 1,
+                                           axis=1)[:, :self.mines]
+            np.put_along_axis(mines, mine_indices, True, axis=1)
+        mines = mines.reshape((num_boards, self.rows, self.columns))
+        counts = _count_neighbors(mines)
+        self._mines[slots] = mines
+        self._counts[slots] = counts
+        self._openings[slots] = (counts == 0) & ~mines
+        self._placed[slots] = True
+
+    def _flood_fill(self, slots):
+        """Uncovers everything the openings uncovered in the passed slots
+        reach
+
+        Args:
+            slots (ndarray): Slots where a tile without adjacent mines was
+                revealed
+        """
+        # Only the boards whose flood is still spreading are grown again
+        while slots.size:
+            uncovered = self._uncovered[slots]
+            grown = (_dilate(uncovered & self._openings[slots]) &
+                     ~self._mines[slots]) | uncovered
+            growing = (grown != uncovered).any(axis=(1, 2))
+            self._uncovered[slots] = grown
+            slots = slots[growing]
+
+    def _observe(self):
+        """Returns the observations of every slot
+
+        Returns:
+            ndarray: int8 array of shape (num_envs, rows, columns) with the
+                adjacent mine count of the uncovered tiles and HIDDEN for the
+                others
+        """
+        return np.where(self._uncovered, self._counts,
+                        np.int8(HIDDEN)).astype(np.int8)
+
+    def _reveal(self, actions):
+        """Reveals one tile on every board, placing the mines of the boards
+        that were just started and flood filling from revealed openings
+
+        Args:
+            actions (ndarray): Index of the tile to reveal on each board
+        Returns:
+            ndarray: Boolean array of the slots where a mine was revealed
+        """
+        rows, columns = np.divmod(actions, self.columns)
+        slots = self._slots
+        starting = ~self._placed
+        if starting.any():
+            self._place_mines(slots[starting], rows[starting],
+                              columns[starting])
+        revealed = ~self._uncovered[slots, rows, columns]
+        lost = revealed & self._mines[slots, rows, columns]
+        revealed &= ~lost
+        self._uncovered[slots[revealed], rows[revealed],
+                        columns[revealed]] = True
+        flooding = revealed & self._openings[slots, rows, columns]
+        if flooding.any():
+            self._flood_fill(slots[flooding])
+        return lost
+
+    def step(self, actions):
+        """Reveals one tile on every board
+
+        Args:
+            actions (array_like): Index of the tile to reveal on each board,
+                row * columns + column
+        Returns:
+            tuple: The observations, rewards, terminated flags, truncated
+                flags, and an info dict. The observations of the slots whose
+                episode ended are those of their next board, and the info
+                dict holds their last observations as 'final_observation'
+                and which slots were won as 'won'
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        if actions.shape != (self.num_envs,):
+            raise ValueError(f'Expected {self.num_envs} actions')
+        if actions.min() < 0 or actions.max() >= self.num_tiles:
+            raise ValueError('An action is outside of the board')
+        num_uncovered = self._uncovered.sum(axis=(1, 2))
+        lost = self._reveal(actions)
+        newly_uncovered = self._uncovered.sum(axis=(1, 2)) - num_uncovered
+        rewards = newly_uncovered / self.num_safe_tiles
+        rewards[lost] = REWARD_LOSS
+        won = num_uncovered + newly_uncovered == self.num_safe_tiles
+        terminated = won | lost
+        self._num_steps += 1
+        if self.max_steps is None:
+            truncated = np.zeros(self.num_envs, dtype=bool)
+        else:
+            truncated = ~terminated & (self._num_steps >= self.max_steps)
+
+        observations = self._observe()
+        infos = {'won': won}
+        done = terminated | truncated
+        if done.any():
+            infos['final_observation'] = observations.copy()
+            self._reset_slots(done)
+            observations[done] = HIDDEN
+        return observations, rewards, terminated, truncated, infos
@@ -0,0 +1,791 @@
+"""
+Benchmark suite for the minesweeper hot paths.
+
+Run the suite and append the results to the history file:
+
+    python benchmark.py run --label "before change"
+
+Compare the last two runs, exiting with an error if anything got slower than
+the threshold:
+
+    python benchmark.py compare --threshold 10
+
+Measure the overhead of the hot-path logging and tracing checks of the game
+while debug logging and tracing are off, and with tracing on:
+
+    python benchmark.py logging
+
+Measure the memory used per tile:
+
+    python benchmark.py memory
+
+Measure the steps per second of the batch environment with random agents:
+
+    python benchmark.py batch --num-envs 1024
+
+Measure leaderboard updates from many game processes sharing one database,
+and check that the leaderboard still holds the fastest times:
+
+    python benchmark.py leaderboard --processes 8
+
+Measure the hint latency of the solver on a mid-game position of a large
+board with a growing number of worker processes:
+
+    python benchmark.py solver --size 500 --processes 0 1 2 4 8
+"""
+
+import argparse
+import gc
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from batch_env import HIDDEN, BatchEnv, np
+from bitboard import BitBoard
+from board import Board
+from board_pool import generate_layout
+from delta import HIDDEN as HIDDEN_CODE
+from engine import GameEngine
+from game import Game
+from minesweeper_displays import BoardDisplay
+from neighbors import neighbor_table
+from solver import Solver, frontier_components
+from storage import (NUM_FASTEST_TIMES, Storage, complete_fastest_time,
+                     reserve_fastest_time, top_times)
+from tile import Tile
+from tracing import TRACER
+
+HISTORY_PATH = 'benchmark_history.json'
+# Side lengths of the square boards and the fraction of tiles with a mine
+SIZES = (9, 30, 100, 500, 1000, 2000)
+DENSITIES = (0.05, 0.15, 0.30)
+# Boards with more tiles than this are only timed once per case
+LARGE_BOARD_TILES = 250000
+# Cases faster than this are too noisy to be flagged as regressions
+MIN_COMPARED_SECONDS = 0.0001
+SEED = 2024
+
+
+def custom_level(size, density):
+    """Returns the level info of a square custom board
+
+    Args:
+        size (int): Number of columns and rows
+        density (float): Fraction of the tiles with a mine
+    Returns:
+        dict: Rows, columns, and mines of the board
+    """
+    # Leave room for the mine free tiles around the first tile
+    mines = min(int(size * size * density), size * size - 9)
+    return {'rows': size, 'columns': size, 'mines': mines}
+
+
+def time_case(function, setup, repeat):
+    """Times a function, running the untimed setup before each call
+
+    Args:
+        function: Function called with the setup's return value
+        setup: Function that prepares the function's argument
+        repeat (int): Number of timed calls
+    Returns:
+        dict: Minimum and median run time in seconds
+    """
+    run_times = []
+    for _ in range(repeat):
+        argument = setup()
+        start_time = time.perf_counter()
+        function(argument)
+        run_times.append(time.perf_counter() - start_time)
+    return {'min': min(run_times), 'median': statistics.median(run_times)}
+
+
+def seeded_board(level):
+    """Returns a board whose mines were set around its center tile
+
+    Args:
+        level (dict): Custom level info
+    Returns:
+        Board: Board with its mines set
+    """
+    board = Board(level, SEED)
+    board.set_the_mines(center_tile(board))
+    return board
+
+
+def center_tile(board):
+    """Returns the tile in the middle of a board
+
+    Args:
+        board (Board): Board to get the tile from
+    Returns:
+        Tile: The center tile
+    """
+    return board.tiles[f'{board.columns // 2},{board.rows // 2}']
+
+
+def started_game(level):
+    """Returns a game whose first tile, the center tile, has been revealed
+
+    Args:
+        level (dict): Custom level info
+    Returns:
+        GameEngine: The started game
+    """
+    game = GameEngine(level, SEED)
+    game.reveal(column=game.board.columns // 2, row=game.board.rows // 2)
+    return game
+
+
+def chord_setup(level):
+    """Returns a started game and the position of a numbered tile whose
+    adjacent mines have all been flagged, ready to be chorded
+
+    Args:
+        level (dict): Custom level info
+    Returns:
+        tuple: The game and the (column, row) of the tile to chord
+    """
+    game = started_game(level)
+    for tile in game.board.tiles.values():
+        if tile.is_hidden or tile.num_adjacent_mines is None:
+            continue
+        neighbors = game.neighbors(tile)
+        if not any(neighbor.is_hidden and not neighbor.is_mine
+                   for neighbor in neighbors):
+            continue
+        for neighbor in neighbors:
+            if neighbor.is_mine:
+                game.toggle_flag(column=neighbor.column, row=neighbor.row)
+        return game, (tile.column, tile.row)
+    return game, (0, 0)
+
+
+def cleared_board(level):
+    """Returns a board with every tile without a mine uncovered, which is the
+    worst case for the bitboard win check
+
+    Args:
+        level (dict): Custom level info
+    Returns:
+        Board: The cleared board
+    """
+    board = seeded_board(level)
+    for tile in board.tiles.values():
+        if not tile.is_mine:
+            tile.is_hidden = False
+    return board
+
+
+def single_reveal_setup(level):
+    """Returns a started game and a hidden tile without a mine
+
+    Args:
+        level (dict): Custom level info
+    Returns:
+        tuple: The game and the (column, row) of the tile to reveal
+    """
+    game = started_game(level)
+    for tile in game.board.tiles.values():
+        if (tile.is_hidden and not tile.is_mine and
+                tile.num_adjacent_mines is not None):
+            return game, (tile.column, tile.row)
+    return game, (0, 0)
+
+
+def bitboard_setup(level):
+    """Returns an empty bitboard and the mine positions of a seeded board
+
+    Args:
+        level (dict): Custom level info
+    Returns:
+        tuple: The bitboard and a list of (column, row) mine positions
+    """
+    board = seeded_board(level)
+    mines = [(tile.column, tile.row) for tile in board.tiles.values()
+             if tile.is_mine]
+    return BitBoard(columns=board.columns, rows=board.rows), mines
+
+
+def pooled_setup(level):
+    """Returns a new board and a mine layout generated ahead of time, as
+    taken from a board pool
+
+    Args:
+        level (dict): Custom level info
+    Returns:
+        tuple: The board and the layout
+    """
+    board = Board(level, SEED)
+    return board, generate_layout(columns=board.columns, rows=board.rows,
+                                  mines=board.mines, seed=SEED)
+
+
+def benchmark_cases(level):
+    """Returns the benchmark cases for a board size and mine density
+
+    Args:
+        level (dict): Custom level info
+    Returns:
+        dict: (function, setup) tuples keyed by case name
+    """
+    empty_level = dict(level, mines=0)
+    return {
+        'board_construction': (lambda level: Board(level, SEED),
+                               lambda: level),
+        'set_the_mines': (lambda board: board.set_the_mines(
+            center_tile(board)), lambda: Board(level, SEED)),
+        'pooled_first_click': (lambda setup: setup[0].set_the_mines(
+            center_tile(setup[0]), layout=setup[1]),
+                               lambda: pooled_setup(level)),
+        'adjacency_counting': (lambda board: board.set_adjacent_mine_counts(),
+                               lambda: seeded_board(level)),
+        'single_reveal': (lambda setup: setup[0].reveal(
+            column=setup[1][0], row=setup[1][1]),
+                          lambda: single_reveal_setup(level)),
+        # A board without mines is cleared by a single flood fill
+        'worst_case_flood_fill': (lambda game: game.reveal(column=0, row=0),
+                                  lambda: GameEngine(empty_level, SEED)),
+        'chord': (lambda setup: setup[0].chord(column=setup[1][0],
+                                               row=setup[1][1]),
+                  lambda: chord_setup(level)),
+        'three_bv': (lambda board: board.count_three_bv(),
+                     lambda: seeded_board(level)),
+        'bitboard_adjacency_counting': (
+            lambda setup: setup[0].set_mines(setup[1]),
+            lambda: bitboard_setup(level)),
+        'bitboard_worst_case_flood_fill': (
+            lambda bitboard: bitboard.reveal(column=0, row=0),
+            lambda: BitBoard(columns=level['columns'], rows=level['rows'])),
+        'bitboard_win_check': (
+            lambda bitboard: bitboard.check_if_all_tiles_cleared(),
+            lambda: BitBoard.from_board(cleared_board(level))),
+    }
+
+
+def run_suite(*, sizes, densities, repeat):
+    """Runs every benchmark case for each board size and mine density
+
+    Args:
+        sizes (list): Side lengths of the boards
+        densities (list): Fractions of the tiles with a mine
+        repeat (int): Number of timed calls for each case
+    Returns:
+        dict: Timing results keyed by case/size/density
+    """
+    results = {}
+    for size in sizes:
+        case_repeat = 1 if size * size > LARGE_BOARD_TILES else repeat
+        for density in densities:
+            level = custom_level(size, density)
+            for name, (function, setup) in benchmark_cases(level).items():
+                key = f'{name}/{size}x{size}/{density:.2f}'
+                results[key] = time_case(function, setup, case_repeat)
+                logging.info(f'{key}: {results[key]["min"] * 1000:.3f} ms')
+    return results
+
+
+class _InertWidget():
+    """Class that stands in for the Tk widget of a tile"""
+    def configure(self, **options):
+        """Ignores the widget options
+
+        Args:
+            **options: Tk widget options
+        """
+
+    def destroy(self):
+        """Ignores the widget being destroyed"""
+
+
+class HeadlessDisplay(BoardDisplay):
+    """Class for a board display without a window, whose tile widgets do
+    nothing, so the game's display path can be timed without Tk"""
+    def __init__(self):  # pylint: disable=super-init-not-called
+        """Initializes a HeadlessDisplay object with no tile widgets"""
+        self.tile_buttons = {}
+
+    def create_tile_button(self, tile):
+        """Creates the inert widget of a tile
+
+        Args:
+            tile (Tile): Tile to create the widget for
+        Returns:
+            _InertWidget: The tile's widget
+        """
+        self.tile_buttons[tile] = _InertWidget()
+        return self.tile_buttons[tile]
+
+    def _create_tile_label(self, tile):
+        """Creates the inert widget of a disabled tile
+
+        Args:
+            tile (Tile): Tile to create the widget for
+        Returns:
+            _InertWidget: The tile's widget
+        """
+        return self.create_tile_button(tile)
+
+
+def headless_game(level):
+    """Returns a game on a headless display whose mines haven't been set
+
+    Args:
+        level (dict): Custom level info
+    Returns:
+        Game: The game
+    """
+    # pylint: disable=protected-access
+    game = Game(level, seed=SEED)
+    game._board = Board(level, SEED)
+    game._is_first_tile = False
+    game.board_display = HeadlessDisplay()
+    for tile in game._board.tile_list:
+        game.board_display.create_tile_button(tile)
+    return game
+
+
+def clear_and_render(game):
+    """Sets the mines of a game's board, reveals every tile without a mine
+    in one move, and shows the revealed tiles the way the game does, which
+    runs every per-tile hot path that used to log
+
+    Args:
+        game (Game): Game returned by headless_game
+    """
+    # pylint: disable=protected-access
+    board = game._board
+    board.set_the_mines(center_tile(board))
+    changes = board.reveal_tiles([tile for tile in board.tile_list
+                                  if not tile.is_mine])
+    for tile in changes.revealed:
+        game._render_revealed_tile(tile)
+
+
+def measure_logging_overhead(*, size, density, repeat):
+    """Times clearing and showing a board through the game in three
+    configurations: debug logging and tracing off (normal play), all logging
+    disabled so that no logging call does any work, and tracing enabled. The
+    configurations take turns so that a drift in the machine's speed affects
+    them alike
+
+    Args:
+        size (int): Side length of the board
+        density (float): Fraction of the tiles with a mine
+        repeat (int): Number of timed calls for each configuration
+    Returns:
+        dict: Minimum run time of each configuration in seconds and the
+            overhead of normal play and of tracing over disabled logging in
+            percent
+    """
+    level = custom_level(size, density)
+    # If tracing is enabled and the level logging is disabled at in each
+    # configuration. Normal play is compared against logging disabled for
+    # the cost of the debug checks, and tracing against it for the cost of
+    # the trace events
+    configurations = {'debug_off': (False, logging.NOTSET),
+                      'logging_disabled': (False, logging.CRITICAL),
+                      'tracing_on': (True, logging.NOTSET)}
+    run_times = {name: [] for name in configurations}
+    was_enabled = TRACER.enabled
+    try:
+        for _ in range(repeat):
+            for name, (tracing, disabled_level) in configurations.items():
+                game = headless_game(level)
+                TRACER.enabled = tracing
+                logging.disable(disabled_level)
+                # Like timeit, the garbage of the earlier runs isn't
+                # collected during the timed run
+                gc.collect()
+                gc.disable()
+                start_time = time.perf_counter()
+                clear_and_render(game)
+                run_times[name].append(time.perf_counter() - start_time)
+                gc.enable()
+                logging.disable(logging.NOTSET)
+                TRACER.clear()
+    finally:
+        gc.enable()
+        logging.disable(logging.NOTSET)
+        TRACER.enabled = was_enabled
+        TRACER.clear()
+    results = {name: min(times) for name, times in run_times.items()}
+    disabled = results['logging_disabled']
+    results['overhead_percent'] = (results['debug_off'] / disabled - 1) * 100
+    results['tracing_overhead_percent'] = (results['tracing_on'] /
+                                           disabled - 1) * 100
+    return results
+
+
+def measure_tile_memory(size):
+    """Measures the memory allocated per tile with tracemalloc, both for
+    the tile objects alone and for a whole board with its lookup structures
+
+    Args:
+        size (int): Side length of the board
+    Returns:
+        dict: Bytes allocated per tile
+    """
+    num_tiles = size * size
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        tiles = [Tile(column=column, row=row)
+                 for column in range(size) for row in range(size)]
+        tile_bytes = (tracemalloc.get_traced_memory()[0] - start -
+                      sys.getsizeof(tiles))
+        del tiles
+        start = tracemalloc.get_traced_memory()[0]
+        board = Board(custom_level(size, 0))
+        board_bytes = tracemalloc.get_traced_memory()[0] - start
+        del board
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    return {'tile_bytes': tile_bytes / num_tiles,
+            'board_bytes': board_bytes / num_tiles}
+
+
+def measure_batch_steps(*, num_envs, level, steps):
+    """Measures the steps per second of the batch environment, with agents
+    that reveal a random hidden tile on every step
+
+    Args:
+        num_envs (int): Number of boards played at once
+        level (str or dict): The difficulty level of the boards
+        steps (int): Number of batch steps to time
+    Returns:
+        dict: Board steps per second and the number of finished episodes
+    """
+    if np is None:
+        raise ImportError('The batch benchmark requires NumPy')
+    env = BatchEnv(num_envs=num_envs, level=level, seed=SEED)
+    observations, _ = env.reset()
+    rng = np.random.default_rng(SEED)
+    num_episodes = 0
+    start = time.perf_counter()
+    for _ in range(steps):
+        keys = rng.random(observations.shape) * (observations == HIDDEN)
+        actions = keys.reshape(num_envs, -1).argmax(axis=1)
+        observations, _, terminated, truncated, _ = env.step(actions)
+        num_episodes += int((terminated | truncated).sum())
+    seconds = time.perf_counter() - start
+    return {'steps_per_second': steps * num_envs / seconds,
+            'episodes': num_episodes}
+
+
+def midgame_state(*, size, density, cleared):
+    """Builds a mid-game position by revealing random openings of a square
+    board until enough of its safe tiles are uncovered
+
+    Args:
+        size (int): Side length of the board
+        density (float): Fraction of the tiles with a mine
+        cleared (float): Fraction of the safe tiles to uncover
+    Returns:
+        tuple: The position, see solver.board_state, and the number of mines
+    """
+    num_tiles = size * size
+    mines = int(num_tiles * density)
+    layout = generate_layout(columns=size, rows=size, mines=mines, seed=SEED)
+    neighbors = neighbor_table(size, size).neighbors
+    state = bytearray([HIDDEN_CODE]) * num_tiles
+    openings = [index for index in range(num_tiles)
+                if not layout.counts[index] and index not in layout.mines]
+    rng = random.Random(SEED)
+    num_uncovered = 0
+    while num_uncovered < cleared * (num_tiles - mines):
+        stack = [rng.choice(openings)]
+        while stack:
+            index = stack.pop()
+            if state[index] != HIDDEN_CODE:
+                continue
+            state[index] = layout.counts[index]
+            num_uncovered += 1
+            if not layout.counts[index]:
+                stack.extend(neighbor for neighbor in neighbors(index)
+                             if state[neighbor] == HIDDEN_CODE)
+    return state, mines
+
+
+def measure_solver_latency(*, size, density, processes):
+    """Measures the hint latency of the solver on a mid-game position with
+    different numbers of worker processes, and checks that they all find
+    the same solution
+
+    Args:
+        size (int): Side length of the board
+        density (float): Fraction of the tiles with a mine
+        processes (list): Numbers of worker processes to measure
+    Returns:
+        dict: Hint seconds for each number of processes, the number of
+            frontier components, and 1 if the solutions match, otherwise 0
+    """
+    state, mines = midgame_state(size=size, density=density, cleared=0.4)
+    results = {'components': len(frontier_components(
+        state, neighbor_table(size, size)))}
+    solutions = []
+    for num_processes in processes:
+        with Solver(columns=size, rows=size, mines=mines,
+                    processes=num_processes) as solver:
+            # The first solve also starts the workers
+            solver.hint(state)
+            start = time.perf_counter()
+            solutions.append(solver.solve(state).probabilities)
+            results[f'seconds_{num_processes}_processes'] = (
+                time.perf_counter() - start)
+    results['consistent'] = int(all(solution == solutions[0]
+                                    for solution in solutions))
+    return results
+
+
+def _leaderboard_writer(args):
+    """Adds times to a leaderboard the way won games do, from a separate
+    process
+
+    Args:
+        args (tuple): Database path, level, and the times to add
+    Returns:
+        list: Seconds each update took
+    """
+    path, level, times = args
+    conn = sqlite3.connect(path, timeout=60)
+    durations = []
+    for game_run_time in times:
+        start = time.perf_counter()
+        reservation = reserve_fastest_time(conn, level=level,
+                                           game_run_time=game_run_time)
+        if reservation is not None:
+            complete_fastest_time(conn, entry_id=reservation[0],
+                                  username=f'player-{os.getpid()}')
+        durations.append(time.perf_counter() - start)
+    conn.close()
+    return durations
+
+
+def measure_leaderboard_contention(*, processes, games):
+    """Measures leaderboard updates made by concurrent game processes and
+    checks that the leaderboard ends up with the fastest of all the times
+
+    Args:
+        processes (int): Number of writer processes
+        games (int): Number of won games each process adds
+    Returns:
+        dict: Updates per second, update latencies, and 1 if the leaderboard
+            is consistent, otherwise 0
+    """
+    temp_dir = tempfile.mkdtemp()
+    path = os.path.join(temp_dir, 'minesweeper.db')
+    try:
+        Storage(path).close()
+        rng = random.Random(SEED)
+        times = [[rng.randint(1, 999) for _ in range(games)]
+                 for _ in range(processes)]
+        start = time.perf_counter()
+        with multiprocessing.Pool(processes) as pool:
+            durations = pool.map(_leaderboard_writer,
+                                 [(path, 'medium', process_times)
+                                  for process_times in times])
+        seconds = time.perf_counter() - start
+        conn = sqlite3.connect(path)
+        leaderboard = [entry[0] for entry in top_times(conn, level='medium')]
+        num_rows = conn.execute('SELECT COUNT(*) FROM fastest_times'
+                                ).fetchone()[0]
+        conn.close()
+    finally:
+        shutil.rmtree(temp_dir)
+    fastest = sorted(game_run_time for process_times in times
+                     for game_run_time in process_times)
+    durations = sorted(duration for process_durations in durations
+                       for duration in process_durations)
+    consistent = (leaderboard == fastest[:NUM_FASTEST_TIMES] and
+                  num_rows == NUM_FASTEST_TIMES)
+    return {'updates_per_second': len(durations) / seconds,
+            'median_ms': statistics.median(durations) * 1000,
+            'p99_ms': durations[int(len(durations) * 0.99)] * 1000,
+            'max_ms': durations[-1] * 1000,
+            'consistent': int(consistent)}
+
+
+def load_history(path):
+    """Loads the benchmark history file
+
+    Args:
+        path (str): Path of the history file
+    Returns:
+        list: Previous runs, oldest first
+    """
+    try:
+        with open(path, encoding='utf-8') as history_file:
+            return json.load(history_file)
+    except FileNotFoundError:
+        return []
+
+
+def save_run(path, results, label=None):
+    """Appends a run to the benchmark history file
+
+    Args:
+        path (str): Path of the history file
+        results (dict): Timing results of the run
+        label (str): Description of the run. Defaults to None
+    """
+    history = load_history(path)
+    history.append({'timestamp': datetime.now(timezone.utc).isoformat(),
+                    'label': label,
+                    'python': platform.python_version(),
+                    'results': results})
+    with open(path, 'w', encoding='utf-8') as history_file:
+        json.dump(history, history_file, indent=1)
+
+
+def find_regressions(baseline, current, threshold):
+    """Finds the cases that got slower than the threshold between two runs.
+    The minimum run times are compared since they are the least noisy, and
+    cases faster than MIN_COMPARED_SECONDS are skipped
+
+    Args:
+        baseline (dict): Timing results of the earlier run
+        current (dict): Timing results of the later run
+        threshold (float): Allowed slowdown in percent
+    Returns:
+        list: (case, baseline seconds, current seconds, percent change)
+            tuples for every regression
+    """
+    regressions = []
+    for key, timing in current.items():
+        if (key not in baseline or baseline[key]['min'] <= 0 or
+                max(baseline[key]['min'], timing['min']) <
+                MIN_COMPARED_SECONDS):
+            continue
+        change = (timing['min'] / baseline[key]['min'] - 1) * 100
+        if change > threshold:
+            regressions.append((key, baseline[key]['min'], timing['min'],
+                                change))
+    return regressions
+
+
+def compare(args):
+    """Compares two runs from the history file and prints every case
+
+    Args:
+        args: Parsed command line arguments
+    Returns:
+        int: Exit status, 1 if there were any regressions
+    """
+    history = load_history(args.history)
+    if len(history) < 2:
+        print('At least two runs are needed for a comparison')
+        return 1
+    baseline = history[args.baseline]['results']
+    current = history[args.current]['results']
+    for key in sorted(current):
+        if key in baseline and baseline[key]['min'] > 0:
+            change = (current[key]['min'] / baseline[key]['min'] - 1) * 100
+            print(f'{key:45} {baseline[key]["min"] * 1000:10.3f} ms '
+                  f'{current[key]["min"] * 1000:10.3f} ms {change:+7.1f}%')
+    regressions = find_regressions(baseline, current, args.threshold)
+    for key, _, _, change in regressions:
+        print(f'REGRESSION {key} is {change:.1f}% slower')
+    return 1 if regressions else 0
+
+
+def main():
+    """Parses the command line arguments and runs or compares benchmarks"""
+    parser = argparse.ArgumentParser(description='Minesweeper benchmarks')
+    parser.add_argument('--history', default=HISTORY_PATH)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument('--sizes', type=int, nargs='+',
+                            default=list(SIZES))
+    run_parser.add_argument('--max-size', type=int,
+                            help='skip boards larger than this')
+    run_parser.add_argument('--densities', type=float, nargs='+',
+                            default=list(DENSITIES))
+    run_parser.add_argument('--repeat', type=int, default=5)
+    run_parser.add_argument('--label')
+    compare_parser = subparsers.add_parser('compare',
+                                           help='compare two runs')
+    compare_parser.add_argument('--threshold', type=float, default=10.0,
+                                help='allowed slowdown in percent')
+    compare_parser.add_argument('--baseline', type=int, default=-2,
+                                help='history index of the baseline run')
+    compare_parser.add_argument('--current', type=int, default=-1,
+                                help='history index of the current run')
+    logging_parser = subparsers.add_parser(
+        'logging', help='measure the debug-off logging overhead')
+    logging_parser.add_argument('--size', type=int, default=200)
+    logging_parser.add_argument('--density', type=float, default=0.15)
+    logging_parser.add_argument('--repeat', type=int, default=100)
+    memory_parser = subparsers.add_parser(
+        'memory', help='measure the memory used per tile')
+    memory_parser.add_argument('--size', type=int, default=200)
+    batch_parser = subparsers.add_parser(
+        'batch', help='measure the steps per second of the batch environment')
+    batch_parser.add_argument('--num-envs', type=int, default=1024)
+    batch_parser.add_argument('--level', default='easy',
+                              choices=['easy', 'medium', 'hard'])
+    batch_parser.add_argument('--steps', type=int, default=200)
+    leaderboard_parser = subparsers.add_parser(
+        'leaderboard', help='measure concurrent leaderboard updates')
+    leaderboard_parser.add_argument('--processes', type=int, default=8)
+    leaderboard_parser.add_argument('--games', type=int, default=200)
+    solver_parser = subparsers.add_parser(
+        'solver', help='measure the hint latency of the solver')
+    solver_parser.add_argument('--size', type=int, default=500)
+    solver_parser.add_argument('--density', type=float, default=0.15)
+    solver_parser.add_argument('--processes', type=int, nargs='+',
+                               default=[0, 1, 2, 4, 8])
+    args = parser.parse_args()
+    logging.basicConfig(format='%(message)s', level=logging.INFO)
+
+    if args.command == 'compare':
+        sys.exit(compare(args))
+    if args.command == 'logging':
+        overhead = measure_logging_overhead(size=args.size,
+                                            density=args.density,
+                                            repeat=args.repeat)
+        for name, value in overhead.items():
+            logging.info(f'{name}: {value:.4f}')
+        return
+    if args.command == 'memory':
+        for name, value in measure_tile_memory(args.size).items():
+            logging.info(f'{name}: {value:.1f}')
+        return
+    if args.command == 'leaderboard':
+        for name, value in measure_leaderboard_contention(
+                processes=args.processes, games=args.games).items():
+            logging.info(f'{name}: {value:.2f}')
+        return
+    if args.command == 'solver':
+        for name, value in measure_solver_latency(
+                size=args.size, density=args.density,
+                processes=args.processes).items():
+            logging.info(f'{name}: {value:.3f}')
+        return
+    if args.command == 'batch':
+        for name, value in measure_batch_steps(num_envs=args.num_envs,
+                                               level=args.level,
+                                               steps=args.steps).items():
+            logging.info(f'{name}: {value:.1f}')
+        return
+    sizes = [size for size in args.sizes
+             if args.max_size is None or size <= args.max_size]
+    results = run_suite(sizes=sizes, densities=args.densities,
+                        repeat=args.repeat)
+    save_run(args.history, results, args.label)
+    logging.info(f'Saved {len(results)} results to {args.history}')
+
+if __name__ == '__main__':
+    main()
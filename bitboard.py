@@ -0,0 +1,258 @@
+"""
+Module with the BitBoard class, a compact board representation for bulk
+simulation.
+
+The mines, uncovered tiles, and flags are each stored as one Python integer
+with a bit per tile. Tiles are stored row by row with one extra always-clear
+guard bit at the end of each row, so shifting a mask by one column never
+wraps a tile onto the next row. Neighbor counts are computed for every tile
+at once by adding the eight shifted mine masks with a bit-sliced adder, a
+flood fill is a repeated dilation of the uncovered mask, and the win check
+is a single comparison.
+
+The BitBoard is a standalone experiment that only the benchmark and the
+tests use. The game, the batch environment and the solver keep their own
+representations. The game's win check is already a counter of the hidden
+safe tiles. A 3BV count from repeated dilations is only as fast as the
+union-find in metrics.py up to about 100x100 tiles, and several times slower
+beyond, because every opening's flood walks the whole board.
+"""
+
+
+class BitBoard():
+    """Class that represents a minesweeper board as bitmasks"""
+    def __init__(self, *, columns, rows):
+        """Initializes a BitBoard object without any mines
+
+        Args:
+            columns (int): Number of columns on the board
+            rows (int): Number of rows on the board
+        """
+        self.columns = columns
+        self.rows = rows
+        self.stride = columns + 1
+        row_mask = (1 << columns) - 1
+        self.board_mask = 0
+        for row in range(rows):
+            self.board_mask |= row_mask << (row * self.stride)
+        self.mines = 0
+        self.uncovered = 0
+        self.flags = 0
+        self.exploded = False
+        # Bit planes of the adjacent mine counts, least significant first
+        self._count_planes = [0, 0, 0, 0]
+        self._offsets = [row_offset * self.stride + column_offset
+                         for row_offset in range(-1, 2)
+                         for column_offset in range(-1, 2)
+                         if row_offset or column_offset]
+
+    @classmethod
+    def from_board(cls, board):
+        """Creates a BitBoard with the same mines and tile states as a Board
+
+        Args:
+            board (Board): Board whose mines have been set
+        Returns:
+            BitBoard: The equivalent bitboard
+        """
+        bitboard = cls(columns=board.columns, rows=board.rows)
+        mines = []
+        for tile in board.tiles.values():
+            bit = bitboard.bit(column=tile.column, row=tile.row)
+            if tile.is_mine:
+                mines.append((tile.column, tile.row))
+            if not tile.is_hidden:
+                bitboard.uncovered |= bit
+            elif tile.is_flag_set:
+                bitboard.flags |= bit
+        bitboard.set_mines(mines)
+        return bitboard
+
+    def bit(self, *, column, row):
+        """Returns the mask of a single tile
+
+        Args:
+            column (int): Column number of the tile
+            row (int): Row number of the tile
+        Returns:
+            int: Mask with only the tile's bit set
+        """
+        return 1 << (row * self.stride + column)
+
+    def positions(self, mask):
+        """Returns the positions of the tiles in a mask
+
+        Args:
+            mask (int): Mask of tiles
+        Returns:
+            list: (column, row) tuples, row by row
+        """
+        positions = []
+        while mask:
+            low_bit = mask & -mask
+            row, column = divmod(low_bit.bit_length() - 1, self.stride)
+            positions.append((column, row))
+            mask ^= low_bit
+        return positions
+
+    def _shift(self, mask, offset):
+        """Moves every tile in a mask onto the tile that has it as the
+        neighbor at the passed offset
+
+        Args:
+            mask (int): Mask of tiles
+            offset (int): Bit offset of the neighbor
+        Returns:
+            int: Shifted mask, clipped to the board
+        """
+        if offset > 0:
+            return (mask >> offset) & self.board_mask
+        return (mask << -offset) & self.board_mask
+
+    def dilate(self, mask):
+        """Adds the neighbors of every tile in a mask
+
+        Args:
+            mask (int): Mask of tiles
+        Returns:
+            int: The tiles and all their neighbors
+        """
+        dilated = mask
+        for offset in self._offsets:
+            dilated |= self._shift(mask, offset)
+        return dilated
+
+    def set_mines(self, positions):
+        """Places the mines and computes every tile's adjacent mine count
+
+        Args:
+            positions (iterable): (column, row) tuples of the mines
+        """
+        self.mines = 0
+        for column, row in positions:
+            self.mines |= self.bit(column=column, row=row)
+        planes = [0, 0, 0, 0]
+        for offset in self._offsets:
+            # Bit-sliced addition of a one bit per tile mask
+            addend = self._shift(self.mines, offset)
+            for index, plane in enumerate(planes):
+                if not addend:
+                    break
+                planes[index] = plane ^ addend
+                addend &= plane
+        self._count_planes = planes
+
+    def count_adjacent_mines(self, *, column, row):
+        """Returns the number of adjacent mines of a tile
+
+        Args:
+            column (int): Column number of the tile
+            row (int): Row number of the tile
+        Returns:
+            int: Number of adjacent tiles with a mine
+        """
+        index = row * self.stride + column
+        return sum(((plane >> index) & 1) << bit_number
+                   for bit_number, plane in enumerate(self._count_planes))
+
+    @property
+    def zero_mask(self):
+        """int: Mask of the tiles without a mine or any adjacent mines"""
+        any_count = 0
+        for plane in self._count_planes:
+            any_count |= plane
+        return self.board_mask & ~any_count & ~self.mines
+
+    @property
+    def safe_mask(self):
+        """int: Mask of the tiles without a mine"""
+        return self.board_mask & ~self.mines
+
+    def count_num_adjacent_flags(self, *, column, row):
+        """Counts the number of adjacent tiles with a flag
+
+        Args:
+            column (int): Column number of the tile
+            row (int): Row number of the tile
+        Returns:
+            int: Number of adjacent tiles with a flag
+        """
+        bit = self.bit(column=column, row=row)
+        return ((self.dilate(bit) ^ bit) & self.flags).bit_count()
+
+    def uncover(self, mask):
+        """Uncovers the tiles in a mask, flood filling outward from those
+        without adjacent mines. Flagged tiles are left alone
+
+        Args:
+            mask (int): Mask of tiles to uncover
+        Returns:
+            int: Mask of the newly uncovered tiles
+        """
+        mask &= ~self.flags & ~self.uncovered
+        if mask & self.mines:
+            self.exploded = True
+            return 0
+        zero_mask = self.zero_mask
+        openable = self.safe_mask & ~self.flags
+        region = mask
+        while True:
+            grown = region | (self.dilate(region & zero_mask) & openable)
+            if grown == region:
+                break
+            region = grown
+        newly_uncovered = region & ~self.uncovered
+        self.uncovered |= region
+        return newly_uncovered
+
+    def reveal(self, *, column, row):
+        """Reveals a tile
+
+        Args:
+            column (int): Column number of the tile
+            row (int): Row number of the tile
+        Returns:
+            int: Mask of the newly uncovered tiles
+        """
+        return self.uncover(self.bit(column=column, row=row))
+
+    def chord(self, *, column, row):
+        """Reveals the hidden neighbors of an uncovered tile if it has as many
+        adjacent flags as adjacent mines
+
+        Args:
+            column (int): Column number of the tile
+            row (int): Row number of the tile
+        Returns:
+            int: Mask of the newly uncovered tiles
+        """
+        bit = self.bit(column=column, row=row)
+        if (not self.uncovered & bit or
+                self.count_adjacent_mines(column=column, row=row) !=
+                self.count_num_adjacent_flags(column=column, row=row)):
+            return 0
+        return self.uncover(self.dilate(bit) ^ bit)
+
+    def toggle_flag(self, *, column, row):
+        """Adds a flag to a hidden tile, or removes it if there's already one
+        there
+
+        Args:
+            column (int): Column number of the tile
+            row (int): Row number of the tile
+        Returns:
+            bool: If the tile is flagged after the toggle
+        """
+        bit = self.bit(column=column, row=row)
+        if self.uncovered & bit:
+            return False
+        self.flags ^= bit
+        return bool(self.flags & bit)
+
+    def check_if_all_tiles_cleared(self):
+        """Checks if all the tiles without a mine have been cleared
+
+        Returns:
+            bool: If all the tiles without a mine have been cleared
+        """
+        return self.uncovered == self.safe_mask
@@ -3,24 +3,52 @@ Module with the Board class
 """
 
 import logging
-import random
+from board_pool import generate_layout
+from metrics import three_bv
 from minesweeper_details import LEVEL_INFO
-from tile import Tile
+from neighbors import neighbor_table
+from seeds import new_seed
+from tile import BLANK, UNCOVERED, Tile
+from tracing import LOGIC, TRACER
+
+# Chord policies for when the number of adjacent flags doesn't match the
+# number of adjacent mines
+CHORD_IGNORE = 'ignore'
+CHORD_REVEAL = 'reveal'
+
+
+class ChangeSet():
+    """Class that holds the changes caused by revealing tiles"""
+    def __init__(self):
+        """Initializes an empty ChangeSet object"""
+        self.revealed = []
+        self.exploded_tile = None
+        self.all_cleared = False
 
 
 class Board():
     """Class that represents the minesweeper board"""
-    def __init__(self, level):
+    def __init__(self, level, seed=None):
         """Initializes a Board object
 
         Args:
-            level (str): The difficulty level of the game
+            level (str or dict): The difficulty level of the game, or a dict
+                with the rows, columns, and mines of a custom board
+            seed (int): Seed that determines the mine layout given the first
+                tile. Defaults to None in which case a new seed is created
         """
+        self.seed = new_seed() if seed is None else seed
         self.rows = None
         self.columns = None
         self.mines = None
         self.num_mines_left = None
         self.tiles = {}
+        # The tiles in flat index order, column * rows + row
+        self.tile_list = []
+        self.neighbor_table = None
+        self.num_hidden_safe_tiles = None
+        # Mine layout the mines were set from, if they weren't restored
+        self._layout = None
         self._set_board_info(level)
         self._create_tiles()
 
@@ -28,12 +56,14 @@ class Board():
         """Sets the board info based on the difficulty level
 
         Args:
-            level (str): The difficulty level of the game
+            level (str or dict): The difficulty level of the game, or a dict
+                with the rows, columns, and mines of a custom board
         """
-        self.rows = LEVEL_INFO[level]['rows']
-        self.columns = LEVEL_INFO[level]['columns']
-        self.mines = LEVEL_INFO[level]['mines']
-        self.num_mines_left = LEVEL_INFO[level]['mines']
+        level_info = LEVEL_INFO[level] if isinstance(level, str) else level
+        self.rows = level_info['rows']
+        self.columns = level_info['columns']
+        self.mines = level_info['mines']
+        self.num_mines_left = level_info['mines']
         logging.debug(f'Setting up the board with {self.columns} columns, '
                       f'{self.rows} rows, and {self.mines} mines')
 
@@ -43,6 +73,30 @@ class Board():
             for row in range(self.rows):
                 tile_name = str(column) + ',' + str(row)
                 self.tiles[tile_name] = Tile(column=column, row=row)
+                self.tile_list.append(self.tiles[tile_name])
+        self.neighbor_table = neighbor_table(self.columns, self.rows)
+
+    def index(self, tile):
+        """Returns the flat index of a tile
+
+        Args:
+            tile (Tile): Tile on the board
+        Returns:
+            int: Flat index of the tile
+        """
+        return tile.column * self.rows + tile.row
+
+    def neighbors(self, tile):
+        """Returns the tiles adjacent to the passed tile
+
+        Args:
+            tile (Tile): Tile to get the neighbors of
+        Returns:
+            list: Adjacent tiles
+        """
+        tile_list = self.tile_list
+        return [tile_list[index] for index in
+                self.neighbor_table.neighbors(self.index(tile))]
 
     def count_adjacent_mines(self, *, column, row):
         """Counts the number of adjacent tiles that have a mine
@@ -53,65 +107,157 @@ class Board():
         Returns:
             int: Number of adjacent tiles with a mine
         """
+        tile_list = self.tile_list
         num_adjacent_mines = 0
-        for i in range(-1, 2):
-            for j in range(-1, 2):
-                if i == 0 and j == 0:
-                    continue
-                test_column = column + i
-                test_row = row + j
-                # Make sure that the tile we're checking is an actual tile
-                if ((test_column < 0 or test_column >= self.columns) or
-                        (test_row < 0 or test_row >= self.rows)):
-                    continue
-                test_tile = str(test_column) + ',' + str(test_row)
-                if self.tiles[test_tile].is_mine:
-                    num_adjacent_mines += 1
-        logging.debug(f'The tile at column {column}, row {row} has '
-                      f'{num_adjacent_mines} adjacent mine(s)')
+        for index in self.neighbor_table.neighbors(column * self.rows + row):
+            if tile_list[index].is_mine:
+                num_adjacent_mines += 1
+        if TRACER.enabled:
+            TRACER.instant('adjacent mines counted', LOGIC, column=column,
+                           row=row, mines=num_adjacent_mines)
         return num_adjacent_mines
 
-    def set_the_mines(self, tile):
-        """Randomly places the mines throughout the tiles, except for the
-        passed tile which is the first tile chosen by the user. Additionally,
-        that passed tile must not have any mines adjacent to it
+    def set_the_mines(self, tile, layout=None):
+        """Places the mines throughout the tiles, except for the passed tile
+        which is the first tile chosen by the user. Additionally, that passed
+        tile must not have any mines adjacent to it. The mines only depend on
+        the board's seed and the passed tile
 
         Args:
             tile (Tile): Tile which should not have a mine or adjacent mines
+            layout (MineLayout): Layout generated ahead of time, whose seed
+                becomes the board's seed. Defaults to None in which case the
+                layout is generated from the board's seed
         """
-        num_mines_placed = 0
-
-        # Create the lists of not allowed tiles
-        restricted_columns = []
-        restricted_rows = []
-        for i in range(-1, 2):
-            test_column = tile.column + i
-            test_row = tile.row + i
-            if not test_column < 0 or test_column >= self.columns:
-                restricted_columns.append(test_column)
-            if not test_row < 0 or test_row >= self.rows:
-                restricted_rows.append(test_row)
-
-        while num_mines_placed < self.mines:
-            rand_column = random.randint(0, self.columns - 1)
-            rand_row = random.randint(0, self.rows - 1)
-            tile_name = str(rand_column) + ',' + str(rand_row)
-            if not (self.tiles[tile_name].is_mine or
-                    (rand_column in restricted_columns and
-                     rand_row in restricted_rows)):
-                self.tiles[tile_name].is_mine = True
-                logging.debug(f'Mine placed at column {rand_column}, row '
-                              f'{rand_row}')
-                num_mines_placed += 1
-                logging.debug(f'{num_mines_placed} mines have been placed')
-
-        # Figure out how many adjacent mines each tile has
-        for column in range(self.columns):
-            for row in range(self.rows):
-                tile_name = str(column) + ',' + str(row)
-                num_mines = self.count_adjacent_mines(column=column, row=row)
-                if num_mines > 0:
-                    self.tiles[tile_name].num_adjacent_mines = num_mines
+        if layout is None:
+            layout = generate_layout(columns=self.columns, rows=self.rows,
+                                     mines=self.mines, seed=self.seed)
+        elif (layout.columns, layout.rows, len(layout.mines)) != (
+                self.columns, self.rows, self.mines):
+            raise ValueError('The layout does not match the board')
+        self.seed = layout.seed
+        num_moved = layout.clear_safe_zone(column=tile.column, row=tile.row)
+        if TRACER.enabled:
+            TRACER.instant('mines placed', LOGIC, column=tile.column,
+                           row=tile.row, moved=num_moved)
+        logging.debug(f'{len(layout.mines)} mines have been placed, '
+                      f'{num_moved} moved away from the first tile')
+
+        tile_list = self.tile_list
+        for index in layout.mines:
+            tile_list[index].is_mine = True
+        for board_tile, num_mines in zip(tile_list, layout.counts):
+            board_tile.num_adjacent_mines = num_mines or None
+        self._layout = layout
+        self.count_hidden_safe_tiles()
+
+    def set_adjacent_mine_counts(self):
+        """Figures out how many adjacent mines each tile has"""
+        tile_list = self.tile_list
+        neighbors = self.neighbor_table.neighbors
+        for index, tile in enumerate(tile_list):
+            num_mines = 0
+            for neighbor_index in neighbors(index):
+                if tile_list[neighbor_index].is_mine:
+                    num_mines += 1
+            tile.num_adjacent_mines = num_mines or None
+
+    def count_hidden_safe_tiles(self):
+        """Recounts the hidden tiles without a mine, which the reveals keep
+        up to date afterwards
+
+        Returns:
+            int: Number of hidden tiles without a mine
+        """
+        self.num_hidden_safe_tiles = sum(
+            1 for tile in self.tile_list
+            if not tile.is_mine and tile.state != UNCOVERED)
+        return self.num_hidden_safe_tiles
+
+    def count_three_bv(self):
+        """Counts the minimum number of left clicks needed to clear the
+        board, see metrics.three_bv. Only the mines and their counts are
+        read, so it can run in a worker thread while the tiles are shown
+
+        Returns:
+            int: The 3BV of the board
+        """
+        if self._layout is not None:
+            return three_bv(columns=self.columns, rows=self.rows,
+                            mines=self._layout.mines,
+                            counts=self._layout.counts)
+        tile_list = self.tile_list
+        return three_bv(columns=self.columns, rows=self.rows,
+                        mines=[index for index, tile in enumerate(tile_list)
+                               if tile.is_mine],
+                        counts=[tile.num_adjacent_mines or 0
+                                for tile in tile_list])
+
+    def reveal_tiles(self, tiles):
+        """Reveals the passed tiles and flood fills from those without
+        adjacent mines in one traversal. Uncovered and flagged tiles are
+        left alone, and if any of the tiles has a mine nothing is revealed
+
+        Args:
+            tiles (iterable): Tiles to reveal
+        Returns:
+            ChangeSet: The revealed tiles, the exploded tile, and if all the
+                tiles without a mine have been cleared
+        """
+        changes = ChangeSet()
+        targets = [tile for tile in tiles if tile.state == BLANK]
+        for tile in targets:
+            if tile.is_mine:
+                changes.exploded_tile = tile
+                return changes
+        tile_list = self.tile_list
+        rows = self.rows
+        neighbors = self.neighbor_table.neighbors
+        revealed = changes.revealed
+        # Tiles are marked as uncovered when they're added to the stack so
+        # that overlapping floods never add a tile twice
+        stack = []
+        for tile in targets:
+            if tile.state == BLANK:
+                tile.state = UNCOVERED
+                stack.append(tile)
+        while stack:
+            tile = stack.pop()
+            revealed.append(tile)
+            if tile.num_adjacent_mines is None:
+                for index in neighbors(tile.column * rows + tile.row):
+                    neighbor = tile_list[index]
+                    if neighbor.state == BLANK:
+                        neighbor.state = UNCOVERED
+                        stack.append(neighbor)
+        self.num_hidden_safe_tiles -= len(revealed)
+        changes.all_cleared = self.num_hidden_safe_tiles == 0
+        if TRACER.enabled:
+            TRACER.instant('tiles revealed', LOGIC, count=len(revealed))
+        return changes
+
+    def chord(self, tile, on_mismatch=CHORD_IGNORE):
+        """Reveals the hidden neighbors of an uncovered tile, and everything
+        their flood fills reach, as a single move
+
+        Args:
+            tile (Tile): Uncovered tile that was chorded
+            on_mismatch (str): What to do if the tile doesn't have as many
+                adjacent flags as adjacent mines. CHORD_IGNORE does nothing
+                and CHORD_REVEAL reveals the neighbors anyway. Defaults to
+                CHORD_IGNORE
+        Returns:
+            ChangeSet: The changes caused by the chord
+        """
+        if on_mismatch not in (CHORD_IGNORE, CHORD_REVEAL):
+            raise ValueError(f'Unknown chord policy: {on_mismatch}')
+        if tile.state != UNCOVERED:
+            return ChangeSet()
+        if (on_mismatch == CHORD_IGNORE and
+                (tile.num_adjacent_mines or 0) !=
+                self.count_num_adjacent_flags(tile)):
+            return ChangeSet()
+        return self.reveal_tiles(self.neighbors(tile))
 
     def count_num_adjacent_flags(self, tile):
         """Counts the number of adjacent tiles with a flag
@@ -122,35 +268,10 @@ class Board():
             int: Number of adjacent tiles with a flag
         """
         num_adjacent_flags = 0
-        for i in range(-1, 2):
-            for j in range(-1, 2):
-                if i == 0 and j == 0:
-                    continue
-                test_column = tile.column + i
-                test_row = tile.row + j
-                # Make sure that the tile we're checking is on the board
-                if ((test_column < 0 or test_column >= self.columns) or
-                        (test_row < 0 or test_row >= self.rows)):
-                    continue
-                test_tile_location = (str(test_column) + ',' +
-                                      str(test_row))
-                test_tile = self.tiles[test_tile_location]
-                if test_tile.is_flag_set:
-                    num_adjacent_flags += 1
-        logging.debug(f'The tile at column {test_column}, row {test_row} has '
-                      f'{num_adjacent_flags} adjacent flag(s)')
+        for test_tile in self.neighbors(tile):
+            if test_tile.is_flag_set:
+                num_adjacent_flags += 1
+        if logging.root.isEnabledFor(logging.DEBUG):
+            logging.debug(f'The tile at column {tile.column}, row {tile.row} '
+                          f'has {num_adjacent_flags} adjacent flag(s)')
         return num_adjacent_flags
-
-    def check_if_all_tiles_cleared(self):
-        """Checks if all the tiles without a mine have been cleared
-
-        Returns:
-            bool: If all the tiles without a mine have been cleared
-        """
-        all_cleared = True
-        for tile in self.tiles.values():
-            if not tile.is_mine:
-                if tile.is_hidden:
-                    all_cleared = False
-                    break
-        return all_cleared
@@ -0,0 +1,182 @@
+"""
+Module with the mine layouts and the BoardPool class which generates them in
+the background.
+
+A mine layout is generated from a seed alone, without knowing the first
+tile. On the first click the mines inside the safe zone around the clicked
+tile are moved to tiles picked by a generator seeded with the same seed, and
+only the neighbor counts around the moved mines are updated. The mines
+therefore still only depend on the seed and the first tile, while the
+expensive part can be done before the click.
+"""
+
+import logging
+import random
+import threading
+from collections import deque
+from minesweeper_details import LEVEL_INFO
+from neighbors import neighbor_table
+from seeds import new_seed
+
+
+class MineLayout():
+    """Class that holds the mines and neighbor counts of a board"""
+    def __init__(self, *, columns, rows, seed, mines, counts):
+        """Initializes a MineLayout object
+
+        Args:
+            columns (int): Number of columns on the board
+            rows (int): Number of rows on the board
+            seed (int): Seed the layout was generated from
+            mines (set): Flat indices of the tiles with a mine
+            counts (bytearray): Number of adjacent mines of every tile, in
+                flat index order
+        """
+        self.columns = columns
+        self.rows = rows
+        self.seed = seed
+        self.mines = mines
+        self.counts = counts
+
+    def _move_mine(self, old_index, new_index):
+        """Moves a mine and updates the counts of both neighborhoods
+
+        Args:
+            old_index (int): Flat index of the tile with the mine
+            new_index (int): Flat index of the tile without a mine
+        """
+        table = neighbor_table(self.columns, self.rows)
+        counts = self.counts
+        self.mines.remove(old_index)
+        for index in table.neighbors(old_index):
+            counts[index] -= 1
+        self.mines.add(new_index)
+        for index in table.neighbors(new_index):
+            counts[index] += 1
+
+    def clear_safe_zone(self, *, column, row):
+        """Moves the mines off the passed tile and its neighbors
+
+        Args:
+            column (int): Column number of the first tile chosen by the user
+            row (int): Row number of the first tile chosen by the user
+        Returns:
+            int: Number of mines that were moved
+        """
+        index = column * self.rows + row
+        safe_zone = set(neighbor_table(self.columns, self.rows)
+                        .neighbors(index))
+        safe_zone.add(index)
+        conflicts = sorted(safe_zone & self.mines)
+        if not conflicts:
+            return 0
+        num_tiles = self.columns * self.rows
+        if len(self.mines) > num_tiles - len(safe_zone):
+            raise ValueError('Too many mines to keep the first tile safe')
+        rng = random.Random(f'{self.seed}:relocate')
+        for old_index in conflicts:
+            new_index = rng.randrange(num_tiles)
+            while new_index in self.mines or new_index in safe_zone:
+                new_index = rng.randrange(num_tiles)
+            self._move_mine(old_index, new_index)
+        return len(conflicts)
+
+
+def generate_layout(*, columns, rows, mines, seed):
+    """Places the mines of a board without any first tile restriction and
+    counts every tile's adjacent mines
+
+    Args:
+        columns (int): Number of columns on the board
+        rows (int): Number of rows on the board
+        mines (int): Number of mines
+        seed (int): Seed that determines the mine layout
+    Returns:
+        MineLayout: The mine layout
+    """
+    num_tiles = columns * rows
+    mine_indices = set(random.Random(seed).sample(range(num_tiles), mines))
+    counts = bytearray(num_tiles)
+    neighbors = neighbor_table(columns, rows).neighbors
+    for mine_index in mine_indices:
+        for index in neighbors(mine_index):
+            counts[index] += 1
+    return MineLayout(columns=columns, rows=rows, seed=seed,
+                      mines=mine_indices, counts=counts)
+
+
+class BoardPool():
+    """Class that keeps a few mine layouts of a level ready, generating new
+    ones in a background thread as they're taken"""
+    def __init__(self, level, *, size=2):
+        """Initializes a BoardPool object
+
+        Args:
+            level (str or dict): The difficulty level of the boards, or a
+                dict with the rows, columns, and mines of a custom board
+            size (int): Number of layouts kept ready. Defaults to 2
+        """
+        level_info = LEVEL_INFO[level] if isinstance(level, str) else level
+        self.level = level
+        self.size = size
+        self._columns = level_info['columns']
+        self._rows = level_info['rows']
+        self._mines = level_info['mines']
+        self._layouts = deque()
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        """Starts the background thread that fills the pool"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._fill, daemon=True,
+                                        name=f'BoardPool-{self.level}')
+        self._thread.start()
+
+    def stop(self):
+        """Stops the background thread"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _fill(self):
+        """Generates layouts whenever the pool isn't full, until stopped"""
+        while True:
+            with self._condition:
+                while len(self._layouts) >= self.size and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+            layout = generate_layout(columns=self._columns, rows=self._rows,
+                                     mines=self._mines, seed=new_seed())
+            with self._condition:
+                self._layouts.append(layout)
+                self._condition.notify_all()
+
+    def take(self, timeout=0):
+        """Takes a layout out of the pool
+
+        Args:
+            timeout (float): Seconds to wait for a layout if the pool is
+                empty. Defaults to 0
+        Returns:
+            MineLayout: A layout, or None if the pool is still empty
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._layouts,
+                                            timeout=timeout):
+                logging.debug(f'The {self.level} board pool is empty')
+                return None
+            layout = self._layouts.popleft()
+            self._condition.notify_all()
+        return layout
+
+    def __len__(self):
+        """Returns the number of layouts that are ready"""
+        with self._condition:
+            return len(self._layouts)
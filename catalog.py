@@ -0,0 +1,513 @@
+"""
+Catalog of seeded boards rated by their difficulty, so a player can ask for
+a board like "hard, no guess, 3BV between 150 and 170" and get its seed at
+once:
+
+    python catalog.py find --level hard --max-guesses 0 --min-3bv 150 \\
+        --max-3bv 170
+
+A board is rated by playing it with the solver from its start tile, the
+middle of the board, since the mines also depend on the first tile. At every
+step the player makes the deductions a single number allows, such as a 1
+with one hidden neighbor, then those that need the solver to combine the
+numbers, and only guesses the tile least likely to have a mine when nothing
+can be deduced. A guessed mine is flagged as if the guess had been lucky, so
+the rest of the board is still rated. Every flag is a mine, so the solver is
+given the flags as known mines and they take part in the deductions that
+combine the numbers. The number of mines left isn't used
+for deductions, so an endgame that only the mine count decides needs a
+guess. Each board gets:
+
+    three_bv         the 3BV of the board, see metrics.three_bv
+    guesses          the number of times the player had to guess
+    deduction_depth  DEPTH_SINGLE if every deduction came from one number,
+                     DEPTH_COMBINED if some needed several numbers at once
+
+The catalog is filled by a batch job that streams new seeds of a level
+through the ratings and keeps each board only while its difficulty bucket,
+its guesses (MAX_GUESS_BUCKET or more share a bucket) and its deduction
+depth, is below the target histogram. The boards are rated by a process
+pool, each worker with its own inline solver, since the boards are small
+enough that rating several at once beats splitting one board's frontier:
+
+    python catalog.py fill --level hard --per-bucket 100
+"""
+
+import argparse
+import itertools
+import logging
+import multiprocessing
+import os
+import random
+import sqlite3
+from board_pool import generate_layout
+from delta import FLAGGED, HIDDEN, MINE
+from metrics import three_bv
+from minesweeper_details import LEVEL_INFO
+from seeds import format_seed, new_seed, parse_seed
+from solver import MAX_NUMBER, Solver
+from storage import DATABASE_PATH, create_tables, immediate_transaction
+
+# Deduction depths
+DEPTH_SINGLE = 1
+DEPTH_COMBINED = 2
+# Boards with at least this many guesses share a difficulty bucket
+MAX_GUESS_BUCKET = 3
+# Number of boards each worker rates per round of the batch job
+ROUND_BOARDS = 32
+
+# Solver of each level of a rating worker
+_solvers = {}
+
+
+class BoardRating():
+    """Class that holds the difficulty of a seeded board"""
+    def __init__(self, seed, *, three_bv_value, guesses, deduction_depth):
+        """Initializes a BoardRating object
+
+        Args:
+            seed (int): Seed of the board
+            three_bv_value (int): 3BV of the board
+            guesses (int): Number of guesses needed to clear the board
+            deduction_depth (int): DEPTH_SINGLE or DEPTH_COMBINED
+        """
+        self.seed = seed
+        self.three_bv = three_bv_value
+        self.guesses = guesses
+        self.deduction_depth = deduction_depth
+
+    @property
+    def bucket(self):
+        """tuple: Difficulty bucket of the board in the target histogram"""
+        return min(self.guesses, MAX_GUESS_BUCKET), self.deduction_depth
+
+
+def _reveal(state, counts, table, index):
+    """Reveals a tile and flood fills from the tiles without adjacent mines
+
+    Args:
+        state (bytearray): The position, see solver.board_state
+        counts (bytearray): Number of adjacent mines of every tile
+        table (NeighborTable): Neighbor table of the board
+        index (int): Flat index of the safe tile
+    Returns:
+        list: Flat indices of the revealed tiles
+    """
+    state[index] = counts[index]
+    stack = [index]
+    revealed = []
+    while stack:
+        index = stack.pop()
+        revealed.append(index)
+        if counts[index]:
+            continue
+        for neighbor in table.neighbors(index):
+            if state[neighbor] == HIDDEN:
+                state[neighbor] = counts[neighbor]
+                stack.append(neighbor)
+    return revealed
+
+
+def _single_number_deductions(state, table, numbers):
+    """Finds the tiles that a single number proves safe or a mine: all of
+    its hidden neighbors once its mines are flagged, or all of them if they
+    are as many as its missing mines
+
+    Args:
+        state (bytearray): The position, with the known mines flagged
+        table (NeighborTable): Neighbor table of the board
+        numbers (iterable): Flat indices of the numbers to check
+    Returns:
+        tuple: Sets of the safe tiles and of the mines
+    """
+    safe = set()
+    mines = set()
+    for index in numbers:
+        hidden = []
+        num_flags = 0
+        for neighbor in table.neighbors(index):
+            if state[neighbor] == HIDDEN:
+                hidden.append(neighbor)
+            elif state[neighbor] == FLAGGED:
+                num_flags += 1
+        if not hidden:
+            continue
+        if state[index] == num_flags:
+            safe.update(hidden)
+        elif state[index] == num_flags + len(hidden):
+            mines.update(hidden)
+    return safe, mines
+
+
+def _combined_deductions(solver, state):
+    """Finds the frontier tiles that the numbers prove safe or a mine when
+    they're combined
+
+    Args:
+        solver (Solver): Solver of the board geometry
+        state (bytearray): The position, with the known mines flagged
+    Returns:
+        tuple: Sets of the safe tiles and of the mines, and the Solution
+    """
+    # The solver treats flags as hidden tiles since a player's may be wrong,
+    # but every flag of the rating is a mine
+    solution = solver.solve(state.replace(bytes((FLAGGED,)), bytes((MINE,))))
+    table = solver.table
+    safe = set()
+    mines = set()
+    for index, probability in enumerate(solution.probabilities):
+        # The probabilities of the tiles away from the numbers come from the
+        # mine count alone, which isn't exact enough to rule a tile out
+        if (probability not in (0.0, 1.0) or state[index] != HIDDEN or
+                all(state[neighbor] > MAX_NUMBER
+                    for neighbor in table.neighbors(index))):
+            continue
+        (safe if probability == 0.0 else mines).add(index)
+    return safe, mines, solution
+
+
+def _next_moves(solver, state, changed, layout):
+    """Finds the next tiles to reveal and to flag, deducing them if the
+    numbers allow it and guessing otherwise
+
+    Args:
+        solver (Solver): Solver of the board geometry
+        state (bytearray): The position, with the known mines flagged
+        changed (list): Flat indices of the tiles revealed or flagged by the
+            previous moves
+        layout (MineLayout): Mines of the board, to tell how a guess went
+    Returns:
+        tuple: Sets of the tiles to reveal and to flag, and the deduction
+            depth of the moves or None for a guess
+    """
+    table = solver.table
+    # A single number's deductions only change when its neighbors do
+    numbers = {neighbor for index in changed
+               for neighbor in itertools.chain((index,),
+                                               table.neighbors(index))
+               if state[neighbor] <= MAX_NUMBER}
+    safe, mines = _single_number_deductions(state, table, numbers)
+    if safe or mines:
+        return safe, mines, DEPTH_SINGLE
+    safe, mines, solution = _combined_deductions(solver, state)
+    if safe or mines:
+        return safe, mines, DEPTH_COMBINED
+    guess = min((index for index, code in enumerate(state) if code == HIDDEN),
+                key=solution.probabilities.__getitem__)
+    if guess in layout.mines:
+        return set(), {guess}, None
+    return {guess}, set(), None
+
+
+def _play(solver, layout, start_index):
+    """Clears a board from its first tile
+
+    Args:
+        solver (Solver): Solver of the board geometry
+        layout (MineLayout): Mines of the board
+        start_index (int): Flat index of the first tile
+    Returns:
+        tuple: Number of guesses and deduction depth
+    """
+    state = bytearray([HIDDEN]) * solver.num_tiles
+    changed = _reveal(state, layout.counts, solver.table, start_index)
+    num_hidden_safe = solver.num_tiles - solver.mines - len(changed)
+    guesses = 0
+    depth = DEPTH_SINGLE
+    while num_hidden_safe and state.count(FLAGGED) < solver.mines:
+        safe, mines, move_depth = _next_moves(solver, state, changed, layout)
+        if move_depth is None:
+            guesses += 1
+        else:
+            depth = max(depth, move_depth)
+        changed = list(mines)
+        for index in mines:
+            state[index] = FLAGGED
+        for index in safe:
+            if state[index] == HIDDEN:
+                changed.extend(_reveal(state, layout.counts, solver.table,
+                                       index))
+        num_hidden_safe -= len(changed) - len(mines)
+    return guesses, depth
+
+
+def start_tile(columns, rows):
+    """Returns the first tile the boards of the catalog are rated from
+
+    Args:
+        columns (int): Number of columns on the board
+        rows (int): Number of rows on the board
+    Returns:
+        tuple: Column and row of the middle tile
+    """
+    return columns // 2, rows // 2
+
+
+def rate_board(solver, seed):
+    """Rates the board of a seed by playing it from its start tile
+
+    Args:
+        solver (Solver): Solver of the level's board geometry
+        seed (int): Seed of the board
+    Returns:
+        BoardRating: The difficulty of the board
+    """
+    columns, rows = solver.columns, solver.rows
+    column, row = start_tile(columns, rows)
+    layout = generate_layout(columns=columns, rows=rows, mines=solver.mines,
+                             seed=seed)
+    layout.clear_safe_zone(column=column, row=row)
+    guesses, depth = _play(solver, layout, column * rows + row)
+    return BoardRating(seed, three_bv_value=three_bv(
+                           columns=columns, rows=rows, mines=layout.mines,
+                           counts=layout.counts),
+                       guesses=guesses, deduction_depth=depth)
+
+
+def _level_solver(level):
+    """Returns the inline solver of a level, creating it on first use
+
+    Args:
+        level (str): The difficulty level
+    Returns:
+        Solver: Solver of the level's board geometry
+    """
+    if level not in _solvers:
+        level_info = LEVEL_INFO[level]
+        _solvers[level] = Solver(columns=level_info['columns'],
+                                 rows=level_info['rows'],
+                                 mines=level_info['mines'], processes=0)
+    return _solvers[level]
+
+
+def _rate_seed(task):
+    """Rates a board in a worker process
+
+    Args:
+        task (tuple): The difficulty level and the seed of the board
+    Returns:
+        BoardRating: The difficulty of the board
+    """
+    level, seed = task
+    return rate_board(_level_solver(level), seed)
+
+
+def uniform_target(per_bucket):
+    """Returns a target histogram with the same number of boards in every
+    difficulty bucket
+
+    Args:
+        per_bucket (int): Number of boards wanted in each bucket
+    Returns:
+        dict: Number of boards wanted keyed by difficulty bucket
+    """
+    return {(guesses, depth): per_bucket
+            for guesses in range(MAX_GUESS_BUCKET + 1)
+            for depth in (DEPTH_SINGLE, DEPTH_COMBINED)}
+
+
+def catalog_histogram(conn, *, level):
+    """Counts the cataloged boards of a level in each difficulty bucket
+
+    Args:
+        conn: sqlite3 connection object
+        level (str): The difficulty level
+    Returns:
+        dict: Number of boards keyed by difficulty bucket
+    """
+    return dict(((guesses, depth), count) for guesses, depth, count in
+                conn.execute("""SELECT MIN(guesses, ?) AS bucket,
+                                       deduction_depth, COUNT(*)
+                                FROM board_catalog WHERE level = ?
+                                GROUP BY bucket, deduction_depth""",
+                             (MAX_GUESS_BUCKET, level)))
+
+
+def _add_ratings(conn, level, ratings):
+    """Adds rated boards to the catalog
+
+    Args:
+        conn: sqlite3 connection object
+        level (str): The difficulty level of the boards
+        ratings (list): BoardRating objects
+    Returns:
+        int: Number of boards added
+    """
+    with immediate_transaction(conn):
+        return conn.executemany(
+            """INSERT OR IGNORE INTO board_catalog(
+                   level, seed, three_bv, guesses, deduction_depth)
+               VALUES (?,?,?,?,?)""",
+            [(level, format_seed(rating.seed), rating.three_bv,
+              rating.guesses, rating.deduction_depth)
+             for rating in ratings]).rowcount
+
+
+def fill_catalog(conn, *, level, target, seeds=None, processes=None):
+    """Rates new boards of a level until every difficulty bucket of the
+    target histogram is full
+
+    Args:
+        conn: sqlite3 connection object
+        level (str): The difficulty level
+        target (dict): Number of boards wanted keyed by difficulty bucket
+        seeds (iterable): Seeds of the boards. Defaults to None in which
+            case new random seeds are rated until the target is reached,
+            which may take long for the rare buckets
+        processes (int): Number of worker processes. Defaults to None in
+            which case one per CPU is started. With 0 the boards are rated
+            in the calling process
+    Returns:
+        int: Number of boards added
+    """
+    create_tables(conn)
+    histogram = catalog_histogram(conn, level=level)
+    missing = {bucket: count - histogram.get(bucket, 0)
+               for bucket, count in target.items()
+               if count > histogram.get(bucket, 0)}
+    seeds = iter(seeds if seeds is not None else iter(new_seed, None))
+    if processes is None:
+        processes = os.cpu_count() or 1
+    pool = None
+    if processes:
+        pool = multiprocessing.Pool(processes)  # pylint: disable=consider-using-with
+    num_rated = num_added = 0
+    try:
+        while missing:
+            # The seeds are handed out a round at a time, since the pool
+            # would otherwise read the whole stream of seeds up front
+            tasks = [(level, seed) for seed in itertools.islice(
+                seeds, ROUND_BOARDS * max(processes, 1))]
+            if not tasks:
+                break
+            ratings = (pool.map(_rate_seed, tasks) if pool is not None
+                       else [_rate_seed(task) for task in tasks])
+            num_rated += len(ratings)
+            kept = []
+            for rating in ratings:
+                if missing.get(rating.bucket, 0) > 0:
+                    kept.append(rating)
+                    missing[rating.bucket] -= 1
+                    if not missing[rating.bucket]:
+                        del missing[rating.bucket]
+            if kept:
+                num_added += _add_ratings(conn, level, kept)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    logging.info(f'Rated {num_rated} {level} boards and cataloged '
+                 f'{num_added}, {sum(missing.values())} are still missing')
+    return num_added
+
+
+def find_board(conn, *, level, max_guesses=None, deduction_depth=None,
+               three_bv_range=None):
+    """Picks a random cataloged board of a level that matches the passed
+    difficulty
+
+    Args:
+        conn: sqlite3 connection object
+        level (str): The difficulty level
+        max_guesses (int): Most guesses the board may need. Defaults to None
+            for any number
+        deduction_depth (int): Deduction depth of the board. Defaults to
+            None for any depth
+        three_bv_range (tuple): Lowest and highest 3BV of the board, either
+            None for no limit. Defaults to None for any 3BV
+    Returns:
+        BoardRating: The board, or None if no cataloged board matches
+    """
+    conditions = ['level = ?']
+    params = [level]
+    if max_guesses is not None:
+        # An IN list rather than a range lets the index seek to each number
+        # of guesses and then to the 3BV range
+        conditions.append(f'guesses IN ({",".join("?" * (max_guesses + 1))})')
+        params.extend(range(max_guesses + 1))
+    lowest, highest = three_bv_range or (None, None)
+    if lowest is not None:
+        conditions.append('three_bv >= ?')
+        params.append(lowest)
+    if highest is not None:
+        conditions.append('three_bv <= ?')
+        params.append(highest)
+    if deduction_depth is not None:
+        conditions.append('deduction_depth = ?')
+        params.append(deduction_depth)
+    where = ' AND '.join(conditions)
+    num_boards = conn.execute(f'SELECT COUNT(*) FROM board_catalog '
+                              f'WHERE {where}', params).fetchone()[0]
+    if not num_boards:
+        return None
+    seed, three_bv_value, guesses, depth = conn.execute(
+        f"""SELECT seed, three_bv, guesses, deduction_depth
+            FROM board_catalog WHERE {where} LIMIT 1 OFFSET ?""",
+        params + [random.randrange(num_boards)]).fetchone()
+    return BoardRating(parse_seed(seed), three_bv_value=three_bv_value,
+                       guesses=guesses, deduction_depth=depth)
+
+
+def main():
+    """Parses the command line arguments and fills or searches the
+    catalog"""
+    parser = argparse.ArgumentParser(description='Catalog of Minesweeper '
+                                                 'boards rated by difficulty')
+    parser.add_argument('--database', default=DATABASE_PATH)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    fill_parser = subparsers.add_parser(
+        'fill', help='rate new boards until the target histogram is full')
+    fill_parser.add_argument('--level', choices=LEVEL_INFO, required=True)
+    fill_parser.add_argument('--per-bucket', type=int, default=100,
+                             help='boards wanted in each difficulty bucket')
+    fill_parser.add_argument('--processes', type=int)
+    fill_parser.add_argument('--max-boards', type=int, default=100000,
+                             help='most boards rated, since some buckets '
+                                  'are rare')
+    find_parser = subparsers.add_parser(
+        'find', help='print the seed of a board of the wanted difficulty')
+    find_parser.add_argument('--level', choices=LEVEL_INFO, required=True)
+    find_parser.add_argument('--max-guesses', type=int)
+    find_parser.add_argument('--depth', type=int,
+                             choices=(DEPTH_SINGLE, DEPTH_COMBINED))
+    find_parser.add_argument('--min-3bv', type=int)
+    find_parser.add_argument('--max-3bv', type=int)
+    args = parser.parse_args()
+    logging.basicConfig(
+        format='[%(asctime)s] %(levelname)s : %(funcName)s() - %(message)s',
+        level=logging.INFO)
+    conn = sqlite3.connect(args.database, timeout=30)
+    try:
+        if args.command == 'fill':
+            fill_catalog(conn, level=args.level,
+                         target=uniform_target(args.per_bucket),
+                         seeds=itertools.islice(iter(new_seed, None),
+                                                args.max_boards),
+                         processes=args.processes)
+            for bucket, count in sorted(catalog_histogram(
+                    conn, level=args.level).items()):
+                logging.info(f'{bucket[0]} guesses, depth {bucket[1]}: '
+                             f'{count} boards')
+        else:
+            create_tables(conn)
+            rating = find_board(conn, level=args.level,
+                                max_guesses=args.max_guesses,
+                                deduction_depth=args.depth,
+                                three_bv_range=(args.min_3bv,
+                                                args.max_3bv))
+            if rating is None:
+                logging.info('No cataloged board matches')
+            else:
+                column, row = start_tile(LEVEL_INFO[args.level]['columns'],
+                                         LEVEL_INFO[args.level]['rows'])
+                logging.info(f'Seed {format_seed(rating.seed)}: 3BV '
+                             f'{rating.three_bv}, {rating.guesses} guesses, '
+                             f'deduction depth {rating.deduction_depth}. '
+                             f'Start on column {column + 1}, row {row + 1} from '
+                             f'the top left')
+    finally:
+        conn.close()
+    logging.shutdown()
+
+if __name__ == '__main__':
+    main()
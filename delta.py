@@ -0,0 +1,264 @@
+"""
+Module with the classes used to send compact per-move board deltas to remote
+and replay clients.
+
+Both sides keep the visible board as one byte per tile, indexed row by row.
+Uncovered tiles hold their number of adjacent mines (0-8) and the other
+tiles hold one of the codes below. A delta holds the runs of consecutive
+uncovered tiles, the flag toggles, the game status, and a CRC-32 of the
+resulting visible board. Every keyframe_interval deltas a keyframe with the
+whole run-length encoded board is sent instead.
+"""
+
+import zlib
+
+# Visible tile codes in addition to the 0-8 adjacent mine counts
+HIDDEN = 9
+FLAGGED = 10
+MINE = 11
+EXPLODED = 12
+
+
+class DeltaError(Exception):
+    """Raised when a delta can't be applied to the reconstructed board"""
+
+
+def encode_runs(state):
+    """Run-length encodes a visible board
+
+    Args:
+        state (bytearray): Visible board
+    Returns:
+        list: [code, run length] pairs
+    """
+    runs = []
+    for code in state:
+        if runs and runs[-1][0] == code:
+            runs[-1][1] += 1
+        else:
+            runs.append([code, 1])
+    return runs
+
+
+def decode_runs(runs):
+    """Decodes a run-length encoded visible board
+
+    Args:
+        runs (list): [code, run length] pairs
+    Returns:
+        bytearray: Visible board
+    """
+    state = bytearray()
+    for code, run_length in runs:
+        state.extend(bytes((code,)) * run_length)
+    return state
+
+
+def apply_mines(state, mines, exploded_index):
+    """Shows the mines on a visible board, leaving flagged mines as flags
+
+    Args:
+        state (bytearray): Visible board
+        mines (list): Indices of the mines
+        exploded_index (int): Index of the exploded mine. None if no mine
+            was revealed
+    """
+    for index in mines:
+        if state[index] != FLAGGED:
+            state[index] = MINE
+    if exploded_index is not None:
+        state[exploded_index] = EXPLODED
+
+
+def visible_state(game):
+    """Builds the visible board straight from a GameEngine so that it can be
+    compared with a reconstructed board
+
+    Args:
+        game (GameEngine): Game to build the visible board of
+    Returns:
+        bytearray: Visible board
+    """
+    board = game.board
+    state = bytearray([HIDDEN]) * (board.columns * board.rows)
+    for tile in board.tiles.values():
+        index = tile.row * board.columns + tile.column
+        if tile.is_flag_set:
+            state[index] = FLAGGED
+        elif not tile.is_hidden:
+            state[index] = tile.num_adjacent_mines or 0
+        elif game.is_over and tile.is_mine:
+            state[index] = MINE
+    if game.exploded_tile is not None:
+        tile = game.exploded_tile
+        state[tile.row * board.columns + tile.column] = EXPLODED
+    return state
+
+
+class DeltaEncoder():
+    """Class that turns the change events of a GameEngine into deltas"""
+    def __init__(self, *, columns, rows, keyframe_interval=50):
+        """Initializes a DeltaEncoder object
+
+        Args:
+            columns (int): Number of columns on the board
+            rows (int): Number of rows on the board
+            keyframe_interval (int): Number of deltas between keyframes.
+                Defaults to 50
+        """
+        self.columns = columns
+        self.rows = rows
+        self.keyframe_interval = keyframe_interval
+        self.state = bytearray([HIDDEN]) * (columns * rows)
+        self._sequence = 0
+
+    def encode(self, events, status):
+        """Applies change events to the mirrored board and returns the delta
+        or keyframe for them
+
+        Args:
+            events (list): Change events returned by a GameEngine move
+            status (str): Game status after the move
+        Returns:
+            dict: The delta or keyframe
+        """
+        revealed = {}
+        flags = []
+        game_over = None
+        for event in events:
+            if event['type'] == 'reveal':
+                index = event['row'] * self.columns + event['column']
+                revealed[index] = event['mines']
+            elif event['type'] == 'flag':
+                index = event['row'] * self.columns + event['column']
+                flags.append([index, int(event['flagged'])])
+                self.state[index] = FLAGGED if event['flagged'] else HIDDEN
+            elif event['type'] == 'status':
+                game_over = event
+        for index, num_mines in revealed.items():
+            self.state[index] = num_mines
+        mines, exploded_index = self._apply_game_over(game_over)
+
+        self._sequence += 1
+        delta = {'seq': self._sequence, 'status': status}
+        if self._sequence % self.keyframe_interval == 0:
+            delta['keyframe'] = encode_runs(self.state)
+        else:
+            delta['reveal'] = self._reveal_runs(revealed)
+            if flags:
+                delta['flags'] = flags
+            if mines:
+                delta['mines'] = mines
+            if exploded_index is not None:
+                delta['exploded'] = exploded_index
+        delta['checksum'] = zlib.crc32(self.state)
+        return delta
+
+    def keyframe(self, status):
+        """Returns a keyframe without applying any events, for example for a
+        client that just connected or missed a delta
+
+        Args:
+            status (str): Game status
+        Returns:
+            dict: The keyframe
+        """
+        return {'seq': self._sequence, 'status': status,
+                'keyframe': encode_runs(self.state),
+                'checksum': zlib.crc32(self.state)}
+
+    def _apply_game_over(self, event):
+        """Shows the mines on the mirrored board once the game is over
+
+        Args:
+            event (dict): Status change event. None if the game isn't over
+        Returns:
+            tuple: Indices of the mines and the index of the exploded mine,
+                which is None unless a mine was revealed
+        """
+        if event is None:
+            return [], None
+        mines = sorted(row * self.columns + column
+                       for column, row in event.get('mines', []))
+        exploded_index = None
+        if 'exploded' in event:
+            column, row = event['exploded']
+            exploded_index = row * self.columns + column
+        apply_mines(self.state, mines, exploded_index)
+        return mines, exploded_index
+
+    def _reveal_runs(self, revealed):
+        """Groups the revealed tiles into runs of consecutive indices. A flood
+        fill uncovers whole row segments, so each run is sent as its start
+        index and a string of its adjacent mine counts
+
+        Args:
+            revealed (dict): Adjacent mine counts keyed by tile index
+        Returns:
+            list: [start index, mine count digits] pairs
+        """
+        runs = []
+        previous_index = None
+        for index in sorted(revealed):
+            digit = str(revealed[index])
+            if previous_index is not None and index == previous_index + 1:
+                runs[-1][1] += digit
+            else:
+                runs.append([index, digit])
+            previous_index = index
+        return runs
+
+
+class DeltaDecoder():
+    """Class that reconstructs the visible board from deltas"""
+    def __init__(self, *, columns, rows):
+        """Initializes a DeltaDecoder object
+
+        Args:
+            columns (int): Number of columns on the board
+            rows (int): Number of rows on the board
+        """
+        self.columns = columns
+        self.rows = rows
+        self.state = bytearray([HIDDEN]) * (columns * rows)
+        self.status = None
+        self._sequence = 0
+
+    def apply(self, delta):
+        """Applies a delta or keyframe and verifies the reconstructed board
+
+        Args:
+            delta (dict): Delta or keyframe from a DeltaEncoder
+        """
+        if 'keyframe' in delta:
+            state = decode_runs(delta['keyframe'])
+            if len(state) != len(self.state):
+                raise DeltaError('The keyframe does not match the board size')
+            self.state = state
+        else:
+            if delta['seq'] != self._sequence + 1:
+                raise DeltaError(f'Expected delta #{self._sequence + 1} but '
+                                 f'got #{delta["seq"]}; a keyframe is needed')
+            for start_index, digits in delta['reveal']:
+                for offset, digit in enumerate(digits):
+                    self.state[start_index + offset] = int(digit)
+            for index, flagged in delta.get('flags', []):
+                self.state[index] = FLAGGED if flagged else HIDDEN
+            apply_mines(self.state, delta.get('mines', []),
+                        delta.get('exploded'))
+        self._sequence = delta['seq']
+        self.status = delta['status']
+        if zlib.crc32(self.state) != delta['checksum']:
+            raise DeltaError(f'The board after delta #{delta["seq"]} does not '
+                             f'match the checksum')
+
+    def tile(self, *, column, row):
+        """Returns the visible code of a tile
+
+        Args:
+            column (int): Column number of the tile
+            row (int): Row number of the tile
+        Returns:
+            int: Adjacent mine count or one of the visible tile codes
+        """
+        return self.state[row * self.columns + column]
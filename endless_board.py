@@ -0,0 +1,314 @@
+"""
+Module with the EndlessBoard class used for the endless game mode
+
+At a low mine density the openings have no end, so a single reveal only
+flood fills into max_reveal_chunks chunks. The flood fill stops at the edge
+of those chunks, and the tiles past it are revealed by clicking there.
+"""
+
+import logging
+import random
+from collections import OrderedDict
+from minesweeper_details import ENDLESS
+
+# Tile states stored in each chunk's state bytearray
+HIDDEN = 0
+REVEALED = 1
+FLAGGED = 2
+
+
+class Chunk():
+    """Class that represents a square chunk of the endless board"""
+    def __init__(self, *, chunk_column, chunk_row, mines):
+        """Initializes a Chunk object
+
+        Args:
+            chunk_column (int): Column number of the chunk
+            chunk_row (int): Row number of the chunk
+            mines (frozenset): Local indices of the tiles with a mine
+        """
+        self.chunk_column = chunk_column
+        self.chunk_row = chunk_row
+        self.mines = mines
+        # The state is only allocated once the player touches the chunk
+        self.state = None
+
+    def is_touched(self):
+        """Checks if the player has revealed or flagged a tile in the chunk
+
+        Returns:
+            bool: If any tile in the chunk isn't hidden
+        """
+        return self.state is not None and any(self.state)
+
+
+class EndlessBoard():
+    """Class that represents an endless minesweeper board that is split into
+    chunks which are generated lazily from the world seed"""
+    def __init__(self, seed, *, chunk_size=None, mines_per_chunk=None,
+                 max_loaded_chunks=None, max_reveal_chunks=None):
+        """Initializes an EndlessBoard object
+
+        Args:
+            seed (int): World seed that determines every chunk's mines
+            chunk_size (int): Side length of each chunk. Defaults to None in
+                which case the ENDLESS details are used
+            mines_per_chunk (int): Number of mines in each chunk. Defaults to
+                None in which case the ENDLESS details are used
+            max_loaded_chunks (int): Number of chunks kept in memory before
+                the least recently used one is evicted. Defaults to None in
+                which case the ENDLESS details are used
+            max_reveal_chunks (int): Number of chunks a single reveal may
+                flood fill into. Defaults to None in which case the ENDLESS
+                details are used
+        """
+        self.seed = seed
+        self.chunk_size = chunk_size or ENDLESS['chunk_size']
+        self.mines_per_chunk = (ENDLESS['mines_per_chunk']
+                                if mines_per_chunk is None
+                                else mines_per_chunk)
+        self.max_loaded_chunks = (max_loaded_chunks or
+                                  ENDLESS['max_loaded_chunks'])
+        self.max_reveal_chunks = (max_reveal_chunks or
+                                  ENDLESS['max_reveal_chunks'])
+        self.exploded = False
+        self.num_revealed = 0
+        self.num_flags = 0
+        self._chunks = OrderedDict()
+        # Compact player state for evicted chunks keyed by chunk coordinates.
+        # Each value is a (revealed bits, flag bits) tuple
+        self._evicted_state = {}
+        logging.debug(f'Setting up an endless board with seed {seed} and '
+                      f'{self.chunk_size}x{self.chunk_size} chunks')
+
+    @property
+    def num_loaded_chunks(self):
+        """int: Number of chunks currently held in memory"""
+        return len(self._chunks)
+
+    def _generate_mines(self, chunk_column, chunk_row):
+        """Generates the mines of a chunk from the world seed and the chunk
+        coordinates. The tiles around the world origin never have a mine so
+        that the first reveal there is always safe
+
+        Args:
+            chunk_column (int): Column number of the chunk
+            chunk_row (int): Row number of the chunk
+        Returns:
+            frozenset: Local indices of the tiles with a mine
+        """
+        size = self.chunk_size
+        rng = random.Random(f'{self.seed}:{chunk_column}:{chunk_row}')
+        candidates = []
+        for local_index in range(size * size):
+            column = chunk_column * size + local_index // size
+            row = chunk_row * size + local_index % size
+            if abs(column) <= 1 and abs(row) <= 1:
+                continue
+            candidates.append(local_index)
+        num_mines = min(self.mines_per_chunk, len(candidates))
+        return frozenset(rng.sample(candidates, num_mines))
+
+    def _get_chunk(self, chunk_column, chunk_row):
+        """Returns the chunk at the passed coordinates, generating it and
+        reapplying any evicted player state if it isn't loaded
+
+        Args:
+            chunk_column (int): Column number of the chunk
+            chunk_row (int): Row number of the chunk
+        Returns:
+            Chunk: The loaded chunk
+        """
+        key = (chunk_column, chunk_row)
+        chunk = self._chunks.get(key)
+        if chunk is not None:
+            self._chunks.move_to_end(key)
+            return chunk
+
+        chunk = Chunk(chunk_column=chunk_column,
+                      chunk_row=chunk_row,
+                      mines=self._generate_mines(chunk_column, chunk_row))
+        diff = self._evicted_state.pop(key, None)
+        if diff is not None:
+            revealed_bits, flag_bits = diff
+            num_tiles = self.chunk_size * self.chunk_size
+            chunk.state = bytearray(num_tiles)
+            for local_index in range(num_tiles):
+                if revealed_bits >> local_index & 1:
+                    chunk.state[local_index] = REVEALED
+                elif flag_bits >> local_index & 1:
+                    chunk.state[local_index] = FLAGGED
+        self._chunks[key] = chunk
+        self._evict_least_recently_used()
+        return chunk
+
+    def _evict_least_recently_used(self):
+        """Evicts chunks until no more than the maximum number of chunks are
+        loaded"""
+        while len(self._chunks) > self.max_loaded_chunks:
+            chunk_column, chunk_row = next(iter(self._chunks))
+            self.evict_chunk(chunk_column, chunk_row)
+
+    def evict_chunk(self, chunk_column, chunk_row):
+        """Removes a chunk from memory. The mines can be regenerated from the
+        seed so only a compact diff of the player state is kept
+
+        Args:
+            chunk_column (int): Column number of the chunk
+            chunk_row (int): Row number of the chunk
+        """
+        chunk = self._chunks.pop((chunk_column, chunk_row), None)
+        if chunk is None or not chunk.is_touched():
+            return
+        revealed_bits = 0
+        flag_bits = 0
+        for local_index, state in enumerate(chunk.state):
+            if state == REVEALED:
+                revealed_bits |= 1 << local_index
+            elif state == FLAGGED:
+                flag_bits |= 1 << local_index
+        self._evicted_state[(chunk_column, chunk_row)] = (revealed_bits,
+                                                          flag_bits)
+        logging.debug(f'Evicted the chunk at column {chunk_column}, row '
+                      f'{chunk_row}')
+
+    def _locate(self, column, row):
+        """Returns the chunk and local index of the tile at the passed
+        position
+
+        Args:
+            column (int): Column number of the tile
+            row (int): Row number of the tile
+        Returns:
+            tuple: The Chunk and the local index of the tile within it
+        """
+        chunk_column, local_column = divmod(column, self.chunk_size)
+        chunk_row, local_row = divmod(row, self.chunk_size)
+        chunk = self._get_chunk(chunk_column, chunk_row)
+        return chunk, local_column * self.chunk_size + local_row
+
+    def is_mine(self, *, column, row):
+        """Checks if the tile at the passed position has a mine
+
+        Args:
+            column (int): Column number of the tile
+            row (int): Row number of the tile
+        Returns:
+            bool: If the tile has a mine
+        """
+        chunk, local_index = self._locate(column, row)
+        return local_index in chunk.mines
+
+    def get_state(self, *, column, row):
+        """Returns the player state of the tile at the passed position
+
+        Args:
+            column (int): Column number of the tile
+            row (int): Row number of the tile
+        Returns:
+            int: HIDDEN, REVEALED or FLAGGED
+        """
+        chunk, local_index = self._locate(column, row)
+        if chunk.state is None:
+            return HIDDEN
+        return chunk.state[local_index]
+
+    def _set_state(self, column, row, state):
+        """Sets the player state of the tile at the passed position
+
+        Args:
+            column (int): Column number of the tile
+            row (int): Row number of the tile
+            state (int): HIDDEN, REVEALED or FLAGGED
+        """
+        chunk, local_index = self._locate(column, row)
+        if chunk.state is None:
+            chunk.state = bytearray(self.chunk_size * self.chunk_size)
+        chunk.state[local_index] = state
+
+    def count_adjacent_mines(self, *, column, row):
+        """Counts the number of adjacent tiles that have a mine
+
+        Args:
+            column (int): Column number where the tile to check is located
+            row (int): Row number where the tile to check is located
+        Returns:
+            int: Number of adjacent tiles with a mine
+        """
+        num_adjacent_mines = 0
+        for i in range(-1, 2):
+            for j in range(-1, 2):
+                if i == 0 and j == 0:
+                    continue
+                if self.is_mine(column=column + i, row=row + j):
+                    num_adjacent_mines += 1
+        return num_adjacent_mines
+
+    def toggle_flag(self, *, column, row):
+        """Adds a flag to a hidden tile, or removes it if there's already one
+        there
+
+        Args:
+            column (int): Column number of the tile
+            row (int): Row number of the tile
+        Returns:
+            bool: If the tile is flagged after the toggle
+        """
+        state = self.get_state(column=column, row=row)
+        if state == REVEALED:
+            return False
+        if state == FLAGGED:
+            self._set_state(column, row, HIDDEN)
+            self.num_flags -= 1
+            return False
+        self._set_state(column, row, FLAGGED)
+        self.num_flags += 1
+        return True
+
+    def reveal(self, *, column, row):
+        """Reveals a tile and flood fills outward from it if it doesn't have
+        any adjacent mines. Chunks are only generated as the flood fill
+        reaches them, and it doesn't go past max_reveal_chunks chunks
+
+        Args:
+            column (int): Column number of the tile
+            row (int): Row number of the tile
+        Returns:
+            list: (column, row, number of adjacent mines) tuples for every
+                newly revealed tile. Empty if a mine was revealed
+        """
+        if self.get_state(column=column, row=row) != HIDDEN:
+            return []
+        if self.is_mine(column=column, row=row):
+            logging.info(f'The endless board exploded at column {column}, '
+                         f'row {row}')
+            self.exploded = True
+            return []
+
+        revealed = []
+        stack = [(column, row)]
+        size = self.chunk_size
+        reached_chunks = {(column // size, row // size)}
+        while stack:
+            test_column, test_row = stack.pop()
+            if self.get_state(column=test_column, row=test_row) != HIDDEN:
+                continue
+            num_mines = self.count_adjacent_mines(column=test_column,
+                                                  row=test_row)
+            self._set_state(test_column, test_row, REVEALED)
+            self.num_revealed += 1
+            revealed.append((test_column, test_row, num_mines))
+            if num_mines > 0:
+                continue
+            for i in range(-1, 2):
+                for j in range(-1, 2):
+                    if i == 0 and j == 0:
+                        continue
+                    chunk = ((test_column + i) // size,
+                             (test_row + j) // size)
+                    if chunk not in reached_chunks:
+                        if len(reached_chunks) >= self.max_reveal_chunks:
+                            continue
+                        reached_chunks.add(chunk)
+                    stack.append((test_column + i, test_row + j))
+        return revealed
@@ -0,0 +1,187 @@
+"""
+Module with the GameEngine class which plays a game without a display
+"""
+
+import logging
+from board import CHORD_IGNORE, Board
+
+# Game statuses
+READY = 'ready'
+PLAYING = 'playing'
+WON = 'won'
+LOST = 'lost'
+
+
+class GameEngine():
+    """Class that represents a headless game. Every move returns the list of
+    change events it caused instead of updating a display"""
+    def __init__(self, level, seed=None, chord_policy=CHORD_IGNORE):
+        """Initializes a GameEngine object
+
+        Args:
+            level (str): The difficulty level of the game
+            seed (int): Seed of the board. Defaults to None in which case a
+                new seed is created
+            chord_policy (str): What a chord does when the flag count doesn't
+                match the mine count, see Board.chord. Defaults to
+                CHORD_IGNORE
+        """
+        self.level = level
+        self.board = Board(level, seed)
+        self.chord_policy = chord_policy
+        self.status = READY
+        self.num_moves = 0
+        self.exploded_tile = None
+
+    @property
+    def is_over(self):
+        """bool: If the game has been won or lost"""
+        return self.status in (WON, LOST)
+
+    def _get_tile(self, column, row):
+        """Returns the tile at the passed position
+
+        Args:
+            column (int): Column number of the tile
+            row (int): Row number of the tile
+        Returns:
+            Tile: The tile at the position
+        """
+        if not (0 <= column < self.board.columns and
+                0 <= row < self.board.rows):
+            raise ValueError(f'There is no tile at column {column}, row {row}')
+        return self.board.tile_list[column * self.board.rows + row]
+
+    def reveal(self, *, column, row):
+        """Reveals a tile, flood filling outward if it has no adjacent mines.
+        The mines are set on the first reveal of the game
+
+        Args:
+            column (int): Column number of the tile
+            row (int): Row number of the tile
+        Returns:
+            list: Change events caused by the move
+        """
+        tile = self._get_tile(column, row)
+        if self.is_over or not tile.is_hidden or tile.is_flag_set:
+            return []
+        self.num_moves += 1
+        if self.status == READY:
+            self.board.set_the_mines(tile)
+            self.status = PLAYING
+        return self._apply_changes(self.board.reveal_tiles([tile]))
+
+    def toggle_flag(self, *, column, row):
+        """Adds a flag to a hidden tile, or removes it if there's already one
+        there
+
+        Args:
+            column (int): Column number of the tile
+            row (int): Row number of the tile
+        Returns:
+            list: Change events caused by the move
+        """
+        tile = self._get_tile(column, row)
+        if self.is_over or not tile.is_hidden:
+            return []
+        self.num_moves += 1
+        tile.is_flag_set = not tile.is_flag_set
+        if tile.is_flag_set:
+            self.board.num_mines_left -= 1
+        else:
+            self.board.num_mines_left += 1
+        return [{'type': 'flag', 'column': column, 'row': row,
+                 'flagged': tile.is_flag_set}]
+
+    def chord(self, *, column, row):
+        """Reveals all the hidden neighbors of an uncovered tile if it has as
+        many adjacent flags as adjacent mines, or regardless of the flags if
+        the chord policy is CHORD_REVEAL
+
+        Args:
+            column (int): Column number of the tile
+            row (int): Row number of the tile
+        Returns:
+            list: Change events caused by the move
+        """
+        tile = self._get_tile(column, row)
+        if self.is_over or tile.is_hidden:
+            return []
+        changes = self.board.chord(tile, on_mismatch=self.chord_policy)
+        if not (changes.revealed or changes.exploded_tile):
+            return []
+        self.num_moves += 1
+        return self._apply_changes(changes)
+
+    def neighbors(self, tile):
+        """Returns the tiles adjacent to the passed tile
+
+        Args:
+            tile (Tile): Tile to get the neighbors of
+        Returns:
+            list: Adjacent tiles
+        """
+        return self.board.neighbors(tile)
+
+    def _apply_changes(self, changes):
+        """Turns the changes of a move into change events, ending the game if
+        a mine was revealed or all the tiles without a mine are cleared
+
+        Args:
+            changes (ChangeSet): Changes caused by the move
+        Returns:
+            list: Change events caused by the move
+        """
+        events = [{'type': 'reveal', 'column': tile.column, 'row': tile.row,
+                   'mines': tile.num_adjacent_mines or 0}
+                  for tile in changes.revealed]
+        if changes.exploded_tile is not None:
+            self._end_game(LOST, events, exploded_tile=changes.exploded_tile)
+        elif changes.all_cleared:
+            self._end_game(WON, events)
+        return events
+
+    def _end_game(self, status, events, exploded_tile=None):
+        """Ends the game and adds the status event, which includes the mine
+        positions so that clients can show them
+
+        Args:
+            status (str): WON or LOST
+            events (list): List the change events are added to
+            exploded_tile (Tile): Tile with the mine that was revealed.
+                Defaults to None
+        """
+        self.status = status
+        event = {'type': 'status', 'status': status,
+                 'mines': [[tile.column, tile.row] for tile in
+                           self.board.tiles.values() if tile.is_mine]}
+        if exploded_tile is not None:
+            self.exploded_tile = exploded_tile
+            event['exploded'] = [exploded_tile.column, exploded_tile.row]
+        events.append(event)
+        logging.debug(f'The headless game has ended with status: {status}')
+
+    def state(self):
+        """Returns a full snapshot of the game
+
+        Returns:
+            dict: Game status, board size and the visible state of each tile
+                where '#' is hidden, 'F' is flagged and digits are uncovered
+        """
+        rows = []
+        for row in range(self.board.rows):
+            row_state = []
+            for column in range(self.board.columns):
+                tile = self.board.tiles[str(column) + ',' + str(row)]
+                if tile.is_flag_set:
+                    row_state.append('F')
+                elif tile.is_hidden:
+                    row_state.append('#')
+                else:
+                    row_state.append(str(tile.num_adjacent_mines or 0))
+            rows.append(''.join(row_state))
+        return {'status': self.status,
+                'columns': self.board.columns,
+                'rows': self.board.rows,
+                'mines_left': self.board.num_mines_left,
+                'tiles': rows}
@@ -2,43 +2,113 @@
 Module with the Game class
 """
 
+# pylint: disable=too-many-lines
+
+import functools
 import logging
-import sqlite3
-import threading
 import time
+import uuid
 from datetime import datetime, timezone
 from tkinter import PhotoImage
-from board import Board
+from board import CHORD_IGNORE, Board
+from heatmap import MoveLog, np, record_game
+from metrics import three_bv_per_second
 from minesweeper_details import NUMBER_COLORS
 from minesweeper_displays import BoardDisplay, TimesDisplay
+from save_game import SaveFile, SaveFileError, save_path
+from seeds import daily_seed, format_seed, today
+from solver import Solver, board_state
+from storage import (cancel_fastest_time, complete_fastest_time,
+                     reserve_fastest_time, top_times)
+from tile import BLANK, FLAG, UNCOVERED
+from tracing import INPUT, LOGIC, MOVE, RENDER, STORAGE, TRACER, traced
+
+# File the trace is exported to from the board display
+TRACE_PATH = 'minesweeper_trace.json'
+# Milliseconds between the timer display updates
+TIMER_INTERVAL_MS = 500
+# Milliseconds between the checks for race updates
+RACE_POLL_MS = 100
+# Largest number of revealed tiles shown right away instead of in slices
+MAX_SYNC_RENDER = 256
+# Mouse buttons handled on the board, keyed by the Tk button number
+MOUSE_BUTTONS = {1: 'left', 2: 'middle', 3: 'right'}
+# Boards with at least this many tiles are solved with a process pool
+SOLVER_POOL_TILES = 100000
+# Background color of the tile suggested by a hint
+HINT_COLOR = 'pale green'
 
 
 class Game():
     """Class that represents a running of the game"""
-    def __init__(self, level):
+    def __init__(self, level, resume=False, seed=None,
+                 chord_policy=CHORD_IGNORE, app=None):
         """Initializes a Game object
 
         Args:
             level (str): The difficulty level of the game
+            resume (bool): If the level's saved game should be resumed.
+                Defaults to False
+            seed (int): Seed of the board. Defaults to None in which case a
+                new seed is created. The daily level always uses the daily
+                seed
+            chord_policy (str): What a chord does when the flag count doesn't
+                match the mine count, see Board.chord. Defaults to
+                CHORD_IGNORE
+            app (App): Application shell that hosts the game's windows,
+                database connection, and board pools. Needed to start the
+                game or show the fastest times. Defaults to None
         """
         # Game variables
         self.game_run_time = None
         self._game_level = level
+        # Day of the daily challenge, whose seed and leaderboard it decides
+        self._challenge_day = None
+        if level == 'daily':
+            if seed is not None:
+                logging.warning('Ignoring the seed, the daily challenge is '
+                                'played on the daily seed')
+            self._challenge_day = today()
+            seed = daily_seed(self._challenge_day)
+        self._leaderboard_level = leaderboard_level(level,
+                                                    self._challenge_day)
+        self._seed = seed
+        self._chord_policy = chord_policy
+        self._layout = None
         self._game_start_time = None
         self._game_end_time = None
         self._game_over = False
         self._game_won = None
         self._is_first_tile = True  # Set to True until the first click
+        # Clicks on the board, None if some were made before a resume
+        self._clicks = 0
+        # Moves for the click heatmaps
+        self._move_log = None
         self._board = None
         self._db_id = None
+        self._resume = resume
+        self._save_file = None
+        # 3BV of the finished board, counted in a worker thread
+        self._three_bv = None
+        self._three_bv_task = None
+        # Solver for the hints, created on the first hint
+        self._solver = None
+        self._hint_task = None
+        # Scheduler tasks showing the tiles, cancelled when the board closes
+        self._tasks = []
         # Display and user variables
+        self._app = app
+        # Race client set by the app when the game is part of a race
+        self.race = None
+        self._race_poll_id = None
         self.board_display = None
         self.restart_game_flag = False
         self._times_display = None
         self._is_left_clicked = False
         self._is_right_clicked = False
+        self._is_middle_clicked = False
         self._closing_game = False
-        self._timer_thread = None
+        self._timer_id = None
         self._username = None
         # Images
         self._photo_exploded_mine = None
@@ -48,8 +118,14 @@ class Game():
 
     def start_game(self):
         """Starts the game by creating the board"""
-        logging.info(f'Starting a game at level: {self._game_level}')
-        self._board = Board(self._game_level)
+        if self._seed is None and not self._resume:
+            self._layout = self._app.take_layout(self._game_level)
+        if self._layout is not None:
+            self._board = Board(self._game_level, self._layout.seed)
+        else:
+            self._board = Board(self._game_level, self._seed)
+        logging.info(f'Starting a game at level: {self._game_level} with '
+                     f'seed: {format_seed(self._board.seed)}')
         self._create_display()
 
         # Load images
@@ -63,70 +139,184 @@ class Game():
         self._photo_mine = PhotoImage(file=mine_path)
         self._photo_wrong_mine = PhotoImage(file=wrong_mine_path)
 
+        if self._resume:
+            self._restore_saved_game()
+        self._move_log = MoveLog()
+
+    def _restore_saved_game(self):
+        """Restores the mines, tiles, and elapsed time from the level's save
+        file and restarts the timer, unless another open board of the level
+        writes the save file"""
+        if not self._app.claim_save_file(self, self._game_level):
+            return
+        try:
+            self._save_file = SaveFile(save_path(self._game_level))
+            self._save_file.restore_board(self._board)
+        except (OSError, SaveFileError) as ex:
+            logging.warning(f'Unable to resume the saved game: {ex}')
+            if self._save_file is not None:
+                self._save_file.close()
+                self._save_file = None
+            return
+        logging.info(f'Resuming the saved game at level: {self._game_level}')
+        self._db_id = self._save_file.db_id or None
+        # A daily challenge resumed on a later day still counts for its day
+        if self._save_file.day is not None:
+            self._challenge_day = self._save_file.day
+            self._leaderboard_level = leaderboard_level(self._game_level,
+                                                        self._challenge_day)
+        self._is_first_tile = False
+        self._clicks = None
+        self._game_start_time = time.time() - self._save_file.elapsed_time
+        for tile in self._board.tiles.values():
+            if tile.state == UNCOVERED:
+                if tile.num_adjacent_mines is None:
+                    self.board_display.disable_tile_button(tile)
+                    self.board_display.set_tile_color(tile, bg_color='gray95')
+                else:
+                    self._update_button(tile)
+            elif tile.state == FLAG:
+                self._update_button(tile)
+        self._update_mine_counter_display(self._board.num_mines_left)
+        self._schedule_timer_update()
+
+    @traced(STORAGE)
+    def _autosave(self, tiles):
+        """Writes the changed tiles and the elapsed time to the save file
+
+        Args:
+            tiles (iterable): Tiles whose state changed
+        """
+        if self._save_file is None:
+            return
+        for tile in tiles:
+            self._save_file.write_tile(tile)
+        self._save_file.write_elapsed_time(time.time() -
+                                           self._game_start_time)
+
     def _create_display(self):
         """Creates the minesweeper board display"""
         logging.debug('Creating the minesweeper board display')
-        self.board_display = BoardDisplay(self._game_level)
+        self.board_display = BoardDisplay(self._game_level,
+                                          master=self._app.root,
+                                          index=self._app.games.index(self),
+                                          show_opponents=self.race is not None)
         self.board_display.root.protocol('WM_DELETE_WINDOW',
                                          self._close_window)
         # Create the tile buttons
         for tile in self._board.tiles.values():
-            tile.create_button(self.board_display.root)
-            tile.button_type = 'blank'
+            self.board_display.create_tile_button(tile)
             self._update_button(tile)
-            # Set the button click bindings for the tile buttons. Setting
-            # these here because they will never change.
-            tile.button.bind('<Button-1>',
-                             lambda event, arg1='left':
-                             self._set_button_clicked(arg1))
-            tile.button.bind('<Button-3>',
-                             lambda event, arg1='right':
-                             self._set_button_clicked(arg1))
+        # The mouse events of every tile reach the board window, where the
+        # pointer position tells which tile was clicked
+        for number in MOUSE_BUTTONS:
+            self.board_display.root.bind(f'<ButtonPress-{number}>',
+                                         self._on_button_press)
+            self.board_display.root.bind(f'<ButtonRelease-{number}>',
+                                         self._on_button_release)
         # Create the header
         self.board_display.smiley_button.configure(command=self._restart_game)
+        # Tracing can be toggled and exported while playing
+        self.board_display.root.bind('<F9>', lambda event: TRACER.toggle())
+        self.board_display.root.bind(
+            '<F10>', lambda event: TRACER.export_chrome_trace(TRACE_PATH))
+        self.board_display.root.bind('<F1>', self._show_hint)
         self._update_header(smiley_type='smiley')
+        if self.race is not None:
+            self.board_display.update_opponents(self.race.summary())
+            self._poll_race()
+
+    def _poll_race(self):
+        """Shows the race updates received since the last poll, reveals the
+        shared starting tile once the race starts, and schedules the next
+        poll on the event loop"""
+        self._race_poll_id = None
+        if self._closing_game:
+            return
+        if self.race.poll():
+            self.board_display.update_opponents(self.race.summary())
+            if self.race.started and self._is_first_tile:
+                column, row = self.race.start_tile
+                self._select_tile(self._board.tile_list[
+                    column * self._board.rows + row])
+        self._race_poll_id = self.board_display.root.after(RACE_POLL_MS,
+                                                           self._poll_race)
+
+    def _report_race_progress(self):
+        """Sends the game's progress to the race hub"""
+        if self.race is None or self._game_start_time is None:
+            return
+        board = self._board
+        num_safe_tiles = board.columns * board.rows - board.mines
+        cleared = 100 * (num_safe_tiles - board.num_hidden_safe_tiles)
+        if self._game_over:
+            status = 'won' if self._game_won else 'lost'
+            elapsed_time = self.game_run_time
+        else:
+            status = 'playing'
+            elapsed_time = int(time.time() - self._game_start_time)
+        self.race.report(cleared=cleared // num_safe_tiles,
+                         flags=board.mines - board.num_mines_left,
+                         time=elapsed_time, status=status)
 
     def _close_window(self):
-        """Updates the proper flags and ensures that threads are closed before
-        closing the window"""
+        """Updates the proper flags, cancels the timer updates, and closes the
+        window"""
         self._closing_game = True
-        logging.debug('Closing the main window')
-        # Wait for the timer thread to close
-        loop_count = 0
-        if self._timer_thread:
-            logging.info(f'Timer thread: {self._timer_thread}')
-            while self._timer_thread.is_alive():
-                loop_count += 1
-                logging.debug('Waiting another .15 seconds for the timer '
-                              'thread to close')
-                if loop_count > 7:
-                    logging.info('Timer thread took longer than 1 second to '
-                                 'close')
-                    # TODO: Throw an exception here
-                    break
-                time.sleep(.15)
+        logging.debug('Closing the board window')
+        self._cancel_timer_update()
+        for task in self._tasks:
+            task.cancel()
+        # Record a finished game whose 3BV is still being counted
+        if self._three_bv_task is not None:
+            self._three_bv_task.cancel()
+            self._record_game_result(self._board.count_three_bv())
+        if self._race_poll_id is not None:
+            self.board_display.root.after_cancel(self._race_poll_id)
+            self._race_poll_id = None
+        if self._hint_task is not None:
+            self._hint_task.cancel()
+        if self._solver is not None:
+            self._solver.close()
+        # Keep the save file for an unfinished game unless it's being
+        # restarted
+        if self._save_file is not None:
+            if self.restart_game_flag:
+                self._save_file.delete()
+            else:
+                self._save_file.write_elapsed_time(time.time() -
+                                                   self._game_start_time)
+                self._save_file.close()
+            self._save_file = None
         # Destroy all the displays
         if self._times_display is not None:
             self._times_display.root.destroy()
         self.board_display.root.destroy()
+        self._app.game_closed(self)
 
+    @traced(STORAGE)
     def _update_database(self):
         """Updates the database with info from the game when it starts and
         after it is finished"""
-        create_tables()
-        conn = sqlite3.connect('minesweeper.db')
+        conn = self._app.storage.conn
         cur = conn.cursor()
 
         if not self._game_over:
             # Add starting info to the table
             start_time = datetime.fromtimestamp(self._game_start_time,
                                                 timezone.utc)
-            insert_values = (self._game_level, self._game_over, start_time)
+            insert_values = (self._game_level,
+                             self._game_over,
+                             start_time,
+                             format_seed(self._board.seed),
+                             uuid.uuid4().hex)
             sql_statement = """INSERT INTO
                                play_history(level,
                                             finished,
-                                            start_time)
-                               VALUES (?,?,?)"""
+                                            start_time,
+                                            seed,
+                                            uuid)
+                               VALUES (?,?,?,?,?)"""
             cur.execute(sql_statement, insert_values)
             conn.commit()
             logging.info(f'Adding a database entry for the start of a game '
@@ -137,149 +327,148 @@ class Game():
             # Update the table when the game has finished
             end_time = datetime.fromtimestamp(self._game_end_time,
                                               timezone.utc)
+            three_bv = self._three_bv
+            # Only a cleared board has a meaningful 3BV per second
+            speed = None
+            if self._game_won:
+                speed = three_bv_per_second(
+                    three_bv_value=three_bv,
+                    seconds=self._game_end_time - self._game_start_time)
             insert_values = (self._game_won,
                              self.game_run_time,
                              self._game_over,
                              end_time,
+                             three_bv,
+                             self._clicks,
+                             speed,
                              self._db_id)
             sql_statement = """UPDATE play_history SET
                                game_won = ?,
                                game_run_time = ?,
                                finished = ?,
-                               end_time = ?
+                               end_time = ?,
+                               three_bv = ?,
+                               clicks = ?,
+                               three_bv_per_second = ?
                                WHERE id = ?"""
             cur.execute(sql_statement, insert_values)
             conn.commit()
             logging.info(f'Updating entry #{self._db_id} in the database by '
                          f'adding game won: {self._game_won}, game run time: '
                          f'{self.game_run_time}, game over: {self._game_over},'
-                         f' and end time: {end_time}')
+                         f' end time: {end_time}, 3BV: {three_bv}, and '
+                         f'clicks: {self._clicks}')
 
+            self._record_heatmaps(conn)
             if self._game_won:
-                self._check_for_fastest_time(conn=conn, cur=cur)
-        logging.info('Closing the database connection')
-        conn.close()
+                self._check_for_fastest_time(conn)
+
+    def _record_heatmaps(self, conn):
+        """Adds the moves of the finished game to the level's click
+        heatmaps, if NumPy is installed
+
+        Args:
+            conn: sqlite3 connection object
+        """
+        if np is None or self._move_log is None:
+            return
+        try:
+            record_game(conn, level=self._game_level, board=self._board,
+                        move_log=self._move_log)
+        except ValueError as ex:
+            logging.warning(f'Unable to record the click heatmaps: {ex}')
 
     def display_fastest_times(self):
         """Selects the 10 fastest times for the given level and calls
         show_top_times in order to create the display"""
-        conn = sqlite3.connect('minesweeper.db')
-        cur = conn.cursor()
-
-        sql_statement = ('SELECT game_run_time, username FROM fastest_times '
-                         'WHERE level=?')
-        cur.execute(sql_statement, (self._game_level,))
-        times_list = cur.fetchall()
-
-        if not times_list:
+        sorted_times_list = top_times(self._app.storage.conn,
+                                      level=self._leaderboard_level)
+        if not sorted_times_list:
             logging.info(f'There are no saved times for level: '
                          f'{self._game_level}')
             return
-        sorted_times_list = sorted(times_list, key=lambda x: x[0])
         self._show_top_times(False, sorted_times_list)
 
-    def _check_for_fastest_time(self, *, conn, cur):
+    def _check_for_fastest_time(self, conn):
         """Checks if the finished game qualifies as one of the 10 fastest
-        times for that level.  If so, a window will pop up showing the fastest
-        times and asking the user to enter a username
+        times for that level.  If so, its entry is reserved and a window will
+        pop up showing the fastest times and asking the user to enter a
+        username
 
         Args:
             conn: sqlite3 connection object
-            cur: sqlite3 cursor object
         """
-        sql_statement = ('SELECT game_run_time, username FROM fastest_times '
-                         'WHERE level=?')
-        cur.execute(sql_statement, (self._game_level,))
-        times_list = cur.fetchall()
-
-        # If this is the first entry, then it must be the fastest
-        if not times_list:
-            logging.info(f'This is the first entry in the fastest times table '
-                         f'for level: {self._game_level}')
-            logging.info('Getting user info for a top time')
-            self._show_top_times(True, [], 1)
-            self._update_fastest_times(conn=conn, cur=cur, rank=1)
+        # The entry shares the game's UUID so merges recognise it
+        row = conn.execute('SELECT uuid FROM play_history WHERE id = ?',
+                           (self._db_id,)).fetchone()
+        reservation = reserve_fastest_time(conn,
+                                           level=self._leaderboard_level,
+                                           game_run_time=self.game_run_time,
+                                           game_uuid=row[0] if row else None)
+        if reservation is None:
+            logging.info(f'The previous game with a run time of '
+                         f'{self.game_run_time} seconds does not qualify '
+                         f'one of the top 10 fastest times for level '
+                         f'{self._game_level}')
             return
-
-        # Sort the list of time, username tuples by time
-        sorted_times_list = sorted(times_list, key=lambda x: x[0])
-        # Figure out the new entry's rank
-        rank = 1
-        for entry in sorted_times_list:
-            if self.game_run_time <= entry[0]:
-                break
-            rank += 1
+        entry_id, rank, sorted_times_list = reservation
         if rank == 1:
             logging.info(f'Congrats! You just set the fastest time for '
                          f'level: {self._game_level}')
+        if self._closing_game:
+            logging.info('Dropping the fastest time since the board was '
+                         'closed before the name could be asked')
+            cancel_fastest_time(conn, entry_id=entry_id)
+            return
+        # The name prompt waits in a nested event loop, so it's opened once
+        # the scheduler callback that recorded the game has returned
+        self._app.root.after(0, functools.partial(
+            self._ask_for_username, conn, entry_id=entry_id, rank=rank,
+            sorted_times_list=sorted_times_list))
 
-        # If there are less than 10 entries, just insert the new time
-        if len(sorted_times_list) < 10:
-            logging.info('Getting user info for a top time')
-            self._show_top_times(True, sorted_times_list, rank)
-            self._update_fastest_times(conn=conn, cur=cur, rank=rank)
+    def _ask_for_username(self, conn, *, entry_id, rank, sorted_times_list):
+        """Shows the fastest times with an entry for the user's name and
+        completes the reserved entry with it
 
-        # If there are more than 10 entries, then check if the new time
-        # qualifies as one of the 10 fastest times. If so, then add the time
-        # and remove the entry with the slowest time
-        else:
-            if rank <= 10:
-                logging.info('Getting user info for a top time')
-                self._show_top_times(True, sorted_times_list, rank)
-                self._update_fastest_times(conn=conn, cur=cur, rank=rank,
-                                           sorted_times_list=sorted_times_list)
-            else:
-                logging.info(f'The previous game with a run time of '
-                             f'{self.game_run_time} seconds does not qualify '
-                             f'one of the top 10 fastest times for level '
-                             f'{self._game_level}')
+        Args:
+            conn: sqlite3 connection object
+            entry_id (int): Id of the reserved entry
+            rank (int): Rank of the new entry
+            sorted_times_list (list): The completed fastest times
+        """
+        if self._closing_game:
+            cancel_fastest_time(conn, entry_id=entry_id)
+            return
+        logging.info('Getting user info for a top time')
+        self._show_top_times(True, sorted_times_list, rank)
+        self._update_fastest_times(conn, entry_id=entry_id, rank=rank)
 
-    def _update_fastest_times(self, *, conn, cur, rank, sorted_times_list=None):
-        """Updates the fastest times table by adding an entry and by
-        optionally deleting the slowest entry
+    def _update_fastest_times(self, conn, *, entry_id, rank):
+        """Completes the reserved fastest times entry with the username, or
+        drops it if no username was entered
 
         Args:
             conn: sqlite3 connection object
-            cur: sqlite3 cursor object
+            entry_id (int): Id of the reserved entry
             rank (int): Rank of the new entry
-            sorted_times_list (list): Sorted list of the fastest times.
-                Defaults to None
         """
-        # Make sure the username was set before adding or deleting an entry
+        # Make sure the username was set before completing the entry
         if not self._username:
             logging.warning('Aborting fastest times table update because '
                             'one of the windows was closed')
+            cancel_fastest_time(conn, entry_id=entry_id)
             return
 
-        # Delete the slowest entry if a list of times was passed
-        if sorted_times_list is not None:
-            # Remove the slowest time
-            slowest_time = sorted_times_list[-1][0]
-            sql_statement = ("SELECT id FROM fastest_times WHERE "
-                             "game_run_time=? LIMIT 1")
-            cur.execute(sql_statement, (slowest_time,))
-            slow_id_arr = cur.fetchall()
-            slow_id = slow_id_arr[0][0]
-            sql_statement = "DELETE FROM fastest_times WHERE id=?"
-            cur.execute(sql_statement, (slow_id,))
-            conn.commit()
-            logging.info(f'Removing the 10th place entry from the fastest '
-                         f'times table which had run time: {slowest_time} '
-                         f'seconds')
-
-        # Update the table with the new entry
-        insert_values = (self._game_level,
-                         self.game_run_time,
-                         self._username)
-        sql_statement = ('INSERT INTO '
-                         'fastest_times(level, game_run_time, username) '
-                         'VALUES (?,?,?)')
-        cur.execute(sql_statement, insert_values)
-        conn.commit()
+        if not complete_fastest_time(conn, entry_id=entry_id,
+                                     username=self._username):
+            logging.warning('The reserved fastest times entry expired before '
+                            'the username was entered')
+            return
         logging.info(f'Adding an entry to the fastest times table with rank: '
                      f'{rank}, level: {self._game_level}, run time: '
                      f'{self.game_run_time}, and username: {self._username}')
 
+    @traced(INPUT)
     def _show_top_times(self, get_input, sorted_times_list, rank=-1):
         """Creates an entry line and enter button where the user can enter
         their username. If get_input is set to False then this method
@@ -291,7 +480,8 @@ class Game():
                 is the time and the second value is the username
             rank (int): The rank of the new time. Defaults to -1
         """
-        self._times_display = TimesDisplay(get_input=get_input,
+        self._times_display = TimesDisplay(master=self._app.root,
+                                           get_input=get_input,
                                            num_entries=len(sorted_times_list))
 
         # Add the times and usernames
@@ -335,11 +525,8 @@ class Game():
             # Focus on the user entry
             self._times_display.user_entry.focus()
 
-        # Maintain the user input display
-        if get_input:
-            self.board_display.root.wait_window(self._times_display.root)
-        else:
-            self._times_display.root.mainloop()
+        # Maintain the display until it's closed
+        self._app.root.wait_window(self._times_display.root)
         logging.info('The input window has been closed')
 
     def _check_user_input(self, _):
@@ -371,37 +558,43 @@ class Game():
         self._update_timer_display(display_time)
 
     def _update_timer_display(self, display_time=None):
-        """Updates the timer display in the header"""
-        # If the game has been started and is currently ongoing
-        if not self._game_over and self._game_start_time is not None:
-            while not (self._closing_game or self._game_over):
-                elapsed_time = int(round(time.time() -
-                                         self._game_start_time, 0))
-                elapsed_time = str(elapsed_time)
-                num_chars = len(elapsed_time)
-                if num_chars == 1:
-                    elapsed_time = '0' + '0' + elapsed_time
-                elif num_chars == 2:
-                    elapsed_time = '0' + elapsed_time
-                self.board_display.update_timer(elapsed_time)
-                # Two .5 second sleeps instead of a 1 second sleep so that the
-                # thread will close faster
-                time.sleep(.5)
-                if self._closing_game or self._game_over:
-                    return
-                time.sleep(.5)
-            logging.info('Closing the timer thread')
-        # If the game isn't currently running, populate the timer label
-        # with the passed time
-        else:
-            display_time = str(display_time)
-            num_chars = len(display_time)
-            if num_chars == 1:
-                display_time = '0' + '0' + display_time
-            elif num_chars == 2:
-                display_time = '0' + display_time
-            self.board_display.update_timer(display_time)
+        """Updates the timer display in the header
+
+        Args:
+            display_time (int): Number of seconds to display. Defaults to None
+                in which case the elapsed time of the running game is shown
+        """
+        if display_time is None:
+            display_time = int(round(time.time() - self._game_start_time, 0))
+        display_time = str(display_time)
+        num_chars = len(display_time)
+        if num_chars == 1:
+            display_time = '0' + '0' + display_time
+        elif num_chars == 2:
+            display_time = '0' + display_time
+        self.board_display.update_timer(display_time)
+
+    def _schedule_timer_update(self):
+        """Schedules the next timer display update on the event loop"""
+        self._timer_id = self.board_display.root.after(TIMER_INTERVAL_MS,
+                                                       self._timer_update)
+
+    def _timer_update(self):
+        """Updates the timer display of the running game and schedules the
+        next update"""
+        self._timer_id = None
+        if self._closing_game or self._game_over:
+            return
+        self._update_timer_display()
+        self._schedule_timer_update()
+
+    def _cancel_timer_update(self):
+        """Cancels the scheduled timer display update"""
+        if self._timer_id is not None:
+            self.board_display.root.after_cancel(self._timer_id)
+            self._timer_id = None
 
+    @traced(RENDER)
     def _update_mine_counter_display(self, num_mines):
         """Updates the mine counter display in the header
 
@@ -422,6 +615,48 @@ class Game():
                 num_mines = '-' + '0' + num_mines[1]
         self.board_display.update_mine_count(num_mines)
 
+    def _tile_at(self, event):
+        """Returns the tile under the pointer of a mouse event
+
+        Args:
+            event: Tkinter mouse event
+        Returns:
+            Tile: The tile, or None if the pointer isn't over the tiles
+        """
+        position = self.board_display.tile_position_at(x_root=event.x_root,
+                                                        y_root=event.y_root)
+        if position is None:
+            return None
+        column, row = position
+        return self._board.tile_list[column * self._board.rows + row]
+
+    def _on_button_press(self, event):
+        """Handles a mouse button press anywhere on the board window
+
+        Args:
+            event: Tkinter mouse event
+        """
+        button = MOUSE_BUTTONS.get(event.num)
+        if (button is not None and not self._game_over and
+                self._tile_at(event) is not None):
+            self._set_button_clicked(button)
+
+    def _on_button_release(self, event):
+        """Handles a mouse button release anywhere on the board window. The
+        move is made on the tile under the pointer, if the button was
+        pressed on the tiles
+
+        Args:
+            event: Tkinter mouse event
+        """
+        button = MOUSE_BUTTONS.get(event.num)
+        if button == 'left' and self._is_left_clicked:
+            self._check_button_click(self._tile_at(event), button)
+        elif button == 'right' and self._is_right_clicked:
+            self._check_button_click(self._tile_at(event), button)
+        elif button == 'middle' and self._is_middle_clicked:
+            self._check_button_click(self._tile_at(event), button)
+
     def _set_button_clicked(self, button):
         """Sets the button clicked flags
 
@@ -430,6 +665,8 @@ class Game():
         """
         if button == 'right':
             self._is_right_clicked = True
+        elif button == 'middle':
+            self._is_middle_clicked = True
         elif button == 'left':
             self.board_display.update_smiley_button('scared')
             self._is_left_clicked = True
@@ -442,137 +679,123 @@ class Game():
         """
         if button == 'right':
             self._is_right_clicked = False
+        elif button == 'middle':
+            self._is_middle_clicked = False
         elif button == 'left':
             self.board_display.update_smiley_button('smiley')
             self._is_left_clicked = False
 
+    @traced(RENDER)
     def _update_button(self, tile):
         """Updates the tile button
 
         Args:
             tile: Tile that was clicked
         """
-        logging.debug(f'Updating the button of type: {tile.button_type} at '
-                      f'column {tile.column}, row {tile.row}')
-        # Delete the previous button bindings
-        tile.button.unbind('<ButtonRelease-1>')
-        tile.button.unbind('<ButtonRelease-3>')
-        if tile.button_type == 'flag':
-            tile.button.configure(image=self._photo_flag)
-            tile.set_button_color(bg_color='gray95')
-            tile.button.bind('<ButtonRelease-1>',
-                             lambda event,
-                                    arg1='left':
-                             self._set_button_unclicked(arg1))
-            tile.button.bind('<ButtonRelease-3>',
-                             lambda event,
-                                    arg1=tile,
-                                    arg2='right':
-                             self._check_button_click(arg1, arg2))
-        elif tile.button_type == 'blank':
-            tile.button.configure(image='')
-            tile.set_button_color(bg_color='gray75')
-            tile.button.bind('<ButtonRelease-1>',
-                             lambda event,
-                                    arg1=tile,
-                                    arg2='left':
-                             self._check_button_click(arg1, arg2))
-            tile.button.bind('<ButtonRelease-3>',
-                             lambda event,
-                                    arg1=tile,
-                                    arg2='right':
-                             self._check_button_click(arg1, arg2))
-        elif tile.button_type == 'uncovered':
-            tile.button.configure(text=tile.num_adjacent_mines,
-                                  font=('helvetica', 14))
-            tile.set_button_color(bg_color='gray95',
-                                  fg_color=NUMBER_COLORS[tile.num_adjacent_mines])
-            tile.button.bind('<ButtonRelease-1>',
-                             lambda event,
-                                    arg1=tile,
-                                    arg2='left':
-                             self._check_button_click(arg1, arg2))
-            tile.button.bind('<ButtonRelease-3>',
-                             lambda event,
-                                    arg1=tile,
-                                    arg2='right':
-                             self._check_button_click(arg1, arg2))
-
-    def _empty_tile_recursive_check(self, tile):
-        """If the user clicks on an empty tile - no adjacent mines - then this
-        function will uncover all self-contained empty tiles
-
-        Args:
-            tile: Tile to run the recursive check on
-        """
-        logging.debug(f'Running the empty tile recursive check on the tile at '
-                      f'column {tile.column}, row {tile.row}')
-        for i in range(-1, 2):
-            for j in range(-1, 2):
-                test_column = tile.column + i
-                test_row = tile.row + j
-                # Make sure that the tile we're checking is an actual tile
-                if ((test_column < 0 or test_column >= self._board.columns) or
-                        (test_row < 0 or test_row >= self._board.rows)):
-                    continue
-                if i == 0 and j == 0:
-                    continue
-                test_tile = str(test_column) + ',' + str(test_row)
-                new_tile = self._board.tiles[test_tile]
-                if new_tile.is_flag_set:
-                    continue
-                if new_tile.is_hidden:
-                    self._select_tile(tile=new_tile, recursive_check=False)
-                    if new_tile.num_adjacent_mines is None:
-                        self._empty_tile_recursive_check(new_tile)
-
+        if TRACER.enabled:
+            TRACER.instant('button updated', RENDER,
+                           state=tile.state, column=tile.column,
+                           row=tile.row)
+        button = self.board_display.tile_buttons[tile]
+        if tile.state == FLAG:
+            button.configure(image=self._photo_flag)
+            self.board_display.set_tile_color(tile, bg_color='gray95')
+        elif tile.state == BLANK:
+            button.configure(image='')
+            self.board_display.set_tile_color(tile, bg_color='gray75')
+        elif tile.state == UNCOVERED:
+            button.configure(text=tile.num_adjacent_mines,
+                             font=('helvetica', 14))
+            self.board_display.set_tile_color(
+                tile, bg_color='gray95',
+                fg_color=NUMBER_COLORS[tile.num_adjacent_mines])
+
+    @traced(MOVE)
     def _check_button_click(self, tile, button):
-        """Checks if the user is attempting a left and right click at the same
-        time, meaning that we should uncover all adjacent tiles at once. If
-        just one button is pressed, the appropriate function is then called
+        """Decides the move of a released mouse button from the buttons that
+        are still held and the state of the tile. Releasing one of the left
+        and right buttons while the other is held, or releasing the middle
+        button, chords an uncovered tile. Otherwise a left click reveals a
+        blank tile and a right click toggles the flag of a hidden tile
 
         Args:
-            tile: Tile that was clicked
-            button (str): The mouse button that was clicked
+            tile: Tile under the pointer, or None if it isn't over the tiles
+            button (str): The mouse button that was released
         """
-        if ((button == 'right' and self._is_left_clicked) or
+        # Nothing can be clicked until the race starts
+        if self.race is not None and not self.race.started:
+            self._is_left_clicked = False
+            self._is_right_clicked = False
+            self._is_middle_clicked = False
+            return
+        playable = tile is not None and not self._game_over
+        if (button == 'middle' or
+                (button == 'right' and self._is_left_clicked) or
                 (button == 'left' and self._is_right_clicked)):
             self.board_display.update_smiley_button('smiley')
-            if (tile.num_adjacent_mines ==
-                    self._board.count_num_adjacent_flags(tile) and
-                    not tile.is_hidden):
-                for i in range(-1, 2):
-                    for j in range(-1, 2):
-                        test_column = tile.column + i
-                        test_row = tile.row + j
-                        if self._game_over:
-                            break
-                        # Make sure that the tile is on the board
-                        if ((test_column < 0 or
-                             test_column >= self._board.columns) or
-                                (test_row < 0 or
-                                 test_row >= self._board.rows)):
-                            continue
-                        if i == 0 and j == 0:
-                            continue
-                        test_tile = str(test_column) + ',' + str(test_row)
-                        new_tile = self._board.tiles[test_tile]
-                        self._select_tile(tile=new_tile, recursive_check=True)
+            if playable and tile.state == UNCOVERED:
+                self._count_click(tile)
+                self._apply_changes(self._board.chord(
+                    tile, on_mismatch=self._chord_policy))
 
             # Reset the button clicked flags
             self._is_left_clicked = False
             self._is_right_clicked = False
-        else:
-            if button == 'right':
-                self._is_right_clicked = False
-                if tile.is_hidden:
-                    self._update_flag(tile)
-            elif button == 'left':
-                self._is_left_clicked = False
-                self.board_display.update_smiley_button('smiley')
-                if tile.is_hidden:
-                    self._select_tile(tile=tile, recursive_check=True)
+            self._is_middle_clicked = False
+        elif button == 'right':
+            self._is_right_clicked = False
+            if playable and tile.is_hidden:
+                self._count_click(tile)
+                self._update_flag(tile)
+        elif button == 'left':
+            self._set_button_unclicked('left')
+            if playable and tile.state == BLANK:
+                self._count_click(tile)
+                self._select_tile(tile)
+
+    def _show_hint(self, _=None):
+        """Solves the position in a worker thread and highlights the tile to
+        reveal next: a safe tile if there is one, otherwise the tile least
+        likely to have a mine"""
+        if (self._is_first_tile or self._game_over or
+                (self._hint_task is not None and self._hint_task.pending)):
+            return
+        board = self._board
+        if self._solver is None:
+            num_tiles = board.columns * board.rows
+            self._solver = Solver(
+                columns=board.columns, rows=board.rows, mines=board.mines,
+                processes=None if num_tiles >= SOLVER_POOL_TILES else 0)
+        self._hint_task = self._app.scheduler.run_in_thread(
+            functools.partial(self._solver.hint, board_state(board)),
+            on_done=self._highlight_hint)
+
+    def _highlight_hint(self, index):
+        """Highlights the tile suggested by a hint, if it's still hidden
+
+        Args:
+            index (int): Flat index of the tile, or None if no tile is hidden
+        """
+        self._hint_task = None
+        if index is None or self._closing_game or self._game_over:
+            return
+        tile = self._board.tile_list[index]
+        if tile.state == BLANK:
+            self.board_display.set_tile_color(tile, bg_color=HINT_COLOR)
+
+    def _count_click(self, tile):
+        """Counts a click on the board for the efficiency metrics and records
+        it for the click heatmaps
 
+        Args:
+            tile: Tile that was clicked
+        """
+        if self._clicks is not None:
+            self._clicks += 1
+        if self._move_log is not None:
+            self._move_log.add_move(self._board.index(tile))
+
+    @traced(LOGIC)
     def _update_flag(self, tile):
         """Add a flag to a tile, or remove it if there's already one there
 
@@ -587,8 +810,9 @@ class Game():
             logging.debug(f'There are now {self._board.num_mines_left} mines '
                           f'left to clear')
             self._update_mine_counter_display(self._board.num_mines_left)
-            tile.button_type = 'flag'
             self._update_button(tile)
+            self._autosave([tile])
+            self._report_race_progress()
 
         elif tile.is_flag_set:
             logging.debug(f'Removing the flag from the tile at column '
@@ -598,55 +822,118 @@ class Game():
             logging.debug(f'There are now {self._board.num_mines_left} mines '
                           f'left to clear')
             self._update_mine_counter_display(self._board.num_mines_left)
-            tile.button_type = 'blank'
             self._update_button(tile)
+            self._autosave([tile])
+            self._report_race_progress()
 
-    def _select_tile(self, *, tile, recursive_check):
+    @traced(LOGIC)
+    def _select_tile(self, tile):
         """Check a tile and see if it was hiding a mine
 
         Args:
             tile: Tile that was selected
-            recursive_check (bool): If a recursive check should be run
         """
         if self._is_first_tile:
             logging.debug('The first tile of the game was selected, now '
                           'setting all the mines')
             self._start_game_timer()
-            self._board.set_the_mines(tile)
+            self._board.set_the_mines(tile, layout=self._layout)
+            self._layout = None
             self._is_first_tile = False
+            if self._move_log is not None:
+                self._move_log.first_index = self._board.index(tile)
             # Update the database with the game info
             self._update_database()
-            # Start the timer display
-            self._timer_thread = threading.Thread(target=
-                                                  self._update_timer_display)
-            self._timer_thread.daemon = True
-            self._timer_thread.start()
-            logging.info(f'Started timer thread: {self._timer_thread}')
-
-        if tile.is_mine and not tile.is_flag_set:
+            # A race can't be resumed, so it isn't saved
+            if (self.race is None and
+                    self._app.claim_save_file(self, self._game_level)):
+                self._save_file = SaveFile.create(save_path(self._game_level),
+                                                  board=self._board,
+                                                  db_id=self._db_id,
+                                                  day=self._challenge_day)
+            self._schedule_timer_update()
+
+        if TRACER.enabled:
+            TRACER.instant('tile selected', LOGIC, column=tile.column,
+                           row=tile.row)
+        self._apply_changes(self._board.reveal_tiles([tile]))
+
+    @traced(LOGIC)
+    def _apply_changes(self, changes):
+        """Shows the tiles revealed by a move and ends the game if a mine
+        was revealed or all the non-mine tiles have been cleared. Large
+        reveals are shown in slices on the event loop
+
+        Args:
+            changes (ChangeSet): Changes caused by the move
+        """
+        if (len(changes.revealed) <= MAX_SYNC_RENDER and
+                not any(task.pending for task in self._tasks)):
+            for tile in changes.revealed:
+                self._render_revealed_tile(tile)
+        else:
+            self._spawn(self._render_revealed_tiles(changes.revealed))
+        self._autosave(changes.revealed)
+
+        if changes.exploded_tile is not None:
             self._game_won = False
-            self._show_game_over(tile)
-        elif not tile.is_mine:
-            logging.debug(f'Selecting the tile at column {tile.column}, row '
-                          f'{tile.row}')
-            tile.is_hidden = False
-            if tile.num_adjacent_mines is None:
-                tile.disable_button(self.board_display.root)
-                tile.set_button_color(bg_color="gray95")
-            else:
-                tile.button_type = 'uncovered'
-                self._update_button(tile)
+            if self._move_log is not None:
+                self._move_log.exploded_index = self._board.index(
+                    changes.exploded_tile)
+            self._show_game_over(changes.exploded_tile)
+        elif changes.all_cleared and not self._game_over:
+            self._game_won = True
+            self._show_game_over()
+        self._report_race_progress()
+
+    def _spawn(self, generator, **kwargs):
+        """Starts a task on the app's scheduler which is cancelled if the
+        board is closed
 
-            # Check if all the non-mine tiles have been cleared
-            if (self._board.check_if_all_tiles_cleared() and not
-                    self._game_over):
-                self._game_won = True
-                self._show_game_over()
-            # Run the recursive check if there aren't any adjacent mines
-            # Need to ensure that we aren't already running the recursive check
-            if recursive_check and tile.num_adjacent_mines is None:
-                self._empty_tile_recursive_check(tile)
+        Args:
+            generator: Generator doing the work in steps
+            **kwargs: Other Scheduler.spawn arguments
+        """
+        self._tasks = [task for task in self._tasks if task.pending]
+        self._tasks.append(self._app.scheduler.spawn(generator, **kwargs))
 
+    def _render_revealed_tile(self, tile):
+        """Shows a tile that was uncovered
+
+        Args:
+            tile: Tile that was uncovered
+        """
+        if tile.num_adjacent_mines is None:
+            self.board_display.disable_tile_button(tile)
+            self.board_display.set_tile_color(tile, bg_color="gray95")
+        else:
+            self._update_button(tile)
+
+    def _render_revealed_tiles(self, tiles):
+        """Shows the uncovered tiles one at a time
+
+        Args:
+            tiles (list): Tiles that were uncovered
+        Yields:
+            float: Fraction of the tiles shown
+        """
+        for count, tile in enumerate(tiles, 1):
+            self._render_revealed_tile(tile)
+            yield count / len(tiles)
+
+    def _show_progress(self, progress=None):
+        """Shows the progress of a long update in the board's title
+
+        Args:
+            progress (float): Fraction of the work done. Defaults to None in
+                which case the plain title is shown
+        """
+        if progress is None:
+            self.board_display.root.title('Minesweeper')
+        else:
+            self.board_display.root.title(f'Minesweeper ({progress:.0%})')
+
+    @traced(LOGIC)
     def _show_game_over(self, exploded_tile=None):
         """Create the display for when the game is over
 
@@ -657,6 +944,10 @@ class Game():
         # First, end the game timer
         self._end_game_timer()
         self._game_over = True
+        # A finished game can't be resumed
+        if self._save_file is not None:
+            self._save_file.delete()
+            self._save_file = None
 
         if self._game_won:
             logging.info('Congrats! You safely cleared all the mines!')
@@ -668,39 +959,59 @@ class Game():
                                 display_time=self.game_run_time)
             logging.info('Sorry, you exploded. Better luck next time!')
 
-        # Disable all the tiles
-        for tile in self._board.tiles.values():
+        # Show every tile in slices, and count the board's 3BV for the
+        # database in the background meanwhile
+        self._spawn(self._reveal_board(exploded_tile),
+                    on_progress=self._show_progress,
+                    on_done=self._show_progress)
+        self._three_bv_task = self._app.scheduler.run_in_thread(
+            self._board.count_three_bv, on_done=self._record_game_result)
+
+    def _reveal_board(self, exploded_tile):
+        """Disables every tile and shows the mines and wrong flags
+
+        Args:
+            exploded_tile: Tile object with the revealed mine, or None if the
+                game was won
+        Yields:
+            float: Fraction of the tiles shown
+        """
+        board_display = self.board_display
+        tile_list = self._board.tile_list
+        for count, tile in enumerate(tile_list, 1):
+            label = board_display.disable_tile_button(tile)
             if tile.is_mine:
                 if self._game_won:
-                    tile.disable_button(self.board_display.root)
-                    tile.button.configure(image=self._photo_flag)
-                elif (exploded_tile is not None and
-                        (tile.position['x'] == exploded_tile.position['x']) and
-                        (tile.position['y'] == exploded_tile.position['y'])):
-                    tile.disable_button(self.board_display.root)
-                    tile.button.configure(image=self._photo_exploded_mine)
+                    label.configure(image=self._photo_flag)
+                elif tile is exploded_tile:
+                    label.configure(image=self._photo_exploded_mine)
                 else:
-                    tile.disable_button(self.board_display.root)
-                    tile.button.configure(image=self._photo_mine)
-                tile.set_button_color(bg_color='gray95')
+                    label.configure(image=self._photo_mine)
+                board_display.set_tile_color(tile, bg_color='gray95')
             else:
-                tile.disable_button(self.board_display.root)
-                tile.button.configure(text=tile.num_adjacent_mines,
-                                      font=('helvetica', 14))
-                tile.set_button_color(bg_color='gray95',
-                                      fg_color=NUMBER_COLORS[tile.num_adjacent_mines])
+                label.configure(text=tile.num_adjacent_mines,
+                                font=('helvetica', 14))
+                board_display.set_tile_color(
+                    tile, bg_color='gray95',
+                    fg_color=NUMBER_COLORS[tile.num_adjacent_mines])
                 if tile.is_flag_set:
-                    tile.button.configure(image=self._photo_wrong_mine)
+                    label.configure(image=self._photo_wrong_mine)
+            yield count / len(tile_list)
 
-        # Then update the database
+    def _record_game_result(self, three_bv):
+        """Updates the database with the result of the finished game
+
+        Args:
+            three_bv (int): 3BV of the board
+        """
+        self._three_bv = three_bv
+        self._three_bv_task = None
         self._update_database()
 
     def _restart_game(self):
         """Restars the game and resets the board"""
         self.restart_game_flag = True
-        # Delete the whole display so the main thread can create a new one.
-        # Due to Tkinter threading specifications, each instance of the game
-        # needs to be started from the main thread.
+        # Close the board, the app then opens a new one in its place
         logging.info('Closing the window and starting another game')
         self._close_window()
 
@@ -718,25 +1029,17 @@ class Game():
         logging.info(f'The game lasted {self.game_run_time} seconds')
 
 
-def create_tables():
-    """Creates the database and the tables, if they haven't already
-    been created"""
-    conn = sqlite3.connect('minesweeper.db')
-
-    # Create the tables if they don't exist
-    conn.execute("""CREATE TABLE IF NOT EXISTS play_history (
-                        id integer PRIMARY KEY NOT NULL,
-                        level text NOT NULL,
-                        game_won int,
-                        game_run_time int,
-                        finished int NOT NULL,
-                        start_time text NOT NULL,
-                        end_time text);""")
-
-    conn.execute("""CREATE TABLE IF NOT EXISTS fastest_times (
-                        id integer PRIMARY KEY NOT NULL,
-                        level text NOT NULL,
-                        game_run_time int NOT NULL,
-                        username text NOT NULL);""")
-    conn.commit()
-    conn.close()
+def leaderboard_level(level, day=None):
+    """Returns the level used for the fastest times table. Each daily
+    challenge gets its own leaderboard
+
+    Args:
+        level (str): The difficulty level of the game
+        day (date): Day of the daily challenge. Defaults to None in which
+            case the current UTC day is used
+    Returns:
+        str: Level of the leaderboard
+    """
+    if level == 'daily':
+        return f'daily-{(day or today()).isoformat()}'
+    return level
@@ -0,0 +1,196 @@
+"""
+Module with the click heatmaps of each level: where the games were started,
+where they were lost, and how long the players thought before a move on each
+tile.
+
+Every finished game adds its moves to per-level accumulators in the heatmaps
+table: the number of first clicks, explosions, and moves on each tile and the
+seconds spent before the moves on each tile. They are stored as compact
+little-endian arrays in flat index order, column * rows + row, so showing a
+heatmap reads one row however many games were played.
+
+The first clicks and explosions are normalized by the board geometry: a
+value of 1 means the tile was chosen as often as a uniformly random tile
+would be, so the heatmaps of differently sized levels are comparable. The
+think time is the mean number of seconds before a move on the tile.
+
+NumPy is an optional dependency of the game. Without it no heatmaps are
+recorded or shown.
+"""
+
+import time
+from storage import immediate_transaction
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Heatmaps of a level, in the order they are shown
+HEATMAP_KINDS = ('first_clicks', 'explosions', 'think_time')
+# Data types of the stored accumulators
+COUNT_DTYPE = '<i4'
+TIME_DTYPE = '<f8'
+# Colors of the coolest and hottest tiles
+COLD_COLOR = (255, 255, 255)
+HOT_COLOR = (200, 0, 0)
+
+
+class MoveLog():
+    """Class that records the moves of a game for the heatmaps"""
+    def __init__(self):
+        """Initializes an empty MoveLog object. The think time of the first
+        move is counted from now"""
+        # (flat index, seconds since the previous move) tuples
+        self.moves = []
+        # Flat index of the first revealed tile, None for a resumed game
+        self.first_index = None
+        # Flat index of the revealed mine, None unless the game was lost
+        self.exploded_index = None
+        self._last_move_time = time.time()
+
+    def add_move(self, index):
+        """Records a move
+
+        Args:
+            index (int): Flat index of the tile that was clicked
+        """
+        now = time.time()
+        self.moves.append((index, now - self._last_move_time))
+        self._last_move_time = now
+
+
+def _empty_accumulators(num_tiles):
+    """Returns zeroed accumulators for a board
+
+    Args:
+        num_tiles (int): Number of tiles on the board
+    Returns:
+        dict: Accumulator arrays keyed by column name
+    """
+    return {'first_clicks': np.zeros(num_tiles, dtype=COUNT_DTYPE),
+            'explosions': np.zeros(num_tiles, dtype=COUNT_DTYPE),
+            'moves': np.zeros(num_tiles, dtype=COUNT_DTYPE),
+            'think_time': np.zeros(num_tiles, dtype=TIME_DTYPE)}
+
+
+def _load_accumulators(conn, level):
+    """Reads the accumulators of a level
+
+    Args:
+        conn: sqlite3 connection object
+        level (str): The difficulty level
+    Returns:
+        tuple: The columns, rows, games, and lost games of the level and the
+            accumulator arrays keyed by column name, or None if no game was
+            recorded
+    """
+    row = conn.execute("""SELECT columns, rows, games, lost, first_clicks,
+                                 explosions, moves, think_time
+                          FROM heatmaps WHERE level = ?""",
+                       (level,)).fetchone()
+    if row is None:
+        return None
+    columns, rows, games, lost, *blobs = row
+    dtypes = (COUNT_DTYPE, COUNT_DTYPE, COUNT_DTYPE, TIME_DTYPE)
+    arrays = {name: np.frombuffer(blob, dtype=dtype)
+              for name, blob, dtype in zip(
+                  ('first_clicks', 'explosions', 'moves', 'think_time'),
+                  blobs, dtypes)}
+    return columns, rows, games, lost, arrays
+
+
+def record_game(conn, *, level, board, move_log):
+    """Adds the moves of a finished game to the level's heatmaps
+
+    Args:
+        conn: sqlite3 connection object
+        level (str): The difficulty level of the game
+        board (Board): Board the game was played on
+        move_log (MoveLog): Moves of the game
+    Raises:
+        ImportError: If NumPy isn't installed
+        ValueError: If the level was recorded with another board size
+    """
+    if np is None:
+        raise ImportError('The heatmaps require NumPy')
+    columns, rows = board.columns, board.rows
+    with immediate_transaction(conn):
+        stored = _load_accumulators(conn, level)
+        if stored is None:
+            games = lost = 0
+            arrays = _empty_accumulators(columns * rows)
+        elif stored[:2] != (columns, rows):
+            raise ValueError(f'The {level} heatmaps are for another board '
+                             f'size')
+        else:
+            _, _, games, lost, arrays = stored
+            arrays = {name: array.copy() for name, array in arrays.items()}
+        if move_log.moves:
+            indices, think_times = (np.array(values)
+                                    for values in zip(*move_log.moves))
+            np.add.at(arrays['moves'], indices, 1)
+            np.add.at(arrays['think_time'], indices, think_times)
+        if move_log.first_index is not None:
+            arrays['first_clicks'][move_log.first_index] += 1
+        if move_log.exploded_index is not None:
+            arrays['explosions'][move_log.exploded_index] += 1
+            lost += 1
+        conn.execute("""INSERT OR REPLACE INTO heatmaps
+                        VALUES (?,?,?,?,?,?,?,?,?)""",
+                     (level, columns, rows, games + 1, lost,
+                      arrays['first_clicks'].tobytes(),
+                      arrays['explosions'].tobytes(),
+                      arrays['moves'].tobytes(),
+                      arrays['think_time'].tobytes()))
+
+
+def load_heatmaps(conn, *, level):
+    """Computes the heatmaps of a level from its accumulators
+
+    Args:
+        conn: sqlite3 connection object
+        level (str): The difficulty level
+    Returns:
+        tuple: The number of games recorded and the heatmaps keyed by
+            HEATMAP_KINDS, each an array of shape (rows, columns), or None
+            if no game was recorded
+    Raises:
+        ImportError: If NumPy isn't installed
+    """
+    if np is None:
+        raise ImportError('The heatmaps require NumPy')
+    stored = _load_accumulators(conn, level)
+    if stored is None:
+        return None
+    columns, rows, games, lost, arrays = stored
+    num_tiles = columns * rows
+    num_first_clicks = arrays['first_clicks'].sum()
+    heatmaps = {
+        'first_clicks': arrays['first_clicks'] * (
+            num_tiles / num_first_clicks if num_first_clicks else 0.0),
+        'explosions': arrays['explosions'] * (num_tiles / lost if lost
+                                              else 0.0),
+        'think_time': np.divide(arrays['think_time'], arrays['moves'],
+                                out=np.zeros(num_tiles),
+                                where=arrays['moves'] > 0)}
+    # Flat indices go down the columns, the heatmaps are shown row by row
+    return games, {kind: heatmap.reshape((columns, rows)).T
+                   for kind, heatmap in heatmaps.items()}
+
+
+def heat_colors(heatmap):
+    """Returns the color of every tile of a heatmap, scaled from COLD_COLOR
+    for 0 to HOT_COLOR for the hottest tile
+
+    Args:
+        heatmap (ndarray): Array of shape (rows, columns)
+    Returns:
+        list: Rows of Tk color strings
+    """
+    peak = heatmap.max()
+    heat = heatmap / peak if peak > 0 else np.zeros(heatmap.shape)
+    cold = np.array(COLD_COLOR)
+    rgb = np.rint(cold + heat[..., None] * (np.array(HOT_COLOR) - cold))
+    return [[f'#{red:02x}{green:02x}{blue:02x}'
+             for red, green, blue in row] for row in rgb.astype(int).tolist()]
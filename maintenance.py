@@ -0,0 +1,265 @@
+"""
+Database maintenance that keeps the database of a machine played on for
+years small and its statistics quick to query.
+
+Games that started before the retention period, and unfinished games that
+were abandoned for ABANDONED_DAYS, are:
+
+    rolled up     into one play_history_daily row per day and level
+    archived      as JSON lines appended to a gzip-compressed side file
+    deleted       from play_history
+
+all in one transaction, except for the archive which is written first. The
+size of the archive is recorded in the same transaction, so the games
+archived by a roll up that was interrupted before it committed are cut off
+the archive by the next one instead of being archived twice. The games of
+the save files that can still be resumed are kept. The pages freed
+by the deleted rows are then returned to the file system with an incremental
+vacuum, after a one-time full vacuum that converts an older database to
+incremental auto vacuum.
+
+The game runs the maintenance in the background when it starts, at most once
+every MAINTENANCE_INTERVAL. It can also be run by hand:
+
+    python maintenance.py --retention-days 90
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from minesweeper_details import LEVEL_INFO
+from save_game import SaveFile, SaveFileError, save_path
+from storage import (DATABASE_PATH, create_tables, get_setting,
+                     immediate_transaction, play_stats, set_setting)
+
+# Days the individual games are kept for
+RETENTION_DAYS = 365
+# Days after which an unfinished game that can't be resumed is abandoned
+ABANDONED_DAYS = 7
+# Seconds between the automatic maintenance runs
+MAINTENANCE_INTERVAL = 24 * 60 * 60
+# File the rolled up games are archived to
+ARCHIVE_PATH = 'play_history_archive.jsonl.gz'
+# Value of PRAGMA auto_vacuum for incremental auto vacuum
+INCREMENTAL_AUTO_VACUUM = 2
+
+
+def saved_game_ids():
+    """Returns the play_history ids of the games that can still be resumed
+
+    Returns:
+        list: Ids of the games with a save file
+    """
+    ids = []
+    for level in LEVEL_INFO:
+        if not os.path.exists(save_path(level)):
+            continue
+        try:
+            save_file = SaveFile(save_path(level))
+        except (OSError, SaveFileError):
+            continue
+        if save_file.db_id:
+            ids.append(save_file.db_id)
+        save_file.close()
+    return ids
+
+
+def cutoff(now, days):
+    """Returns the start time before which games are rolled up, in the
+    format the start times are stored in
+
+    Args:
+        now (float): Current time as a timestamp
+        days (int): Number of days before now
+    Returns:
+        str: The cutoff start time
+    """
+    return str(datetime.fromtimestamp(now - days * 24 * 60 * 60,
+                                      timezone.utc))
+
+
+def _truncate_archive(conn, archive_path):
+    """Cuts the games archived by an interrupted roll up off the archive
+
+    Args:
+        conn: sqlite3 connection object in the roll up's transaction
+        archive_path (str): Path of the gzip-compressed archive
+    Returns:
+        str: Name of the setting that holds the archive's committed size
+    """
+    setting = f'archive_size:{os.path.abspath(archive_path)}'
+    size = get_setting(conn, setting)
+    if (size is not None and os.path.exists(archive_path) and
+            os.path.getsize(archive_path) > int(size)):
+        logging.warning('Removing the games archived by an interrupted '
+                        'maintenance from the archive')
+        # Every roll up appends a gzip member, so the archive stays valid
+        with open(archive_path, 'r+b') as archive:
+            archive.truncate(int(size))
+    return setting
+
+
+def roll_up_games(conn, *, before, abandoned_before, archive_path,
+                  keep_ids=()):
+    """Rolls up, archives, and deletes the old and abandoned games
+
+    Args:
+        conn: sqlite3 connection object
+        before (str): Start time before which every game is rolled up
+        abandoned_before (str): Start time before which unfinished games are
+            rolled up
+        archive_path (str): Path of the gzip-compressed archive
+        keep_ids (iterable): Ids of games that are kept regardless. Defaults
+            to an empty tuple
+    Returns:
+        int: Number of games rolled up
+    """
+    keep_ids = list(keep_ids)
+    condition = (f'id NOT IN ({",".join("?" * len(keep_ids))}) AND '
+                 f'(start_time < ? OR (finished = 0 AND start_time < ?))')
+    parameters = (*keep_ids, before, abandoned_before)
+    with immediate_transaction(conn):
+        cur = conn.execute(f'SELECT * FROM play_history WHERE {condition} '
+                           f'ORDER BY id', parameters)
+        columns = [description[0] for description in cur.description]
+        rows = cur.fetchall()
+        if not rows:
+            return 0
+        # The archive is written before the rows are deleted, so a failure
+        # leaves the games in the database
+        setting = _truncate_archive(conn, archive_path)
+        with gzip.open(archive_path, 'at', encoding='utf-8') as archive:
+            for row in rows:
+                archive.write(json.dumps(dict(zip(columns, row))) + '\n')
+        # set_setting commits, the size is only recorded with the deletes
+        conn.execute("""INSERT INTO settings(name, value) VALUES (?,?)
+                        ON CONFLICT(name) DO UPDATE SET
+                            value = excluded.value""",
+                     (setting, str(os.path.getsize(archive_path))))
+        conn.execute(f"""INSERT INTO play_history_daily
+                         SELECT substr(start_time, 1, 10), level, COUNT(*),
+                                COALESCE(SUM(game_won), 0), SUM(finished),
+                                COALESCE(SUM(game_run_time), 0),
+                                MIN(CASE WHEN game_won
+                                    THEN game_run_time END),
+                                COALESCE(SUM(three_bv), 0),
+                                COALESCE(SUM(clicks), 0)
+                         FROM play_history WHERE {condition}
+                         GROUP BY substr(start_time, 1, 10), level
+                         ON CONFLICT(day, level) DO UPDATE SET
+                             games = games + excluded.games,
+                             won = won + excluded.won,
+                             finished = finished + excluded.finished,
+                             total_run_time = total_run_time +
+                                              excluded.total_run_time,
+                             best_run_time = MIN(
+                                 COALESCE(best_run_time,
+                                          excluded.best_run_time),
+                                 COALESCE(excluded.best_run_time,
+                                          best_run_time)),
+                             total_three_bv = total_three_bv +
+                                              excluded.total_three_bv,
+                             total_clicks = total_clicks +
+                                            excluded.total_clicks""",
+                     parameters)
+        conn.execute(f'DELETE FROM play_history WHERE {condition}',
+                     parameters)
+    logging.info(f'Rolled up and archived {len(rows)} games')
+    return len(rows)
+
+
+def vacuum(conn, *, full=False):
+    """Returns the free pages of the database to the file system. A database
+    that doesn't use incremental auto vacuum yet is converted with a full
+    vacuum
+
+    Args:
+        conn: sqlite3 connection object
+        full (bool): If a full vacuum should be run regardless. Defaults to
+            False
+    """
+    if conn.in_transaction:
+        conn.commit()
+    auto_vacuum = conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+    if full or auto_vacuum != INCREMENTAL_AUTO_VACUUM:
+        logging.info('Running a full vacuum of the database')
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM')
+    else:
+        # Every step of the pragma frees one page, and executescript steps
+        # it until every free page is returned
+        conn.executescript('PRAGMA incremental_vacuum;')
+
+
+def run_maintenance(path=DATABASE_PATH, *, now=None, force=False,
+                    retention_days=RETENTION_DAYS,
+                    archive_path=ARCHIVE_PATH):
+    """Runs the maintenance if it hasn't run in the last
+    MAINTENANCE_INTERVAL. Opens its own connection, so it can run in a
+    worker thread
+
+    Args:
+        path (str): Path of the database file. Defaults to DATABASE_PATH
+        now (float): Current time as a timestamp. Defaults to None in which
+            case the current time is used
+        force (bool): If the maintenance should run even if it isn't due.
+            Defaults to False
+        retention_days (int): Days the individual games are kept for.
+            Defaults to RETENTION_DAYS
+        archive_path (str): Path of the archive. Defaults to ARCHIVE_PATH
+    Returns:
+        int: Number of games rolled up, or None if the maintenance wasn't due
+    """
+    now = time.time() if now is None else now
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        create_tables(conn)
+        last_run = get_setting(conn, 'last_maintenance')
+        if (not force and last_run is not None and
+                now - float(last_run) < MAINTENANCE_INTERVAL):
+            return None
+        num_games = roll_up_games(
+            conn, before=cutoff(now, retention_days),
+            abandoned_before=cutoff(now, min(ABANDONED_DAYS, retention_days)),
+            archive_path=archive_path, keep_ids=saved_game_ids())
+        vacuum(conn)
+        set_setting(conn, 'last_maintenance', str(now))
+        return num_games
+    finally:
+        conn.close()
+
+
+def main():
+    """Parses the command line arguments and runs the maintenance"""
+    parser = argparse.ArgumentParser(description='Minesweeper database '
+                                                 'maintenance')
+    parser.add_argument('--database', default=DATABASE_PATH)
+    parser.add_argument('--retention-days', type=int, default=RETENTION_DAYS)
+    parser.add_argument('--archive', default=ARCHIVE_PATH)
+    parser.add_argument('--full-vacuum', action='store_true',
+                        help='rebuild the whole database file')
+    args = parser.parse_args()
+    logging.basicConfig(
+        format='[%(asctime)s] %(levelname)s : %(funcName)s() - %(message)s',
+        level=logging.INFO)
+    run_maintenance(args.database, force=True,
+                    retention_days=args.retention_days,
+                    archive_path=args.archive)
+    conn = sqlite3.connect(args.database)
+    if args.full_vacuum:
+        vacuum(conn, full=True)
+    for level in LEVEL_INFO:
+        games, won, best_run_time = play_stats(conn, level=level)
+        logging.info(f'{level}: {games} games, {won} won, fastest win: '
+                     f'{best_run_time}')
+    conn.close()
+    logging.info(f'The database is {os.path.getsize(args.database)} bytes')
+    logging.shutdown()
+
+if __name__ == '__main__':
+    main()
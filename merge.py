@@ -0,0 +1,188 @@
+"""
+Merges the play history and fastest times of the databases of other machines
+into one database, for example to combine the leaderboards of several kiosks.
+
+The source databases are attached to the target connection ATTACH_BATCH at a
+time and each table is copied with one INSERT ... SELECT over the UNION ALL
+of the attached sources, so every source is read once by set-based SQL and
+nothing is copied row by row in Python. Games and fastest times are
+identified by their UUID, and the unique indexes on it make INSERT OR IGNORE
+skip the rows merged before, so merging the same databases again doesn't add
+duplicates. Only completed fastest times are merged, and each level's
+leaderboard is trimmed back to its NUM_FASTEST_TIMES fastest times at the
+end.
+
+A source is first opened on its own so that an older database gets the
+current columns and the UUIDs of its rows, the same as when a game opens it.
+The daily roll ups of the maintenance aren't merged since they can't be told
+apart by UUID.
+
+    python merge.py combined.db kiosk1.db kiosk2.db ...
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import time
+from storage import NUM_FASTEST_TIMES, create_tables, immediate_transaction
+
+# Number of sources attached at once. SQLite allows 10 attached databases by
+# default
+ATTACH_BATCH = 8
+
+
+def table_columns(conn, table):
+    """Returns the columns of a table other than its id
+
+    Args:
+        conn: sqlite3 connection object
+        table (str): Name of the table
+    Returns:
+        list: Names of the columns
+    """
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({table})')
+            if row[1] != 'id']
+
+
+def prepare_source(path):
+    """Brings a source database up to the current schema
+
+    Args:
+        path (str): Path of the source database
+    """
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        create_tables(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _merge_attached(conn, schemas):
+    """Copies the new games and completed fastest times of the attached
+    sources into the main database
+
+    Args:
+        conn: sqlite3 connection object with the sources attached
+        schemas (list): Schema names the sources are attached as
+    Returns:
+        int: Number of games added
+    """
+    columns = ', '.join(table_columns(conn, 'play_history'))
+    sources = ' UNION ALL '.join(
+        f'SELECT * FROM (SELECT {columns} FROM {schema}.play_history '
+        f'ORDER BY id)' for schema in schemas)
+    num_games = conn.execute(f'INSERT OR IGNORE INTO play_history({columns}) '
+                             f'{sources}').rowcount
+    # Only the times that beat the slowest time of a full leaderboard are
+    # copied, otherwise the times trimmed by an earlier merge would come
+    # back and, being newer, rank above the equal times
+    columns = ', '.join(table_columns(conn, 'fastest_times'))
+    sources = ' UNION ALL '.join(
+        f"""SELECT * FROM (
+                SELECT {columns} FROM {schema}.fastest_times AS source
+                WHERE pending = 0 AND game_run_time < COALESCE(
+                    (SELECT game_run_time FROM main.fastest_times AS entry
+                     WHERE entry.level = source.level AND entry.pending = 0
+                     ORDER BY game_run_time, id DESC
+                     LIMIT 1 OFFSET {NUM_FASTEST_TIMES - 1}),
+                    game_run_time + 1)
+                ORDER BY id)""" for schema in schemas)
+    conn.execute(f'INSERT OR IGNORE INTO fastest_times({columns}) {sources}')
+    return num_games
+
+
+def trim_fastest_times(conn):
+    """Deletes the completed fastest times that don't rank in the top
+    NUM_FASTEST_TIMES of their level
+
+    Args:
+        conn: sqlite3 connection object
+    Returns:
+        int: Number of fastest times deleted
+    """
+    cur = conn.execute("""DELETE FROM fastest_times WHERE id IN (
+                              SELECT id FROM (
+                                  SELECT id, ROW_NUMBER() OVER (
+                                      PARTITION BY level
+                                      ORDER BY game_run_time, id DESC)
+                                      AS rank
+                                  FROM fastest_times WHERE pending = 0)
+                              WHERE rank > ?)""", (NUM_FASTEST_TIMES,))
+    return cur.rowcount
+
+
+def merge_databases(conn, source_paths, *, batch_size=ATTACH_BATCH):
+    """Merges the play history and fastest times of the source databases
+    into a database
+
+    Args:
+        conn: sqlite3 connection object of the target database
+        source_paths (iterable): Paths of the source databases
+        batch_size (int): Number of sources attached at once. Defaults to
+            ATTACH_BATCH
+    Returns:
+        tuple: Number of games added, and number of fastest times added that
+            rank in the top NUM_FASTEST_TIMES of their level
+    """
+    create_tables(conn)
+    conn.commit()
+    last_id = conn.execute(
+        'SELECT COALESCE(MAX(id), 0) FROM fastest_times').fetchone()[0]
+    paths = []
+    for path in source_paths:
+        if not os.path.exists(path):
+            logging.warning(f'Skipping the missing database {path}')
+            continue
+        prepare_source(path)
+        paths.append(path)
+
+    num_games = 0
+    for start in range(0, len(paths), batch_size):
+        batch = paths[start:start + batch_size]
+        schemas = [f'source{number}' for number in range(len(batch))]
+        # Databases can't be attached inside a transaction
+        for schema, path in zip(schemas, batch):
+            conn.execute('ATTACH DATABASE ? AS ' + schema, (path,))
+        try:
+            with immediate_transaction(conn):
+                num_games += _merge_attached(conn, schemas)
+        finally:
+            for schema in schemas:
+                conn.execute('DETACH DATABASE ' + schema)
+
+    # Times that were trimmed before are copied again, and dropped again here
+    with immediate_transaction(conn):
+        num_trimmed = trim_fastest_times(conn)
+        num_times = conn.execute("SELECT COUNT(*) FROM fastest_times "
+                                 "WHERE id > ? AND pending = 0",
+                                 (last_id,)).fetchone()[0]
+    logging.info(f'Merged {len(paths)} databases: {num_games} new games and '
+                 f'{num_times} new fastest times, {num_trimmed} fastest '
+                 f'times no longer rank')
+    return num_games, num_times
+
+
+def main():
+    """Parses the command line arguments and runs the merge"""
+    parser = argparse.ArgumentParser(description='Merges Minesweeper '
+                                                 'databases')
+    parser.add_argument('target', help='database the games are merged into')
+    parser.add_argument('sources', nargs='+', help='databases to merge')
+    args = parser.parse_args()
+    logging.basicConfig(
+        format='[%(asctime)s] %(levelname)s : %(funcName)s() - %(message)s',
+        level=logging.INFO)
+    start_time = time.perf_counter()
+    conn = sqlite3.connect(args.target, timeout=30)
+    try:
+        merge_databases(conn, args.sources)
+    finally:
+        conn.close()
+    logging.info(f'The merge took {time.perf_counter() - start_time:.2f} '
+                 f'seconds')
+    logging.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Module with the board difficulty and player efficiency metrics.
+
+The 3BV (Bechtel's Board Benchmark Value) of a board is the minimum number of
+left clicks needed to clear it: one click for each opening, which is a
+connected area of tiles without adjacent mines, and one click for each
+numbered tile that isn't on the border of an opening.
+
+The openings are labelled with a union-find over the flat tile indices. Each
+tile without adjacent mines is only joined with its neighbors that come
+before it in flat index order, so every neighbor list is walked once and the
+count takes linear time on any board size.
+"""
+
+from neighbors import neighbor_table
+
+
+def _find(parent, index):
+    """Returns the root of a tile's opening, halving the path on the way
+
+    Args:
+        parent (list): Parent of every flat index
+        index (int): Flat index of the tile
+    Returns:
+        int: Flat index of the opening's root
+    """
+    while parent[index] != index:
+        parent[index] = parent[parent[index]]
+        index = parent[index]
+    return index
+
+
+def _count_openings(table, is_mine, counts):
+    """Counts the openings of a board and marks the tiles they clear
+
+    Args:
+        table (NeighborTable): Neighbor table of the board
+        is_mine (bytearray): 1 for every tile with a mine, in flat index
+            order
+        counts (sequence): Number of adjacent mines of every tile, in flat
+            index order
+    Returns:
+        tuple: Number of openings, and a bytearray with 1 for every tile on
+            an opening or its border
+    """
+    offsets = table.offsets
+    indices = table.indices
+    num_tiles = len(is_mine)
+    parent = list(range(num_tiles))
+    bordered = bytearray(num_tiles)
+    num_openings = 0
+    for index in range(num_tiles):
+        if is_mine[index] or counts[index]:
+            continue
+        num_openings += 1
+        root = index
+        for neighbor in indices[offsets[index]:offsets[index + 1]]:
+            bordered[neighbor] = 1
+            if (neighbor < index and not counts[neighbor] and
+                    not is_mine[neighbor]):
+                neighbor_root = _find(parent, neighbor)
+                if neighbor_root != root:
+                    # Every merge joins two openings that were counted
+                    # separately
+                    num_openings -= 1
+                    if neighbor_root < root:
+                        parent[root] = neighbor_root
+                        root = neighbor_root
+                    else:
+                        parent[neighbor_root] = root
+    return num_openings, bordered
+
+
+def three_bv(*, columns, rows, mines, counts):
+    """Counts the minimum number of left clicks needed to clear a board
+
+    Args:
+        columns (int): Number of columns on the board
+        rows (int): Number of rows on the board
+        mines (iterable): Flat indices of the tiles with a mine
+        counts (sequence): Number of adjacent mines of every tile, in flat
+            index order
+    Returns:
+        int: The 3BV of the board
+    """
+    num_tiles = columns * rows
+    is_mine = bytearray(num_tiles)
+    for index in mines:
+        is_mine[index] = 1
+    # Tiles on an opening or its border are cleared by clicking the opening
+    num_openings, bordered = _count_openings(neighbor_table(columns, rows),
+                                             is_mine, counts)
+    # Numbered tiles away from every opening need a click of their own
+    return num_openings + sum(1 for index in range(num_tiles)
+                              if counts[index] and not is_mine[index] and
+                              not bordered[index])
+
+
+def efficiency(*, three_bv_value, clicks):
+    """Returns the percentage of the clicks that were needed to clear the
+    board
+
+    Args:
+        three_bv_value (int): 3BV of the board
+        clicks (int): Number of clicks made
+    Returns:
+        float: The efficiency, or None if no clicks were made
+    """
+    if not clicks:
+        return None
+    return 100 * three_bv_value / clicks
+
+
+def three_bv_per_second(*, three_bv_value, seconds):
+    """Returns how quickly a board was cleared relative to its difficulty
+
+    Args:
+        three_bv_value (int): 3BV of the board
+        seconds (float): Time it took to clear the board
+    Returns:
+        float: The 3BV per second, or None if no time passed
+    """
+    if seconds <= 0:
+        return None
+    return three_bv_value / seconds
@@ -2,51 +2,96 @@
 Minesweeper!
 """
 
+import argparse
 import logging
+import os
 import time
-from game import Game
-from minesweeper_displays import LevelChoiceDisplay
+from app import App
+from race import RaceClient
+from save_game import save_path
+from seeds import parse_seed
 
 
 def main():
     """Opens the level choice display which allows the user to choose a level
     and either play a game or check the leaderboard"""
-    restart_game = True
+    parser = argparse.ArgumentParser(description='Minesweeper!')
+    parser.add_argument('--seed', type=parse_seed,
+                        help='hex seed of a board to replay, as stored in '
+                             'the play_history table')
+    parser.add_argument('--race', metavar='HOST:PORT',
+                        help='join the race hosted by the race hub (see '
+                             'race.py) at this address')
+    parser.add_argument('--name', default='Player',
+                        help='name shown to the other racers')
+    args = parser.parse_args()
     logging.basicConfig(
         format='[%(asctime)s] %(levelname)s : %(funcName)s() - %(message)s',
         level=logging.INFO)
     program_start_time = time.time()
+    app = App()
 
-    # Create the level choice display
-    level_choice = LevelChoiceDisplay()
-    # Maintain the display; this will return when the window is closed
-    level_choice.root.mainloop()
+    if args.race:
+        race_game(app, args)
+        app.close()
+        logging.shutdown()
+        return
+
+    # Generate mine layouts in the background while a level is chosen, so
+    # the first click doesn't have to wait for them
+    if args.seed is None:
+        app.warm_up(('easy', 'medium', 'hard'))
+
+    # Show the level choice display; this returns when the window is closed
+    level_choice = app.choose_level()
+    app.stop_pools(keep=level_choice.level if level_choice.play_game
+                   else None)
 
     # If view leaderboard was chosen then show the top times
     if level_choice.level and level_choice.view_leaderboard:
-        view_board = Game(level_choice.level)
-        view_board.display_fastest_times()
+        app.show_fastest_times(level_choice.level)
+
+    # If view click heatmaps was chosen then show the heatmaps
+    elif level_choice.level and level_choice.view_heatmaps:
+        app.show_heatmaps(level_choice.level)
 
     # If play game was chosen then start a game
     elif level_choice.level and level_choice.play_game:
-        while restart_game:
-            # Force the restart game button to change the flag
-            restart_game = False
-            # Start the game
-            new_game = Game(level_choice.level)
-            new_game.start_game()
-            # Maintain the display; this will return when the window is closed
-            new_game.board_display.root.mainloop()
-            if new_game.restart_game_flag:
-                restart_game = True
-            if not new_game.game_run_time:
-                logging.info('The program was closed before the game finished')
+        # Resume the level's saved game if there is one. The daily
+        # challenge ignores the seed, so its saved game is resumed anyway
+        resume = ((args.seed is None or level_choice.level == 'daily') and
+                  os.path.exists(save_path(level_choice.level)))
+        app.start_game(level_choice.level, resume=resume, seed=args.seed)
+        # Run the event loop; this returns when the last board is closed
+        app.run()
 
+    app.close()
     program_end_time = time.time()
     program_run_time = program_end_time - program_start_time
     logging.debug(f'The program ran for {program_run_time:.3f} seconds')
     logging.info('Ending the program and shutting down the logger')
     logging.shutdown()
 
+def race_game(app, args):
+    """Joins a race and plays it until the board is closed
+
+    Args:
+        app (App): The application shell
+        args: Parsed command line arguments
+    """
+    host, _, port = args.race.rpartition(':')
+    race = RaceClient(host=host or '127.0.0.1', port=int(port),
+                      name=args.name)
+    try:
+        race.connect()
+    except ConnectionError as ex:
+        logging.error(f'Unable to join the race: {ex}')
+        return
+    try:
+        app.start_game(race.level, seed=race.seed, race=race)
+        app.run()
+    finally:
+        race.close()
+
 if __name__ == '__main__':
     main()
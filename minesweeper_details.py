@@ -44,8 +44,23 @@ HARD = {
     'display_height': TILE_SIZE * 16,
 }
 
+# The daily challenge is played on a medium sized board with a seed that is
+# derived from the date
+DAILY = dict(MEDIUM)
+
 LEVEL_INFO = {
     'easy': EASY,
     'medium': MEDIUM,
-    'hard': HARD
+    'hard': HARD,
+    'daily': DAILY
+}
+
+# Chunk details for the endless level. The board is split into square chunks
+# whose mines are generated from the world seed when a chunk is first touched
+ENDLESS = {
+    'chunk_size': 16,
+    'mines_per_chunk': 40,
+    'max_loaded_chunks': 256,
+    # Chunks a single reveal may flood fill into
+    'max_reveal_chunks': 64,
 }
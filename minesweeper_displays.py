@@ -5,9 +5,10 @@ Module with the class implementations for each of the displays
 import logging
 import random
 from sys import platform
-from tkinter import (Tk, Button, Label, Checkbutton, BooleanVar, PhotoImage,
-                     Toplevel, Entry, StringVar)
-from minesweeper_details import LEVEL_INFO, DISPLAY_OFFSET
+from tkinter import (Button, Canvas, Label, Checkbutton, BooleanVar,
+                     PhotoImage, Toplevel, Entry, StringVar)
+from minesweeper_details import LEVEL_INFO, DISPLAY_OFFSET, TILE_SIZE
+from tracing import RENDER, traced
 
 # Randomly chooses which bob-omb icon should be used for the displays
 if random.choice([True, False]):
@@ -22,34 +23,44 @@ else:
     FONT = 'Arial'
     TIMER_AND_COUNT_FONT = ('Stencil', 28)
 
+# Height of the race opponents line in the board display header
+OPPONENTS_HEIGHT = 20
+
 
 class LevelChoiceDisplay():
-    """Class for the display used to select a level and whether to play a game
-    or view the leaderboard"""
-    def __init__(self):
-        """Initializes a LevelChoiceDisplay object"""
+    """Class for the display used to select a level and whether to play a
+    game, view the leaderboard, or view the click heatmaps"""
+    def __init__(self, master):
+        """Initializes a LevelChoiceDisplay object
+
+        Args:
+            master: Root of the application's Tk interpreter
+        """
         # Display and widgets
         self.root = None
         self._checkbox_play = None
         self._checkbox_view = None
+        self._checkbox_heatmaps = None
         # User choice variables
         self.level = None
         self.play_game = None
         self.view_leaderboard = None
+        self.view_heatmaps = None
         self._check_var_play = None
         self._check_var_view = None
+        self._check_var_heatmaps = None
         # Initialization methods
-        self._create_display_geometry()
+        self._create_display_geometry(master)
         self._add_widgets()
 
-    def _create_display_geometry(self):
+    def _create_display_geometry(self, master):
         """Creates the overall display"""
-        self.root = Tk()
+        self.root = Toplevel(master)
         self.root.resizable(False, False)
         self.root.title('Level Choice')
         add_icon(self.root)
         display_width = 300
-        display_height = 165
+        display_height = 240
         screen_width = self.root.winfo_screenwidth()
         screen_height = self.root.winfo_screenheight()
         display_x_pos = int(screen_width/2 - display_width/2)
@@ -125,6 +136,26 @@ class LevelChoiceDisplay():
                                 arg1=hard_button,
                                 arg2='red':
                          update_button_color(arg1, arg2))
+        daily_button = Button(self.root,
+                              text='Daily Challenge',
+                              background='dark orange',
+                              activebackground='DarkOrange3',
+                              foreground='white',
+                              activeforeground='white',
+                              font=(FONT, 12),
+                              cursor='hand2',
+                              command=lambda: self._set_level('daily'))
+        daily_button.place(x=15, y=195, width=270, height=35)
+        daily_button.bind('<Enter>',
+                          lambda event,
+                                 arg1=daily_button,
+                                 arg2='DarkOrange3':
+                          update_button_color(arg1, arg2))
+        daily_button.bind('<Leave>',
+                          lambda event,
+                                 arg1=daily_button,
+                                 arg2='dark orange':
+                          update_button_color(arg1, arg2))
 
         # Create the checkboxes
         self._check_var_play = BooleanVar()
@@ -141,6 +172,14 @@ class LevelChoiceDisplay():
                                           variable=self._check_var_view,
                                           command=self._update_play_check)
         self._checkbox_view.place(x=50, y=130, width=200, height=25)
+        self._check_var_heatmaps = BooleanVar()
+        self._checkbox_heatmaps = Checkbutton(
+            self.root,
+            text='View Click Heatmaps',
+            font=(FONT, 11),
+            variable=self._check_var_heatmaps,
+            command=self._update_heatmaps_check)
+        self._checkbox_heatmaps.place(x=50, y=160, width=200, height=25)
         self._checkbox_play.select()
 
     def _set_level(self, chosen_level):
@@ -152,55 +191,84 @@ class LevelChoiceDisplay():
         self.level = chosen_level
         self.play_game = self._check_var_play.get()
         self.view_leaderboard = self._check_var_view.get()
+        self.view_heatmaps = self._check_var_heatmaps.get()
         if self.play_game:
             logging.info(f'The user chose to play a game at level: '
                          f'{self.level}')
+        elif self.view_heatmaps:
+            logging.info(f'The user chose to view the click heatmaps for '
+                         f'level: {self.level}')
         else:
             logging.info(f'The user chose to view the leaderboard for level: '
                          f'{self.level}')
         self.root.destroy()
 
     def _update_view_check(self):
-        """Removes the check for view leaderboard if play game was selected"""
+        """Removes the check for view leaderboard and view click heatmaps if
+        play game was selected"""
         if self._check_var_play.get():
             self._checkbox_view.deselect()
+            self._checkbox_heatmaps.deselect()
 
     def _update_play_check(self):
-        """Removes the check for play game if view leaderboard was selected"""
+        """Removes the check for play game and view click heatmaps if view
+        leaderboard was selected"""
         if self._check_var_view.get():
             self._checkbox_play.deselect()
+            self._checkbox_heatmaps.deselect()
+
+    def _update_heatmaps_check(self):
+        """Removes the check for play game and view leaderboard if view click
+        heatmaps was selected"""
+        if self._check_var_heatmaps.get():
+            self._checkbox_play.deselect()
+            self._checkbox_view.deselect()
 
 
 class BoardDisplay():
     """Class for the minesweeper board display"""
-    def __init__(self, level):
+    def __init__(self, level, *, master, index=0, show_opponents=False):
         """Initializes a BoardDisplay object
 
         Args:
             level (str): The difficulty level of the game
+            master: Root of the application's Tk interpreter
+            index (int): Position of the board among the open boards, used
+                to place boards side by side. Defaults to 0
+            show_opponents (bool): If the header has a line for the progress
+                of race opponents. Defaults to False
         """
         # Display and widgets
         self.root = None
         self._miley_button = None
         self._mine_count_label = None
         self._timer_label = None
+        self._opponents_label = None
+        # Extra header height above the tiles
+        self._tile_y_offset = OPPONENTS_HEIGHT if show_opponents else 0
+        # The button or label of each tile, keyed by the tile
+        self.tile_buttons = {}
         # Variables
         self._display_width = None
+        self._columns = LEVEL_INFO[level]['columns']
+        self._rows = LEVEL_INFO[level]['rows']
         # Initialization methods
-        self._create_display_geometry(level)
+        self._create_display_geometry(level, master, index)
         self._add_widgets()
 
-    def _create_display_geometry(self, level):
+    def _create_display_geometry(self, level, master, index):
         """Creates the overall display"""
-        self.root = Tk()
+        self.root = Toplevel(master)
         self.root.resizable(False, False)
         self.root.title('Minesweeper')
         add_icon(self.root)
         self._display_width = LEVEL_INFO[level]['display_width']
-        display_height = LEVEL_INFO[level]['display_height'] + DISPLAY_OFFSET
+        display_height = (LEVEL_INFO[level]['display_height'] +
+                          DISPLAY_OFFSET + self._tile_y_offset)
         screen_width = self.root.winfo_screenwidth()
         screen_height = self.root.winfo_screenheight()
-        display_x_pos = int(screen_width/2 - self._display_width/2)
+        display_x_pos = int(screen_width/2 - self._display_width/2 +
+                            index * (self._display_width + 10))
         display_y_pos = int(screen_height*0.45 - display_height/2)
         self.root.geometry(f'{self._display_width}x{display_height}'
                            f'+{display_x_pos}+{display_y_pos}')
@@ -256,6 +324,18 @@ class BoardDisplay():
                                 width=90,
                                 height=40)
 
+        # Create the race opponents label
+        if self._tile_y_offset:
+            self._opponents_label = Label(self.root,
+                                          background='gray22',
+                                          foreground='white',
+                                          font=(FONT, 9),
+                                          anchor='w')
+            self._opponents_label.place(x=0,
+                                        y=DISPLAY_OFFSET,
+                                        width=self._display_width,
+                                        height=OPPONENTS_HEIGHT)
+
     def update_smiley_button(self, smiley_type):
         """Updates the smiley button in the header
 
@@ -287,6 +367,102 @@ class BoardDisplay():
         """
         self._mine_count_label.configure(text=mine_count)
 
+    def update_opponents(self, text):
+        """Updates the race opponents label text
+
+        Args:
+            text (str): Progress of the opponents
+        """
+        if self._opponents_label is not None:
+            self._opponents_label.configure(text=text)
+
+    def create_tile_button(self, tile):
+        """Creates the button of a tile
+
+        Args:
+            tile (Tile): Tile to create the button for
+        Returns:
+            Button: The tile's button
+        """
+        return self._place_tile_widget(tile, Button(self.root,
+                                                    relief='raised'))
+
+    def _create_tile_label(self, tile):
+        """Creates the label of a tile. Label was chosen here instead of
+        creating a button and setting the state to 'disabled' because that
+        causes all button images to look weird and there is apparently no
+        work around for that problem
+
+        Args:
+            tile (Tile): Tile to create the label for
+        Returns:
+            Label: The tile's label
+        """
+        return self._place_tile_widget(tile, Label(self.root,
+                                                   relief='raised'))
+
+    def _place_tile_widget(self, tile, widget):
+        """Places a tile's widget at the tile's position and stores it
+
+        Args:
+            tile (Tile): Tile the widget belongs to
+            widget: Tkinter button or label of the tile
+        Returns:
+            The placed widget
+        """
+        x_pos, y_pos = tile.position
+        widget.place(x=x_pos, y=y_pos + self._tile_y_offset, height=TILE_SIZE,
+                     width=TILE_SIZE)
+        self.tile_buttons[tile] = widget
+        return widget
+
+    def tile_position_at(self, *, x_root, y_root):
+        """Returns the position of the tile under a point on the screen
+
+        Args:
+            x_root (int): Horizontal screen coordinate of the point
+            y_root (int): Vertical screen coordinate of the point
+        Returns:
+            tuple: Column and row of the tile, or None if the point isn't
+                over the tiles
+        """
+        x_pos = x_root - self.root.winfo_rootx()
+        y_pos = (y_root - self.root.winfo_rooty() - DISPLAY_OFFSET -
+                 self._tile_y_offset)
+        if x_pos < 0 or y_pos < 0:
+            return None
+        column = x_pos // TILE_SIZE
+        row = y_pos // TILE_SIZE
+        if column >= self._columns or row >= self._rows:
+            return None
+        return column, row
+
+    @traced(RENDER)
+    def set_tile_color(self, tile, *, bg_color, fg_color=None):
+        """Sets the color of a tile's button
+
+        Args:
+            tile (Tile): Tile to set the color of
+            bg_color (str): Button background color
+            fg_color (str): Button foreground color. Defaults to None
+        """
+        button = self.tile_buttons[tile]
+        button.configure(background=bg_color, activebackground=bg_color)
+        if fg_color is not None:
+            button.configure(foreground=fg_color, activeforeground=fg_color)
+
+    @traced(RENDER)
+    def disable_tile_button(self, tile):
+        """Disables a tile's button by replacing it with a label
+
+        Args:
+            tile (Tile): Tile to disable the button of
+        Returns:
+            Label: The tile's label
+        """
+        self.tile_buttons[tile].destroy()
+        return self._create_tile_label(tile)
+
 
 class TimesDisplay():
     """Class for the minesweeper top times display"""
@@ -297,10 +473,11 @@ class TimesDisplay():
     light_gray = 'gray90'
     dark_gray = 'gray80'
 
-    def __init__(self, *, get_input, num_entries):
+    def __init__(self, *, master, get_input, num_entries):
         """Initializes a TimesDisplay object
 
         Args:
+            master: Root of the application's Tk interpreter
             get_input (bool): If user input is needed
             num_entries (int): Number of entries for the list
         """
@@ -315,7 +492,7 @@ class TimesDisplay():
         self.input_var = None
         # Initialization methods
         self._determine_height(num_entries)
-        self._create_display_geometry()
+        self._create_display_geometry(master)
         self._add_widgets()
 
     def _determine_height(self, num_entries):
@@ -332,12 +509,9 @@ class TimesDisplay():
             if num_entries < 10:
                 self._display_height += self.entry_height
 
-    def _create_display_geometry(self):
+    def _create_display_geometry(self, master):
         """Creates the overall display"""
-        if self._get_input:
-            self.root = Toplevel()
-        else:
-            self.root = Tk()
+        self.root = Toplevel(master)
         self.root.resizable(False, False)
         self.root.title('Top Times')
         add_icon(self.root)
@@ -501,6 +675,106 @@ class TimesDisplay():
         return self.dark_gray
 
 
+class HeatmapDisplay():
+    """Class for the display of a level's click heatmaps"""
+    header_height = 50
+    window_bg_color = 'gray98'
+    # Button text of each heatmap
+    titles = {'first_clicks': 'First Clicks',
+              'explosions': 'Explosions',
+              'think_time': 'Think Time'}
+
+    def __init__(self, level, *, master, games, colors):
+        """Initializes a HeatmapDisplay object
+
+        Args:
+            level (str): The difficulty level of the heatmaps
+            master: Root of the application's Tk interpreter
+            games (int): Number of games the heatmaps were recorded from
+            colors (dict): Rows of tile colors of each heatmap, keyed by the
+                heatmap kinds in the order their buttons are shown
+        """
+        # Display and widgets
+        self.root = None
+        self._canvas = None
+        self._info_label = None
+        # Variables
+        self._colors = colors
+        self._games = games
+        self._rows = len(next(iter(colors.values())))
+        self._columns = len(next(iter(colors.values()))[0])
+        self._display_width = max(self._columns * TILE_SIZE,
+                                  110 * len(colors))
+        self._display_height = (self._rows * TILE_SIZE +
+                                2 * self.header_height)
+        # Initialization methods
+        self._create_display_geometry(level, master)
+        self._add_widgets()
+        self.show(next(iter(colors)))
+
+    def _create_display_geometry(self, level, master):
+        """Creates the overall display
+
+        Args:
+            level (str): The difficulty level of the heatmaps
+            master: Root of the application's Tk interpreter
+        """
+        self.root = Toplevel(master)
+        self.root.resizable(False, False)
+        self.root.title(f'Click Heatmaps - {level.capitalize()}')
+        add_icon(self.root)
+        screen_width = self.root.winfo_screenwidth()
+        screen_height = self.root.winfo_screenheight()
+        display_x_pos = int(screen_width/2 - self._display_width/2)
+        display_y_pos = int(screen_height*0.45 - self._display_height/2)
+        self.root.geometry(f'{self._display_width}x{self._display_height}'
+                           f'+{display_x_pos}+{display_y_pos}')
+
+    def _add_widgets(self):
+        """Adds the heatmap buttons, the info label, and the tile canvas"""
+        button_width = self._display_width // len(self._colors)
+        for number, kind in enumerate(self._colors):
+            button = Button(self.root,
+                            text=self.titles[kind],
+                            background=self.window_bg_color,
+                            activebackground='gray94',
+                            cursor='hand2',
+                            font=(FONT, 11),
+                            command=lambda kind=kind: self.show(kind))
+            button.place(x=number * button_width + 5, y=8,
+                         width=button_width - 10, height=34)
+        self._info_label = Label(self.root,
+                                 background=self.window_bg_color,
+                                 font=(FONT, 11))
+        self._info_label.place(x=0, y=self.header_height,
+                               width=self._display_width,
+                               height=self.header_height)
+        self._canvas = Canvas(self.root,
+                              width=self._columns * TILE_SIZE,
+                              height=self._rows * TILE_SIZE,
+                              background=self.window_bg_color,
+                              highlightthickness=0)
+        self._canvas.place(
+            x=(self._display_width - self._columns * TILE_SIZE) // 2,
+            y=2 * self.header_height)
+
+    def show(self, kind):
+        """Draws one of the heatmaps
+
+        Args:
+            kind (str): Kind of the heatmap to draw
+        """
+        self._canvas.delete('all')
+        for row, row_colors in enumerate(self._colors[kind]):
+            for column, color in enumerate(row_colors):
+                self._canvas.create_rectangle(
+                    column * TILE_SIZE, row * TILE_SIZE,
+                    (column + 1) * TILE_SIZE, (row + 1) * TILE_SIZE,
+                    fill=color, outline='gray80')
+        self._info_label.configure(text=f'{self.titles[kind]} of '
+                                        f'{self._games} games')
+
+
 def update_button_color(button, color):
     """Updates the passed button's color
 
@@ -0,0 +1,311 @@
+"""
+Minesweeper server which hosts many headless games behind a line-delimited
+JSON protocol over a TCP or Unix socket.
+
+Every request is a JSON object on its own line with a 'command' key and an
+optional 'id' which is echoed back in the response:
+
+    {"command": "new", "level": "easy", "seed": "0123456789abcdef",
+     "deltas": true}
+    {"command": "reveal", "game": 1, "column": 4, "row": 4}
+    {"command": "flag", "game": 1, "column": 0, "row": 0}
+    {"command": "chord", "game": 1, "column": 3, "row": 4}
+    {"command": "state", "game": 1}
+    {"command": "close", "game": 1}
+    {"command": "stats"}
+
+Moves respond with the change events they caused rather than the full board.
+Games started with "deltas" respond with compact run-length encoded deltas
+instead (see delta.py), and their state responses include a keyframe.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from delta import DeltaEncoder
+from engine import GameEngine
+from minesweeper_details import LEVEL_INFO
+from seeds import format_seed, parse_seed
+
+# Number of latency samples kept for each command
+LATENCY_SAMPLES = 10000
+# Largest request line accepted from a client
+MAX_LINE_LENGTH = 4096
+
+
+class ServerError(Exception):
+    """Raised when a client request can't be handled"""
+
+
+class GameServer():
+    """Class that hosts many concurrent headless games"""
+    def __init__(self, max_games=10000):
+        """Initializes a GameServer object
+
+        Args:
+            max_games (int): Maximum number of games hosted at once.
+                Defaults to 10000
+        """
+        self.max_games = max_games
+        self.games = {}
+        self._encoders = {}
+        self._next_game_id = 1
+        self._latencies = {}
+        # Writer of every open connection keyed by its handler task
+        self._connections = {}
+        self._commands = {
+            'new': self._new_game,
+            'reveal': self._reveal,
+            'flag': self._flag,
+            'chord': self._chord,
+            'state': self._state,
+            'close': self._close,
+            'stats': self._stats,
+        }
+
+    def handle_request(self, request):
+        """Handles a single request and records its latency
+
+        Args:
+            request (dict): Decoded request
+        Returns:
+            dict: Response to send back to the client
+        """
+        start_time = time.perf_counter()
+        command = request.get('command')
+        try:
+            handler = self._commands.get(command)
+            if handler is None:
+                raise ServerError(f'Unknown command: {command}')
+            response = handler(request)
+            response['ok'] = True
+        except (ServerError, KeyError, TypeError, ValueError) as ex:
+            response = {'ok': False, 'error': str(ex)}
+        if 'id' in request:
+            response['id'] = request['id']
+        if command in self._commands:
+            samples = self._latencies.setdefault(
+                command, deque(maxlen=LATENCY_SAMPLES))
+            samples.append(time.perf_counter() - start_time)
+        return response
+
+    def _get_game(self, request):
+        """Returns the game referenced by the request
+
+        Args:
+            request (dict): Decoded request
+        Returns:
+            GameEngine: The requested game
+        """
+        game = self.games.get(request['game'])
+        if game is None:
+            raise ServerError(f'Unknown game: {request["game"]}')
+        return game
+
+    def _new_game(self, request):
+        """Starts a new game"""
+        if len(self.games) >= self.max_games:
+            raise ServerError('The server is hosting the maximum number of '
+                              'games')
+        level = request.get('level', 'easy')
+        if level not in LEVEL_INFO:
+            raise ServerError(f'Unknown level: {level}')
+        seed = request.get('seed')
+        if seed is not None:
+            seed = parse_seed(seed)
+        game = GameEngine(level, seed)
+        game_id = self._next_game_id
+        self._next_game_id += 1
+        self.games[game_id] = game
+        if request.get('deltas'):
+            self._encoders[game_id] = DeltaEncoder(columns=game.board.columns,
+                                                   rows=game.board.rows)
+        logging.debug(f'Started game #{game_id} at level: {level}')
+        return {'game': game_id,
+                'seed': format_seed(game.board.seed),
+                'columns': game.board.columns,
+                'rows': game.board.rows,
+                'mines': game.board.mines}
+
+    def _reveal(self, request):
+        """Reveals a tile"""
+        game = self._get_game(request)
+        events = game.reveal(column=int(request['column']),
+                             row=int(request['row']))
+        return self._move_response(request['game'], game, events)
+
+    def _flag(self, request):
+        """Toggles the flag on a tile"""
+        game = self._get_game(request)
+        events = game.toggle_flag(column=int(request['column']),
+                                  row=int(request['row']))
+        return self._move_response(request['game'], game, events)
+
+    def _chord(self, request):
+        """Reveals the neighbors of an uncovered tile"""
+        game = self._get_game(request)
+        events = game.chord(column=int(request['column']),
+                            row=int(request['row']))
+        return self._move_response(request['game'], game, events)
+
+    def _move_response(self, game_id, game, events):
+        """Builds the response for a move, encoding the change events as a
+        delta if the game was started with deltas
+
+        Args:
+            game_id (int): Id of the game
+            game (GameEngine): The game the move was made in
+            events (list): Change events caused by the move
+        Returns:
+            dict: Response for the move
+        """
+        encoder = self._encoders.get(game_id)
+        if encoder is not None:
+            return {'delta': encoder.encode(events, game.status)}
+        return {'events': events, 'status': game.status}
+
+    def _state(self, request):
+        """Returns a full snapshot of a game"""
+        state = self._get_game(request).state()
+        encoder = self._encoders.get(request['game'])
+        if encoder is not None:
+            state['keyframe'] = encoder.keyframe(state['status'])
+        return state
+
+    def _close(self, request):
+        """Removes a game from the server"""
+        self._get_game(request)
+        del self.games[request['game']]
+        self._encoders.pop(request['game'], None)
+        return {}
+
+    def _stats(self, _):
+        """Returns the number of games and the per-command latencies"""
+        return {'games': len(self.games),
+                'latency_ms': self.latency_percentiles()}
+
+    def latency_percentiles(self):
+        """Returns the 50th, 95th and 99th percentile latency of each command
+
+        Returns:
+            dict: Percentiles in milliseconds keyed by command
+        """
+        percentiles = {}
+        for command, samples in self._latencies.items():
+            ordered = sorted(samples)
+            percentiles[command] = {
+                f'p{percent}': round(
+                    ordered[min(len(ordered) - 1,
+                                len(ordered) * percent // 100)] * 1000, 3)
+                for percent in (50, 95, 99)}
+            percentiles[command]['count'] = len(ordered)
+        return percentiles
+
+    async def handle_client(self, reader, writer):
+        """Reads requests from a client until it disconnects
+
+        Args:
+            reader: asyncio StreamReader object
+            writer: asyncio StreamWriter object
+        """
+        peer = writer.get_extra_info('peername')
+        logging.info(f'Client connected: {peer}')
+        self._connections[asyncio.current_task()] = writer
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    response = {'ok': False, 'error': 'Request too long'}
+                    writer.write(json.dumps(response).encode() + b'\n')
+                    break
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError('Requests must be JSON objects')
+                except ValueError as ex:
+                    response = {'ok': False, 'error': f'Bad request: {ex}'}
+                else:
+                    response = self.handle_request(request)
+                writer.write(json.dumps(response,
+                                        separators=(',', ':')).encode() +
+                             b'\n')
+                await writer.drain()
+        except ConnectionError:
+            logging.info(f'Lost the connection to client: {peer}')
+        finally:
+            del self._connections[asyncio.current_task()]
+            writer.close()
+        logging.info(f'Client disconnected: {peer}')
+
+    async def close(self):
+        """Closes the connections of the clients and waits for their
+        handlers to finish. The server should be closed first, so no client
+        connects in the meantime"""
+        handlers = list(self._connections)
+        for writer in self._connections.values():
+            writer.close()
+        await asyncio.gather(*handlers, return_exceptions=True)
+
+    async def start(self, *, host=None, port=None, path=None):
+        """Starts listening on a TCP port or a Unix socket path
+
+        Args:
+            host (str): Host to listen on. Defaults to None
+            port (int): TCP port to listen on. Defaults to None
+            path (str): Unix socket path to listen on. Defaults to None in
+                which case the TCP host and port are used
+        Returns:
+            asyncio Server object
+        """
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle_client,
+                                                   path=path,
+                                                   limit=MAX_LINE_LENGTH)
+        return await asyncio.start_server(self.handle_client, host=host,
+                                          port=port, limit=MAX_LINE_LENGTH)
+
+
+async def serve(args):
+    """Runs the server until it is cancelled
+
+    Args:
+        args: Parsed command line arguments
+    """
+    game_server = GameServer(max_games=args.max_games)
+    server = await game_server.start(host=args.host, port=args.port,
+                                     path=args.unix)
+    logging.info(f'Serving games on: '
+                 f'{[sock.getsockname() for sock in server.sockets]}')
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await game_server.close()
+
+
+def main():
+    """Parses the command line arguments and runs the server"""
+    parser = argparse.ArgumentParser(description='Minesweeper game server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help='listen on this Unix socket path '
+                                       'instead of a TCP port')
+    parser.add_argument('--max-games', type=int, default=10000)
+    args = parser.parse_args()
+    logging.basicConfig(
+        format='[%(asctime)s] %(levelname)s : %(funcName)s() - %(message)s',
+        level=logging.INFO)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        logging.info('Shutting down the server')
+    logging.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Module with the precomputed neighbor tables shared by everything that walks
+the neighbors of a tile.
+
+Tiles are identified by their flat index, column * rows + row, which is the
+order Board creates them in. The neighbors of every tile are stored
+CSR-style: the neighbors of tile i are indices[offsets[i]:offsets[i + 1]].
+Edge handling is done once when the table is built, and the table is cached
+for each board geometry.
+"""
+
+import functools
+from array import array
+
+
+class NeighborTable():
+    """Class that holds the neighbor lists of every tile for one geometry"""
+    def __init__(self, *, columns, rows):
+        """Initializes a NeighborTable object
+
+        Args:
+            columns (int): Number of columns on the board
+            rows (int): Number of rows on the board
+        """
+        self.columns = columns
+        self.rows = rows
+        self.offsets = array('I', [0])
+        self.indices = array('I')
+        for column in range(columns):
+            for row in range(rows):
+                for i in range(-1, 2):
+                    for j in range(-1, 2):
+                        test_column = column + i
+                        test_row = row + j
+                        if i == 0 and j == 0:
+                            continue
+                        if (0 <= test_column < columns and
+                                0 <= test_row < rows):
+                            self.indices.append(test_column * rows + test_row)
+                self.offsets.append(len(self.indices))
+
+    def neighbors(self, index):
+        """Returns the flat indices of a tile's neighbors
+
+        Args:
+            index (int): Flat index of the tile
+        Returns:
+            array: Flat indices of the adjacent tiles
+        """
+        return self.indices[self.offsets[index]:self.offsets[index + 1]]
+
+
+@functools.lru_cache(maxsize=16)
+def neighbor_table(columns, rows):
+    """Returns the cached neighbor table for a board geometry
+
+    Args:
+        columns (int): Number of columns on the board
+        rows (int): Number of rows on the board
+    Returns:
+        NeighborTable: The neighbor table
+    """
+    return NeighborTable(columns=columns, rows=rows)
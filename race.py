@@ -0,0 +1,445 @@
+"""
+Head-to-head race mode. Every player plays the same seeded board, and a hub
+relays each player's progress to the others over line-delimited JSON.
+
+Clients join with their name:
+
+    {"type": "join", "name": "Alice"}
+
+and the hub welcomes them with the board, which starts with the same tile
+revealed for everyone so that the boards are identical:
+
+    {"type": "welcome", "player": 1, "level": "medium",
+     "seed": "0123456789abcdef", "start": [8, 8], "players": 2}
+
+Once enough players have joined the hub sends {"type": "start"} to everyone.
+During the race each client sends its progress after a move, and the hub
+forwards it to the other players with the sender's id and name:
+
+    {"type": "progress", "cleared": 45, "flags": 3, "time": 27,
+     "status": "playing"}
+
+Progress messages are small and only the latest one matters, so a client
+only sends when its progress changed, sends whatever is newest once the
+previous message is written, and the hub skips players whose connection is
+backed up instead of waiting for them.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import queue
+import threading
+from minesweeper_details import LEVEL_INFO
+from seeds import format_seed, new_seed, parse_seed
+
+# Largest message line accepted
+MAX_LINE_LENGTH = 4096
+# Bytes queued for a player above which progress updates to them are skipped
+MAX_WRITE_BUFFER = 64 * 1024
+
+
+def encode_message(message):
+    """Encodes a message as a compact JSON line
+
+    Args:
+        message (dict): The message
+    Returns:
+        bytes: The encoded line
+    """
+    return json.dumps(message, separators=(',', ':')).encode() + b'\n'
+
+
+class RaceHub():
+    """Class that relays the progress of the players of one race"""
+    def __init__(self, *, level='medium', seed=None, players=2):
+        """Initializes a RaceHub object
+
+        Args:
+            level (str): The difficulty level of the race. Defaults to
+                'medium'
+            seed (int): Seed of the board. Defaults to None in which case a
+                new seed is created
+            players (int): Number of players that have to join before the
+                race starts. Defaults to 2
+        """
+        level_info = LEVEL_INFO[level]
+        self.level = level
+        self.seed = new_seed() if seed is None else seed
+        self.players = players
+        self.start_tile = [level_info['columns'] // 2, level_info['rows'] // 2]
+        self.started = False
+        self._writers = {}
+        self._names = {}
+        self._progress = {}
+        self._next_player_id = 1
+        # Writer of every open connection keyed by its handler task
+        self._connections = {}
+
+    def _send(self, player_id, message):
+        """Queues a message for a player without waiting for it to be sent
+
+        Args:
+            player_id (int): Id of the player
+            message (dict): The message
+        """
+        self._writers[player_id].write(encode_message(message))
+
+    def _broadcast(self, message, *, exclude=None, skip_backed_up=False):
+        """Queues a message for every player
+
+        Args:
+            message (dict): The message
+            exclude (int): Id of a player who doesn't get the message.
+                Defaults to None
+            skip_backed_up (bool): If players whose connection is backed up
+                should be skipped. Defaults to False
+        """
+        data = encode_message(message)
+        for player_id, writer in self._writers.items():
+            if player_id == exclude:
+                continue
+            if (skip_backed_up and writer.transport.get_write_buffer_size() >
+                    MAX_WRITE_BUFFER):
+                continue
+            writer.write(data)
+
+    def _join(self, writer, name):
+        """Adds a player and starts the race once everyone has joined
+
+        Args:
+            writer: asyncio StreamWriter object of the player
+            name (str): Name of the player
+        Returns:
+            int: Id of the player
+        """
+        player_id = self._next_player_id
+        self._next_player_id += 1
+        self._writers[player_id] = writer
+        self._names[player_id] = str(name)[:20]
+        logging.info(f'{self._names[player_id]} joined the race as player '
+                     f'{player_id}')
+        self._send(player_id, {'type': 'welcome', 'player': player_id,
+                               'level': self.level,
+                               'seed': format_seed(self.seed),
+                               'start': self.start_tile,
+                               'players': self.players})
+        for progress in self._progress.values():
+            self._send(player_id, progress)
+        if self.started:
+            self._send(player_id, {'type': 'start'})
+        elif len(self._writers) >= self.players:
+            self.started = True
+            logging.info('Starting the race')
+            self._broadcast({'type': 'start'})
+        return player_id
+
+    def _update_progress(self, player_id, message):
+        """Stores a player's progress and forwards it to the other players
+
+        Args:
+            player_id (int): Id of the player
+            message (dict): The progress message
+        """
+        progress = {'type': 'progress', 'player': player_id,
+                    'name': self._names[player_id],
+                    'cleared': int(message.get('cleared', 0)),
+                    'flags': int(message.get('flags', 0)),
+                    'time': int(message.get('time', 0)),
+                    'status': str(message.get('status', ''))[:10]}
+        self._progress[player_id] = progress
+        self._broadcast(progress, exclude=player_id, skip_backed_up=True)
+
+    def _leave(self, player_id):
+        """Removes a player and tells the others
+
+        Args:
+            player_id (int): Id of the player
+        """
+        self._writers.pop(player_id)
+        self._progress.pop(player_id, None)
+        logging.info(f'{self._names[player_id]} left the race')
+        self._broadcast({'type': 'leave', 'player': player_id})
+
+    async def handle_client(self, reader, writer):
+        """Reads a player's messages until they disconnect
+
+        Args:
+            reader: asyncio StreamReader object
+            writer: asyncio StreamWriter object
+        """
+        player_id = None
+        self._connections[asyncio.current_task()] = writer
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    break
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    message_type = message.get('type')
+                    if message_type == 'join' and player_id is None:
+                        player_id = self._join(writer,
+                                               message.get('name', ''))
+                    elif message_type == 'progress' and player_id is not None:
+                        self._update_progress(player_id, message)
+                except (ValueError, TypeError, AttributeError,
+                        OverflowError):
+                    logging.warning('Ignoring a malformed race message')
+                await writer.drain()
+        except ConnectionError:
+            logging.info(f'Lost the connection to player {player_id}')
+        finally:
+            del self._connections[asyncio.current_task()]
+            if player_id is not None:
+                self._leave(player_id)
+            writer.close()
+
+    async def start(self, *, host='127.0.0.1', port=0):
+        """Starts listening for players
+
+        Args:
+            host (str): Host to listen on. Defaults to '127.0.0.1'
+            port (int): TCP port to listen on. Defaults to 0 in which case a
+                free port is picked
+        Returns:
+            asyncio Server object
+        """
+        return await asyncio.start_server(self.handle_client, host=host,
+                                          port=port, limit=MAX_LINE_LENGTH)
+
+    async def close(self):
+        """Closes the connections of the players and waits for their
+        handlers to finish. The server should be closed first, so no player
+        joins in the meantime"""
+        handlers = list(self._connections)
+        for writer in self._connections.values():
+            writer.close()
+        await asyncio.gather(*handlers, return_exceptions=True)
+
+
+class RaceClient():
+    """Class that connects a game to a race hub. The connection runs on an
+    asyncio event loop in a background thread, so reporting progress and
+    polling for opponent updates never block the display"""
+    def __init__(self, *, host, port, name):
+        """Initializes a RaceClient object
+
+        Args:
+            host (str): Host of the race hub
+            port (int): TCP port of the race hub
+            name (str): Name of the player
+        """
+        self.host = host
+        self.port = port
+        self.name = name
+        self.player_id = None
+        self.level = None
+        self.seed = None
+        self.start_tile = None
+        self.started = False
+        # Latest progress of each opponent keyed by player id
+        self.opponents = {}
+        self._incoming = queue.SimpleQueue()
+        self._welcomed = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        self._thread = None
+        self._task = None
+        self._writer = None
+        self._pending = None
+        self._last_sent = None
+        self._sending = False
+
+    def connect(self, timeout=10):
+        """Connects to the hub and waits for the welcome message
+
+        Args:
+            timeout (float): Seconds to wait for the welcome. Defaults to 10
+        Raises:
+            ConnectionError: If the hub didn't welcome the player in time
+        """
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        daemon=True, name='RaceClient')
+        self._thread.start()
+        self._task = asyncio.run_coroutine_threadsafe(self._run(),
+                                                      self._loop)
+        if not self._welcomed.wait(timeout):
+            self.close()
+            raise ConnectionError(f'The race hub at {self.host}:{self.port} '
+                                  f'did not respond')
+        self.poll()
+
+    async def _run(self):
+        """Joins the race and reads the hub's messages until disconnected"""
+        try:
+            reader, self._writer = await asyncio.open_connection(
+                self.host, self.port, limit=MAX_LINE_LENGTH)
+            self._writer.write(encode_message({'type': 'join',
+                                               'name': self.name}))
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if message.get('type') == 'welcome':
+                    self.player_id = message['player']
+                    self.level = message['level']
+                    self.seed = parse_seed(message['seed'])
+                    self.start_tile = tuple(message['start'])
+                    self._welcomed.set()
+                else:
+                    self._incoming.put(message)
+        except (ConnectionError, OSError, ValueError, AttributeError,
+                TypeError, KeyError) as ex:
+            logging.warning(f'Lost the connection to the race hub: {ex}')
+        self._incoming.put({'type': 'disconnected'})
+
+    def report(self, *, cleared, flags, time, status):
+        """Sends the player's progress unless it hasn't changed. Only queues
+        the message, so it returns right away
+
+        Args:
+            cleared (int): Percentage of the safe tiles that were cleared
+            flags (int): Number of flags placed
+            time (int): Seconds since the race started
+            status (str): Status of the player's game
+        """
+        progress = {'type': 'progress', 'cleared': cleared, 'flags': flags,
+                    'time': time, 'status': status}
+        self._loop.call_soon_threadsafe(self._queue_progress, progress)
+
+    def _queue_progress(self, progress):
+        """Replaces the unsent progress and starts sending it if nothing is
+        being sent
+
+        Args:
+            progress (dict): The progress message
+        """
+        if progress == self._last_sent:
+            return
+        self._pending = progress
+        if not self._sending and self._writer is not None:
+            self._sending = True
+            self._loop.create_task(self._send_pending())
+
+    async def _send_pending(self):
+        """Sends the newest progress until there's nothing new to send"""
+        try:
+            while self._pending is not None:
+                progress, self._pending = self._pending, None
+                self._writer.write(encode_message(progress))
+                self._last_sent = progress
+                await self._writer.drain()
+        except ConnectionError as ex:
+            logging.warning(f'Unable to send the race progress: {ex}')
+        finally:
+            self._sending = False
+
+    def poll(self):
+        """Applies the messages received since the last poll
+
+        Returns:
+            bool: If anything about the race changed
+        """
+        changed = False
+        while True:
+            try:
+                message = self._incoming.get_nowait()
+            except queue.Empty:
+                return changed
+            changed = True
+            message_type = message.get('type')
+            if message_type == 'start':
+                self.started = True
+            elif message_type == 'progress':
+                self.opponents[message['player']] = message
+            elif message_type == 'leave':
+                self.opponents.pop(message['player'], None)
+
+    def summary(self):
+        """Returns a short description of the opponents' progress
+
+        Returns:
+            str: The progress of each opponent
+        """
+        if not self.started:
+            return 'Waiting for the other players...'
+        if not self.opponents:
+            return 'Racing'
+        return '  '.join(f'{opponent["name"]}: {opponent["cleared"]}% '
+                         f'{opponent["status"]}'
+                         for opponent in self.opponents.values())
+
+    async def _disconnect(self):
+        """Stops reading from the hub and closes the connection"""
+        tasks = [task for task in asyncio.all_tasks()
+                 if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    def close(self):
+        """Disconnects from the hub, stops the background thread, and
+        closes the event loop"""
+        if self._thread is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(
+                    self._disconnect(), self._loop).result(timeout=1)
+            except TimeoutError:
+                logging.warning('Timed out disconnecting from the race hub')
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=1)
+            if self._thread.is_alive():
+                logging.warning('The race client thread did not stop')
+                return
+            self._thread = None
+        if not self._loop.is_closed():
+            self._loop.close()
+
+
+async def serve(args):
+    """Runs a race hub until it is cancelled
+
+    Args:
+        args: Parsed command line arguments
+    """
+    hub = RaceHub(level=args.level, seed=args.seed, players=args.players)
+    server = await hub.start(host=args.host, port=args.port)
+    logging.info(f'Hosting a {args.level} race with seed '
+                 f'{format_seed(hub.seed)} on: '
+                 f'{[sock.getsockname() for sock in server.sockets]}')
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    """Parses the command line arguments and runs the race hub"""
+    parser = argparse.ArgumentParser(description='Minesweeper race hub')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--level', default='medium',
+                        choices=['easy', 'medium', 'hard'])
+    parser.add_argument('--players', type=int, default=2)
+    parser.add_argument('--seed', type=parse_seed)
+    args = parser.parse_args()
+    logging.basicConfig(
+        format='[%(asctime)s] %(levelname)s : %(funcName)s() - %(message)s',
+        level=logging.INFO)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        logging.info('Shutting down the race hub')
+    logging.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""
+Module with the SaveFile class used to save and resume in-progress games.
+
+The save file has a fixed binary layout so that it can be memory-mapped and
+read without any parsing:
+
+    header        magic, format version, columns, rows, mines, seed,
+                  database id, daily challenge day and elapsed seconds
+    mine bitmap   one bit per tile, set when the tile has a mine
+    state bytes   one byte per tile, see HIDDEN, UNCOVERED and FLAGGED
+
+Tiles are indexed column by column, the same order Board creates them in.
+"""
+
+import logging
+import mmap
+import os
+import struct
+from datetime import date
+
+MAGIC = b'MSWP'
+FORMAT_VERSION = 3
+HEADER_FORMAT = '<4sHIIIQqId'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+# Offset of the elapsed seconds within the header
+ELAPSED_OFFSET = HEADER_SIZE - struct.calcsize('<d')
+
+# Tile states stored in the state bytes
+HIDDEN = 0
+UNCOVERED = 1
+FLAGGED = 2
+
+
+class SaveFileError(Exception):
+    """Raised when a save file is missing or has an unexpected layout"""
+
+
+def save_path(level):
+    """Returns the path of the save file for the passed level
+
+    Args:
+        level (str): The difficulty level of the game
+    Returns:
+        str: Path of the save file
+    """
+    return f'{level}_game.sav'
+
+
+def tile_index(*, column, row, rows):
+    """Returns the index of a tile within the mine bitmap and state bytes
+
+    Args:
+        column (int): Column number of the tile
+        row (int): Row number of the tile
+        rows (int): Number of rows on the board
+    Returns:
+        int: Index of the tile
+    """
+    return column * rows + row
+
+
+class SaveFile():
+    """Class that represents a memory-mapped save file"""
+    def __init__(self, path):
+        """Initializes a SaveFile object by memory-mapping an existing file
+        and checking its header. Nothing past the header is read
+
+        Args:
+            path (str): Path of the save file
+        """
+        self.path = path
+        self._file = open(path, 'r+b')  # pylint: disable=consider-using-with
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0)
+        except ValueError as ex:
+            self._file.close()
+            raise SaveFileError(f'The save file {path} is empty') from ex
+        if len(self._map) < HEADER_SIZE:
+            self.close()
+            raise SaveFileError(f'The save file {path} is truncated')
+        (magic, version, self.columns, self.rows, self.mines, self.seed,
+         self.db_id, day_ordinal, _) = struct.unpack_from(HEADER_FORMAT,
+                                                          self._map)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise SaveFileError(f'The save file {path} has an unsupported '
+                                f'format')
+        # Day of the daily challenge, None for the other levels
+        self.day = date.fromordinal(day_ordinal) if day_ordinal else None
+        self.num_tiles = self.columns * self.rows
+        self._state_offset = HEADER_SIZE + (self.num_tiles + 7) // 8
+        if len(self._map) != self._state_offset + self.num_tiles:
+            self.close()
+            raise SaveFileError(f'The save file {path} is truncated')
+
+    @classmethod
+    def create(cls, path, *, board, db_id, day=None):
+        """Writes a new save file for the passed board and memory-maps it
+
+        Args:
+            path (str): Path of the save file
+            board (Board): Board whose mines have been set
+            db_id (int): Id of the game's play_history entry
+            day (date): Day of the daily challenge. Defaults to None for the
+                other levels
+        Returns:
+            SaveFile: The memory-mapped save file
+        """
+        num_tiles = board.columns * board.rows
+        mine_bitmap = bytearray((num_tiles + 7) // 8)
+        states = bytearray(num_tiles)
+        for tile in board.tiles.values():
+            index = tile_index(column=tile.column, row=tile.row,
+                               rows=board.rows)
+            if tile.is_mine:
+                mine_bitmap[index >> 3] |= 1 << (index & 7)
+            states[index] = tile_state(tile)
+        header = struct.pack(HEADER_FORMAT, MAGIC, FORMAT_VERSION,
+                             board.columns, board.rows, board.mines,
+                             board.seed, db_id or 0,
+                             day.toordinal() if day is not None else 0, 0.0)
+        with open(path, 'wb') as save_file:
+            save_file.write(header)
+            save_file.write(mine_bitmap)
+            save_file.write(states)
+        logging.info(f'Created the save file: {path}')
+        return cls(path)
+
+    @property
+    def elapsed_time(self):
+        """float: Number of seconds the game has been played for"""
+        return struct.unpack_from('<d', self._map, ELAPSED_OFFSET)[0]
+
+    def write_elapsed_time(self, elapsed_time):
+        """Writes the elapsed time into the header
+
+        Args:
+            elapsed_time (float): Number of seconds the game has been played
+        """
+        struct.pack_into('<d', self._map, ELAPSED_OFFSET, elapsed_time)
+
+    def is_mine(self, index):
+        """Checks the mine bitmap for the passed tile index
+
+        Args:
+            index (int): Index of the tile
+        Returns:
+            bool: If the tile has a mine
+        """
+        return bool(self._map[HEADER_SIZE + (index >> 3)] >> (index & 7) & 1)
+
+    def get_state(self, index):
+        """Returns the state byte for the passed tile index
+
+        Args:
+            index (int): Index of the tile
+        Returns:
+            int: HIDDEN, UNCOVERED or FLAGGED
+        """
+        return self._map[self._state_offset + index]
+
+    def write_state(self, index, state):
+        """Writes a single state byte, leaving the rest of the file untouched
+
+        Args:
+            index (int): Index of the tile
+            state (int): HIDDEN, UNCOVERED or FLAGGED
+        """
+        self._map[self._state_offset + index] = state
+
+    def write_tile(self, tile):
+        """Writes the state byte of the passed tile
+
+        Args:
+            tile (Tile): Tile whose state changed
+        """
+        self.write_state(tile_index(column=tile.column, row=tile.row,
+                                    rows=self.rows),
+                         tile_state(tile))
+
+    def restore_board(self, board):
+        """Sets the mines and tile states of the passed board from the save
+        file
+
+        Args:
+            board (Board): Board with the same geometry as the save file
+        """
+        if (board.columns, board.rows) != (self.columns, self.rows):
+            raise SaveFileError(f'The save file {self.path} does not match '
+                                f'the board size')
+        board.seed = self.seed
+        for tile in board.tiles.values():
+            index = tile_index(column=tile.column, row=tile.row,
+                               rows=self.rows)
+            tile.is_mine = self.is_mine(index)
+            state = self.get_state(index)
+            tile.is_hidden = state != UNCOVERED
+            tile.is_flag_set = state == FLAGGED
+            if tile.is_flag_set:
+                board.num_mines_left -= 1
+        board.set_adjacent_mine_counts()
+        board.count_hidden_safe_tiles()
+
+    def close(self):
+        """Flushes and closes the memory map and the file"""
+        if not self._map.closed:
+            self._map.flush()
+            self._map.close()
+        self._file.close()
+
+    def delete(self):
+        """Closes and removes the save file"""
+        self.close()
+        os.remove(self.path)
+        logging.info(f'Deleted the save file: {self.path}')
+
+
+def tile_state(tile):
+    """Returns the save file state of the passed tile
+
+    Args:
+        tile (Tile): Tile to check
+    Returns:
+        int: HIDDEN, UNCOVERED or FLAGGED
+    """
+    if not tile.is_hidden:
+        return UNCOVERED
+    if tile.is_flag_set:
+        return FLAGGED
+    return HIDDEN
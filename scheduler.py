@@ -0,0 +1,199 @@
+"""
+Module with the Scheduler class which runs long work on the Tk event loop
+without freezing the windows.
+
+Work that touches the widgets is written as a generator that yields every so
+often. The scheduler resumes the generators from root.after callbacks and
+ends each slice once it has run for SLICE_MS, so input is handled between
+slices. Tasks run one after another in the order they were started, so a task
+can rely on the tasks started before it having finished. A generator can
+yield a number between 0 and 1 to report its progress.
+
+Work that doesn't touch Tk can run in a worker thread instead. Its result is
+put on a queue which the scheduler drains on the event loop, so the
+callbacks always run on the UI thread.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+# Milliseconds a slice of the tasks may run before yielding to the event loop
+SLICE_MS = 8
+# Milliseconds between the checks for worker results while no task is running
+WORKER_POLL_MS = 20
+
+
+class Task():
+    """Class that represents work started on a Scheduler"""
+    def __init__(self, generator=None, *, on_done=None, on_progress=None):
+        """Initializes a Task object
+
+        Args:
+            generator: Generator doing the work in steps, or None for work
+                running in a worker thread. Defaults to None
+            on_done (callable): Called with the result once the work is done.
+                Defaults to None
+            on_progress (callable): Called with the progress after each slice
+                the progress changed in. Defaults to None
+        """
+        self.generator = generator
+        self.on_done = on_done
+        self.on_progress = on_progress
+        self.progress = 0.0
+        self.done = False
+        self.cancelled = False
+
+    @property
+    def pending(self):
+        """bool: If the task hasn't finished or been cancelled"""
+        return not (self.done or self.cancelled)
+
+    def cancel(self):
+        """Stops the task. Its callbacks won't be called"""
+        if not self.pending:
+            return
+        self.cancelled = True
+        if self.generator is not None:
+            self.generator.close()
+
+
+class Scheduler():
+    """Class that runs tasks in slices on a Tk event loop"""
+    def __init__(self, root):
+        """Initializes a Scheduler object
+
+        Args:
+            root: Tk root whose event loop runs the tasks
+        """
+        self._root = root
+        self._tasks = deque()
+        self._workers = set()
+        self._results = queue.SimpleQueue()
+        self._after_id = None
+
+    @property
+    def idle(self):
+        """bool: If no task or worker is pending"""
+        return not (self._tasks or self._workers)
+
+    def spawn(self, generator, *, on_done=None, on_progress=None):
+        """Starts running a generator in slices after the tasks started
+        before it
+
+        Args:
+            generator: Generator doing the work in steps. Its return value is
+                passed to on_done
+            on_done (callable): Called with the result once the generator is
+                exhausted. Defaults to None
+            on_progress (callable): Called with the progress after each slice
+                the progress changed in. Defaults to None
+        Returns:
+            Task: The started task
+        """
+        task = Task(generator, on_done=on_done, on_progress=on_progress)
+        self._tasks.append(task)
+        self._schedule(1)
+        return task
+
+    def run_in_thread(self, function, *, on_done):
+        """Calls a function in a worker thread and passes its result to
+        on_done on the event loop. The function must not use Tk
+
+        Args:
+            function (callable): Function to call without arguments
+            on_done (callable): Called with the function's result
+        Returns:
+            Task: The started task
+        """
+        task = Task(on_done=on_done)
+        self._workers.add(task)
+        threading.Thread(target=self._work, args=(task, function),
+                         daemon=True, name='SchedulerWorker').start()
+        self._schedule(WORKER_POLL_MS)
+        return task
+
+    def _work(self, task, function):
+        """Calls a worker's function and queues its result
+
+        Args:
+            task (Task): The worker's task
+            function (callable): Function to call without arguments
+        """
+        try:
+            self._results.put((task, function(), None))
+        except Exception as ex:  # pylint: disable=broad-exception-caught
+            self._results.put((task, None, ex))
+
+    def _schedule(self, delay_ms):
+        """Schedules the next slice unless one is already scheduled
+
+        Args:
+            delay_ms (int): Milliseconds until the slice
+        """
+        if self._after_id is None:
+            self._after_id = self._root.after(delay_ms, self.run_slice)
+
+    def _deliver_results(self):
+        """Passes the results of the finished workers to their callbacks"""
+        while True:
+            try:
+                task, result, error = self._results.get_nowait()
+            except queue.Empty:
+                return
+            self._workers.discard(task)
+            if not task.pending:
+                continue
+            task.done = True
+            if error is not None:
+                logging.error(f'A background task failed: {error!r}')
+            elif task.on_done is not None:
+                task.on_done(result)
+
+    def run_slice(self):
+        """Delivers the worker results and runs the tasks until the slice
+        time is used up, then schedules the next slice if anything is left"""
+        self._after_id = None
+        self._deliver_results()
+        deadline = time.perf_counter() + SLICE_MS / 1000
+        reported = None
+        while self._tasks and time.perf_counter() < deadline:
+            task = self._tasks[0]
+            if task.cancelled:
+                self._tasks.popleft()
+                continue
+            try:
+                progress = next(task.generator)
+            except StopIteration as stop:
+                self._tasks.popleft()
+                task.done = True
+                task.progress = 1.0
+                if task.on_done is not None:
+                    task.on_done(stop.value)
+                continue
+            except Exception:  # pylint: disable=broad-exception-caught
+                self._tasks.popleft()
+                task.cancelled = True
+                logging.exception('A scheduled task failed')
+                continue
+            if progress is not None:
+                task.progress = progress
+                reported = task
+        if (reported is not None and reported.pending and
+                reported.on_progress is not None):
+            reported.on_progress(reported.progress)
+        if self._tasks:
+            self._schedule(1)
+        elif self._workers:
+            self._schedule(WORKER_POLL_MS)
+
+    def cancel_all(self):
+        """Cancels every pending task and worker"""
+        for task in list(self._tasks) + list(self._workers):
+            task.cancel()
+        self._tasks.clear()
+        if self._after_id is not None:
+            self._root.after_cancel(self._after_id)
+            self._after_id = None
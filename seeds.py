@@ -0,0 +1,69 @@
+"""
+Module with the helper functions used to create and share game seeds
+"""
+
+import hashlib
+import random
+from datetime import datetime, timezone
+
+SEED_BITS = 64
+
+
+def new_seed():
+    """Returns a new random seed
+
+    Returns:
+        int: 64-bit seed
+    """
+    return random.SystemRandom().getrandbits(SEED_BITS)
+
+
+def daily_seed(day=None):
+    """Returns the seed of the daily challenge board. Every player gets the
+    same seed on the same UTC day
+
+    Args:
+        day (date): Day of the challenge. Defaults to None in which case the
+            current UTC day is used
+    Returns:
+        int: 64-bit seed
+    """
+    if day is None:
+        day = today()
+    digest = hashlib.sha256(f'daily:{day.isoformat()}'.encode()).digest()
+    return int.from_bytes(digest[:SEED_BITS // 8], 'big')
+
+
+def today():
+    """Returns the current UTC day
+
+    Returns:
+        date: The current UTC day
+    """
+    return datetime.now(timezone.utc).date()
+
+
+def format_seed(seed):
+    """Formats a seed as the 16 hex digits stored in the database and shared
+    between players
+
+    Args:
+        seed (int): 64-bit seed
+    Returns:
+        str: Hex representation of the seed
+    """
+    return f'{seed:016x}'
+
+
+def parse_seed(seed_text):
+    """Parses a seed formatted by format_seed
+
+    Args:
+        seed_text (str): Hex representation of the seed
+    Returns:
+        int: 64-bit seed
+    """
+    seed = int(seed_text, 16)
+    if not 0 <= seed < 1 << SEED_BITS:
+        raise ValueError(f'The seed {seed_text} is not a 64-bit number')
+    return seed
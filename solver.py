@@ -0,0 +1,604 @@
+"""
+Module with the Solver class which finds the safe tiles, the mines, and the
+mine probabilities of a position, for hints on boards of any size.
+
+A position is one byte per tile in flat index order, column * rows + row,
+see board_state. Uncovered tiles hold their number of adjacent mines and the
+other tiles hold delta.HIDDEN or delta.FLAGGED. Flags are treated as hidden
+tiles, since they may be wrong. A tile that is known to have a mine holds
+delta.MINE instead, and is subtracted from the numbers next to it and from
+the mine count before the position is solved.
+
+The hidden tiles next to a number form the frontier. The frontier is split
+into components that share no number, which can be solved independently:
+every number of a component only has hidden neighbors in that component. A
+component is solved exactly with a sweep over its tiles in breadth-first
+order that keeps, for every assignment of the tiles so far, only how many
+mines the numbers that are still open need. Arrangements are weighted by the
+odds of their mine count at the density of the hidden tiles, which treats
+the tiles away from the numbers as independent, as they are on large boards.
+A forward and a backward sweep give the mine probability of every tile, and
+a tile is safe or a mine when no arrangement says otherwise. A component
+whose sweep would keep more than MAX_STATES assignments falls back to the
+mean mine density of its numbers.
+
+Components of up to INLINE_TILES tiles are solved in the calling process.
+Larger ones go to a process pool and the results are put back in component
+order, so the solution doesn't depend on which worker finished first. The
+position and the neighbor table are put in shared memory that the workers
+attach to once when they start, so a solve only pickles the tiles of each
+component rather than the board.
+"""
+
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+from delta import FLAGGED, HIDDEN, MINE
+from neighbors import neighbor_table
+from tile import UNCOVERED
+
+# Largest component solved in the calling process
+INLINE_TILES = 64
+# Largest number of assignments a component's sweep keeps at once
+MAX_STATES = 20000
+# Largest number of adjacent mines, higher codes are hidden tiles up to MINE
+MAX_NUMBER = 8
+
+# Shared memory a pool worker attached to when it started
+_worker = {}
+
+
+def board_state(board):
+    """Returns the position of a board
+
+    Args:
+        board (Board): Board to get the position of
+    Returns:
+        bytearray: One code per tile in flat index order
+    """
+    state = bytearray(len(board.tile_list))
+    for index, tile in enumerate(board.tile_list):
+        if tile.state == UNCOVERED:
+            state[index] = tile.num_adjacent_mines or 0
+        else:
+            state[index] = FLAGGED if tile.is_flag_set else HIDDEN
+    return state
+
+
+def _find(parent, index):
+    """Returns the root of a tile's component, halving the path on the way
+
+    Args:
+        parent (dict): Parent of every frontier tile
+        index (int): Flat index of the tile
+    Returns:
+        int: Flat index of the component's root
+    """
+    while parent[index] != index:
+        parent[index] = parent[parent[index]]
+        index = parent[index]
+    return index
+
+
+def subtract_known_mines(state, table):
+    """Subtracts the known mines from the numbers next to them
+
+    Args:
+        state (bytes-like): The position
+        table (NeighborTable): Neighbor table of the board
+    Returns:
+        tuple: The position with the numbers of the mines that are still
+            hidden, and the number of known mines
+    """
+    known = [index for index, code in enumerate(state) if code >= MINE]
+    if not known:
+        return state, 0
+    state = bytearray(state)
+    for index in known:
+        for neighbor in table.neighbors(index):
+            if state[neighbor] <= MAX_NUMBER:
+                if not state[neighbor]:
+                    raise ValueError('A known mine is next to a number '
+                                     'without mines')
+                state[neighbor] -= 1
+    return state, len(known)
+
+
+def frontier_components(state, table):
+    """Splits the frontier of a position into independent components
+
+    Args:
+        state (bytes-like): The position
+        table (NeighborTable): Neighbor table of the board
+    Returns:
+        list: Sorted flat indices of each component's tiles, ordered by
+            their first tile
+    """
+    offsets = table.offsets
+    indices = table.indices
+    parent = {}
+    for index, code in enumerate(state):
+        if code > MAX_NUMBER:
+            continue
+        root = None
+        for neighbor in indices[offsets[index]:offsets[index + 1]]:
+            if not MAX_NUMBER < state[neighbor] < MINE:
+                continue
+            if neighbor not in parent:
+                parent[neighbor] = neighbor
+            if root is None:
+                root = _find(parent, neighbor)
+            else:
+                neighbor_root = _find(parent, neighbor)
+                if neighbor_root != root:
+                    parent[neighbor_root] = root
+    components = {}
+    for index in parent:
+        components.setdefault(_find(parent, index), []).append(index)
+    return sorted(sorted(cells) for cells in components.values())
+
+
+def _sweep_order(state, offsets, indices, cells):
+    """Orders a component's tiles breadth first over its numbers and lists
+    the numbers' tiles
+
+    Args:
+        state (bytes-like): The position
+        offsets (sequence): Neighbor table offsets
+        indices (sequence): Neighbor table indices
+        cells (list): Flat indices of the component's tiles
+    Returns:
+        tuple: The tiles in sweep order, and for each number its mine count
+            and the sweep positions of its hidden neighbors
+    """
+    numbers = {}
+    for cell in cells:
+        for neighbor in indices[offsets[cell]:offsets[cell + 1]]:
+            if neighbor not in numbers and state[neighbor] <= MAX_NUMBER:
+                numbers[neighbor] = [
+                    hidden for hidden in
+                    indices[offsets[neighbor]:offsets[neighbor + 1]]
+                    if MAX_NUMBER < state[hidden] < MINE]
+    numbers_of = {cell: [] for cell in cells}
+    for number, hidden in numbers.items():
+        for cell in hidden:
+            numbers_of[cell].append(number)
+    order = []
+    position = {}
+    for start in cells:
+        if start in position:
+            continue
+        position[start] = len(order)
+        order.append(start)
+        head = len(order) - 1
+        while head < len(order):
+            for number in numbers_of[order[head]]:
+                for cell in numbers[number]:
+                    if cell not in position:
+                        position[cell] = len(order)
+                        order.append(cell)
+            head += 1
+    constraints = [(state[number], sorted(position[cell] for cell in hidden))
+                   for number, hidden in sorted(numbers.items())]
+    return order, constraints
+
+
+def _sweep_steps(num_tiles, constraints):
+    """Precomputes how each tile of the sweep updates the mines the open
+    numbers need. A number is open from its first tile until its last tile
+
+    Args:
+        num_tiles (int): Number of tiles in the component
+        constraints (list): Mine count and sorted tile positions of every
+            number
+    Returns:
+        list: For every tile, the (source, slot) pairs of the open numbers it
+            isn't next to, and the (source, mine count, tiles left, slot)
+            tuples of the numbers it's next to. A source is the number's
+            position in the state before the tile, or -1 if the number starts
+            at the tile, and a slot its position in the state after the tile,
+            or -1 if the number ends at the tile
+    """
+    starting = [[] for _ in range(num_tiles)]
+    touching = [[] for _ in range(num_tiles)]
+    for number, (_, positions) in enumerate(constraints):
+        starting[positions[0]].append(number)
+        for left, position in enumerate(reversed(positions)):
+            touching[position].append((number, left))
+    steps = []
+    active = []
+    for position in range(num_tiles):
+        after = [number for number in active + starting[position]
+                 if constraints[number][1][-1] > position]
+        source = {number: index for index, number in enumerate(active)}
+        slot = {number: index for index, number in enumerate(after)}
+        touched = tuple((source.get(number, -1), constraints[number][0], left,
+                         slot.get(number, -1))
+                        for number, left in touching[position])
+        kept = tuple((source[number], slot[number]) for number in after
+                     if number in source and
+                     position not in constraints[number][1])
+        steps.append((kept, touched, len(after)))
+        active = after
+    return steps
+
+
+def _transition(needs, step, mine):
+    """Assigns one tile of the sweep
+
+    Args:
+        needs (tuple): Mines the open numbers still need
+        step (tuple): The tile's step, see _sweep_steps
+        mine (int): 1 if the tile has a mine, otherwise 0
+    Returns:
+        tuple: Mines the numbers open after the tile still need, or None if
+            the assignment breaks a number
+    """
+    kept, touched, num_after = step
+    after = [0] * num_after
+    for source, slot in kept:
+        after[slot] = needs[source]
+    for source, count, left, slot in touched:
+        need = (needs[source] if source >= 0 else count) - mine
+        if need < 0 or need > left:
+            return None
+        if slot >= 0:
+            after[slot] = need
+    return tuple(after)
+
+
+def _forward_sweep(steps, odds):
+    """Sweeps a component's tiles, keeping the weight of the assignments
+    that reach each state
+
+    Args:
+        steps (list): The tiles' steps, see _sweep_steps
+        odds (float): Odds of a hidden tile having a mine
+    Returns:
+        list: For every tile, the weight of each state before it and the
+            states the tile leads to without and with a mine, or None if the
+            sweep keeps too many states or no assignment satisfies the
+            numbers
+    """
+    weights = (1.0, odds)
+    states = {(): 1.0}
+    sweep = []
+    for step in steps:
+        current = {}
+        transitions = {}
+        for needs, weight in states.items():
+            afters = (_transition(needs, step, 0), _transition(needs, step, 1))
+            transitions[needs] = afters
+            for mine, after in enumerate(afters):
+                if after is not None:
+                    current[after] = (current.get(after, 0.0) +
+                                      weight * weights[mine])
+        if len(current) > MAX_STATES or not current:
+            return None
+        sweep.append((states, transitions))
+        # Each step is scaled to its heaviest state so the weights of large
+        # components don't underflow
+        peak = max(current.values())
+        states = {needs: weight / peak for needs, weight in current.items()}
+    return sweep
+
+
+def _backward_sweep(sweep, odds):
+    """Sweeps a component's tiles in reverse, finding the mine probability of
+    each tile from the weight of the completions of every state
+
+    Args:
+        sweep (list): The forward sweep, see _forward_sweep
+        odds (float): Odds of a hidden tile having a mine
+    Returns:
+        list: Mine probability of each tile in sweep order
+    """
+    weights = (1.0, odds)
+    completions = {(): 1.0}
+    probabilities = []
+    for states, transitions in reversed(sweep):
+        previous = {}
+        totals = [0.0, 0.0]
+        for needs, weight in states.items():
+            for mine, after in enumerate(transitions[needs]):
+                if after in completions:
+                    completion = weights[mine] * completions[after]
+                    previous[needs] = previous.get(needs, 0.0) + completion
+                    totals[mine] += weight * completion
+        # A tile is only safe or a mine for sure if no assignment says
+        # otherwise, so those aren't left to rounding
+        if not totals[1]:
+            probabilities.append(0.0)
+        elif not totals[0]:
+            probabilities.append(1.0)
+        else:
+            probabilities.append(totals[1] / (totals[0] + totals[1]))
+        peak = max(previous.values())
+        completions = {needs: weight / peak
+                       for needs, weight in previous.items()}
+    probabilities.reverse()
+    return probabilities
+
+
+def solve_component(state, offsets, indices, cells, odds):
+    """Finds the mine probability of every tile of a component
+
+    Args:
+        state (bytes-like): The position
+        offsets (sequence): Neighbor table offsets
+        indices (sequence): Neighbor table indices
+        cells (list): Flat indices of the component's tiles
+        odds (float): Odds of a hidden tile having a mine
+    Returns:
+        list: Mine probability of each tile, in the order of cells. Safe
+            tiles are exactly 0 and mines exactly 1
+    """
+    order, constraints = _sweep_order(state, offsets, indices, cells)
+    sweep = _forward_sweep(_sweep_steps(len(order), constraints), odds)
+    if sweep is None:
+        return _fallback(state, offsets, indices, cells)
+    probabilities = dict(zip(order, _backward_sweep(sweep, odds)))
+    return [probabilities[cell] for cell in cells]
+
+
+def _fallback(state, offsets, indices, cells):
+    """Estimates the mine probability of a component's tiles from the mean
+    mine density of their numbers
+
+    Args:
+        state (bytes-like): The position
+        offsets (sequence): Neighbor table offsets
+        indices (sequence): Neighbor table indices
+        cells (list): Flat indices of the component's tiles
+    Returns:
+        list: Mine probability of each tile, in the order of cells
+    """
+    probabilities = []
+    for cell in cells:
+        densities = []
+        for number in indices[offsets[cell]:offsets[cell + 1]]:
+            if state[number] <= MAX_NUMBER:
+                hidden = sum(
+                    1 for neighbor in
+                    indices[offsets[number]:offsets[number + 1]]
+                    if MAX_NUMBER < state[neighbor] < MINE)
+                densities.append(state[number] / hidden)
+        probabilities.append(min(sum(densities) / len(densities), 1.0))
+    return probabilities
+
+
+def _attach_worker(state_name, table_name, num_tiles, num_offsets):
+    """Attaches a pool worker to the shared position and neighbor table
+
+    Args:
+        state_name (str): Name of the position's shared memory
+        table_name (str): Name of the neighbor table's shared memory
+        num_tiles (int): Number of tiles on the board
+        num_offsets (int): Number of neighbor table offsets
+    """
+    state_memory = shared_memory.SharedMemory(name=state_name)
+    table_memory = shared_memory.SharedMemory(name=table_name)
+    table = table_memory.buf.cast('I')
+    _worker.update(state_memory=state_memory, table_memory=table_memory,
+                   state=state_memory.buf[:num_tiles],
+                   offsets=table[:num_offsets], indices=table[num_offsets:])
+
+
+def _solve_shared(task):
+    """Solves a component in a pool worker from the shared position
+
+    Args:
+        task (tuple): The component's tiles and the mine odds
+    Returns:
+        list: Mine probability of each tile
+    """
+    cells, odds = task
+    return solve_component(_worker['state'], _worker['offsets'],
+                           _worker['indices'], cells, odds)
+
+
+class Solution():
+    """Class that holds the mine probabilities of a position"""
+    def __init__(self, probabilities, *, num_components, interior):
+        """Initializes a Solution object
+
+        Args:
+            probabilities (list): Mine probability of every tile, None for
+                the uncovered tiles and the known mines
+            num_components (int): Number of frontier components
+            interior (float): Mine probability of the hidden tiles away
+                from the numbers
+        """
+        self.probabilities = probabilities
+        self.num_components = num_components
+        self.interior = interior
+
+    @property
+    def safe(self):
+        """list: Flat indices of the hidden tiles that can't have a mine"""
+        return [index for index, probability in enumerate(self.probabilities)
+                if probability == 0.0]
+
+    @property
+    def mines(self):
+        """list: Flat indices of the hidden tiles that must have a mine"""
+        return [index for index, probability in enumerate(self.probabilities)
+                if probability == 1.0]
+
+    def best_guess(self):
+        """Returns the hidden tile least likely to have a mine, the first
+        one of equally likely tiles
+
+        Returns:
+            int: Flat index of the tile, or None if no tile is hidden
+        """
+        best = None
+        for index, probability in enumerate(self.probabilities):
+            if probability is not None and (
+                    best is None or probability < self.probabilities[best]):
+                best = index
+        return best
+
+
+class Solver():
+    """Class that solves the positions of one board geometry, with a process
+    pool for the large components"""
+    def __init__(self, *, columns, rows, mines, processes=None,
+                 inline_tiles=INLINE_TILES):
+        """Initializes a Solver object
+
+        Args:
+            columns (int): Number of columns on the board
+            rows (int): Number of rows on the board
+            mines (int): Number of mines on the board
+            processes (int): Number of worker processes. Defaults to None in
+                which case one per CPU is started. With 0 every component is
+                solved in the calling process
+            inline_tiles (int): Largest component solved in the calling
+                process. Defaults to INLINE_TILES
+        """
+        self.columns = columns
+        self.rows = rows
+        self.mines = mines
+        self.num_tiles = columns * rows
+        self.inline_tiles = inline_tiles
+        self.table = neighbor_table(columns, rows)
+        self._pool = None
+        self._state_memory = None
+        self._table_memory = None
+        if processes is None:
+            processes = os.cpu_count() or 1
+        if processes:
+            self._start_pool(processes)
+
+    def _start_pool(self, processes):
+        """Puts the neighbor table in shared memory and starts the workers
+
+        Args:
+            processes (int): Number of worker processes
+        """
+        table = self.table.offsets + self.table.indices
+        self._table_memory = shared_memory.SharedMemory(
+            create=True, size=len(table) * table.itemsize)
+        self._table_memory.buf[:] = table.tobytes()
+        self._state_memory = shared_memory.SharedMemory(
+            create=True, size=self.num_tiles)
+        # The pool lives as long as the solver, see close
+        self._pool = multiprocessing.Pool(  # pylint: disable=consider-using-with
+            processes, initializer=_attach_worker,
+            initargs=(self._state_memory.name, self._table_memory.name,
+                      self.num_tiles, len(self.table.offsets)))
+
+    def close(self):
+        """Stops the workers and frees the shared memory"""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        for memory in (self._state_memory, self._table_memory):
+            if memory is not None:
+                memory.close()
+                memory.unlink()
+        self._state_memory = self._table_memory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def solve(self, state):
+        """Finds the mine probabilities of a position
+
+        Args:
+            state (bytes-like): The position, see board_state
+        Returns:
+            Solution: The mine probability of every tile
+        """
+        if len(state) != self.num_tiles:
+            raise ValueError('The position does not match the board')
+        state, num_known = subtract_known_mines(state, self.table)
+        mines = self.mines - num_known
+        num_hidden = sum(1 for code in state if MAX_NUMBER < code < MINE)
+        density = min(max(mines / max(num_hidden, 1), 1e-9), 1 - 1e-9)
+        odds = density / (1 - density)
+        components = frontier_components(state, self.table)
+        results = [None] * len(components)
+        large, pending = self._start_large_components(state, components,
+                                                      odds)
+        for number, cells in enumerate(components):
+            if pending is None or len(cells) <= self.inline_tiles:
+                results[number] = solve_component(
+                    state, self.table.offsets, self.table.indices, cells,
+                    odds)
+        if pending is not None:
+            for number, probabilities in zip(large, pending.get()):
+                results[number] = probabilities
+        return self._combine(state, mines, components, results)
+
+    def _start_large_components(self, state, components, odds):
+        """Starts solving the components too large for the calling process
+        on the pool
+
+        Args:
+            state (bytes-like): The position
+            components (list): Flat indices of each component's tiles
+            odds (float): Odds of a hidden tile having a mine
+        Returns:
+            tuple: Numbers of the components sent to the pool, and the
+                pending result of their probabilities in that order, or None
+                if every component is solved in the calling process
+        """
+        large = [number for number, cells in enumerate(components)
+                 if len(cells) > self.inline_tiles]
+        if self._pool is None or not large:
+            return large, None
+        self._state_memory.buf[:self.num_tiles] = bytes(state)
+        # The largest components are started first so no worker is left
+        # with a big one at the end
+        large.sort(key=lambda number: -len(components[number]))
+        return large, self._pool.map_async(
+            _solve_shared, [(components[number], odds) for number in large],
+            chunksize=1)
+
+    def _combine(self, state, mines, components, results):
+        """Builds the solution from the components' probabilities
+
+        Args:
+            state (bytes-like): The position
+            mines (int): Number of mines that aren't known
+            components (list): Flat indices of each component's tiles
+            results (list): Mine probabilities of each component's tiles
+        Returns:
+            Solution: The mine probability of every tile
+        """
+        probabilities = [-1.0 if MAX_NUMBER < code < MINE else None
+                         for code in state]
+        frontier_mines = 0.0
+        for cells, cell_probabilities in zip(components, results):
+            for cell, probability in zip(cells, cell_probabilities):
+                probabilities[cell] = probability
+                frontier_mines += probability
+        num_interior = probabilities.count(-1.0)
+        interior = 0.0
+        if num_interior:
+            # The interior comes from the frontier's expected mine count,
+            # which doesn't rule a tile in or out, so it's never exactly
+            # safe or a mine
+            interior = min(max((mines - frontier_mines) / num_interior,
+                               1e-9), 1 - 1e-9)
+            probabilities = [interior if probability == -1.0 else probability
+                             for probability in probabilities]
+        return Solution(probabilities, num_components=len(components),
+                        interior=interior)
+
+    def hint(self, state):
+        """Returns the tile to reveal next: a safe tile if there is one,
+        otherwise the tile least likely to have a mine
+
+        Args:
+            state (bytes-like): The position, see board_state
+        Returns:
+            int: Flat index of the tile, or None if no tile is hidden
+        """
+        return self.solve(state).best_guess()
@@ -0,0 +1,350 @@
+"""
+Module with the Storage class which holds the one database connection shared
+by every game in the process, and the queries shared by the games.
+
+Several game processes can share the database. A fastest time is therefore
+added in two steps, each a single BEGIN IMMEDIATE transaction: when the game
+is won its time is reserved as a pending entry, if it ranks in the top
+NUM_FASTEST_TIMES, and once the player has entered their name the entry is
+completed and the entries pushed out of the top NUM_FASTEST_TIMES are
+deleted. The leaderboard only shows completed entries, and pending entries
+left behind by a process that died are dropped after PENDING_TIMEOUT.
+"""
+
+import logging
+import sqlite3
+import time
+from contextlib import contextmanager
+
+DATABASE_PATH = 'minesweeper.db'
+# Number of entries kept on each leaderboard
+NUM_FASTEST_TIMES = 10
+# Seconds after which an uncompleted leaderboard entry is dropped
+PENDING_TIMEOUT = 15 * 60
+# SQL expression for a random UUID, formatted like uuid.UUID.hex
+NEW_UUID_SQL = 'lower(hex(randomblob(16)))'
+
+
+class Storage():
+    """Class that represents the game database"""
+    def __init__(self, path=DATABASE_PATH):
+        """Initializes a Storage object by opening the database and creating
+        the tables
+
+        Args:
+            path (str): Path of the database file. Defaults to DATABASE_PATH
+        """
+        self.path = path
+        # Wait for the background maintenance and other game processes
+        # rather than failing a write while they hold the database
+        self.conn = sqlite3.connect(path, timeout=30)
+        create_tables(self.conn)
+
+    def close(self):
+        """Closes the database connection"""
+        logging.info('Closing the database connection')
+        self.conn.close()
+
+
+def create_tables(conn):
+    """Creates the tables, if they haven't already been created
+
+    Args:
+        conn: sqlite3 connection object
+    """
+    # Let the maintenance return freed pages without a full vacuum. This only
+    # applies to new databases, the maintenance converts older ones
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    # Create the tables if they don't exist
+    conn.execute("""CREATE TABLE IF NOT EXISTS play_history (
+                        id integer PRIMARY KEY NOT NULL,
+                        level text NOT NULL,
+                        game_won int,
+                        game_run_time int,
+                        finished int NOT NULL,
+                        start_time text NOT NULL,
+                        end_time text,
+                        seed text,
+                        three_bv int,
+                        clicks int,
+                        three_bv_per_second real,
+                        uuid text);""")
+
+    conn.execute("""CREATE TABLE IF NOT EXISTS fastest_times (
+                        id integer PRIMARY KEY NOT NULL,
+                        level text NOT NULL,
+                        game_run_time int NOT NULL,
+                        username text NOT NULL,
+                        pending int NOT NULL DEFAULT 0,
+                        reserved_at real,
+                        uuid text);""")
+
+    # Games rolled up by the maintenance, one row per day and level
+    conn.execute("""CREATE TABLE IF NOT EXISTS play_history_daily (
+                        day text NOT NULL,
+                        level text NOT NULL,
+                        games int NOT NULL,
+                        won int NOT NULL,
+                        finished int NOT NULL,
+                        total_run_time int NOT NULL,
+                        best_run_time int,
+                        total_three_bv int NOT NULL,
+                        total_clicks int NOT NULL,
+                        PRIMARY KEY (day, level));""")
+
+    # Click heatmap accumulators of each level, see heatmap.py
+    conn.execute("""CREATE TABLE IF NOT EXISTS heatmaps (
+                        level text PRIMARY KEY NOT NULL,
+                        columns int NOT NULL,
+                        rows int NOT NULL,
+                        games int NOT NULL,
+                        lost int NOT NULL,
+                        first_clicks blob NOT NULL,
+                        explosions blob NOT NULL,
+                        moves blob NOT NULL,
+                        think_time blob NOT NULL);""")
+
+    # Seeded boards rated by their difficulty, see catalog.py
+    conn.execute("""CREATE TABLE IF NOT EXISTS board_catalog (
+                        id integer PRIMARY KEY NOT NULL,
+                        level text NOT NULL,
+                        seed text NOT NULL,
+                        three_bv int NOT NULL,
+                        guesses int NOT NULL,
+                        deduction_depth int NOT NULL,
+                        UNIQUE (level, seed));""")
+
+    conn.execute("""CREATE TABLE IF NOT EXISTS settings (
+                        name text PRIMARY KEY NOT NULL,
+                        value text);""")
+
+    # Add the columns that were introduced after the tables were created
+    add_missing_column(conn, table='play_history', column='seed',
+                       definition='text')
+    add_missing_column(conn, table='play_history', column='three_bv',
+                       definition='int')
+    add_missing_column(conn, table='play_history', column='clicks',
+                       definition='int')
+    add_missing_column(conn, table='play_history',
+                       column='three_bv_per_second', definition='real')
+    add_missing_column(conn, table='fastest_times', column='pending',
+                       definition='int NOT NULL DEFAULT 0')
+    add_missing_column(conn, table='fastest_times', column='reserved_at',
+                       definition='real')
+    # Games and fastest times have a UUID so that the databases of several
+    # machines can be merged without duplicates. Older rows get a random one
+    for table in ('play_history', 'fastest_times'):
+        add_missing_column(conn, table=table, column='uuid',
+                           definition='text')
+        conn.execute(f'UPDATE {table} SET uuid = {NEW_UUID_SQL} '
+                     f'WHERE uuid IS NULL')
+        conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS {table}_uuid '
+                     f'ON {table}(uuid)')
+    conn.execute("""CREATE INDEX IF NOT EXISTS fastest_times_level
+                    ON fastest_times(level, game_run_time);""")
+    conn.execute("""CREATE INDEX IF NOT EXISTS play_history_efficiency
+                    ON play_history(level, three_bv_per_second);""")
+    conn.execute("""CREATE INDEX IF NOT EXISTS play_history_start_time
+                    ON play_history(start_time);""")
+    conn.execute("""CREATE INDEX IF NOT EXISTS board_catalog_difficulty
+                    ON board_catalog(level, guesses, three_bv,
+                                     deduction_depth);""")
+    conn.commit()
+
+
+def add_missing_column(conn, *, table, column, definition):
+    """Adds a column to a table created by an older version of the game
+
+    Args:
+        conn: sqlite3 connection object
+        table (str): Name of the table
+        column (str): Name of the column
+        definition (str): Type and constraints of the column
+    """
+    columns = [info[1] for info in
+               conn.execute(f'PRAGMA table_info({table})').fetchall()]
+    if column not in columns:
+        logging.info(f'Adding the {column} column to the {table} table')
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+
+def most_efficient_games(conn, *, level, limit=10):
+    """Selects the won games of a level with the highest 3BV per second,
+    which ranks the games by speed relative to how hard their boards were
+
+    Args:
+        conn: sqlite3 connection object
+        level (str): The difficulty level of the games
+        limit (int): Maximum number of games. Defaults to 10
+    Returns:
+        list: (3BV per second, 3BV, clicks, game run time, seed) tuples,
+            most efficient first
+    """
+    return conn.execute("""SELECT three_bv_per_second, three_bv, clicks,
+                                  game_run_time, seed
+                           FROM play_history
+                           WHERE level = ? AND game_won = 1 AND
+                                 three_bv_per_second IS NOT NULL
+                           ORDER BY three_bv_per_second DESC,
+                                    game_run_time
+                           LIMIT ?""", (level, limit)).fetchall()
+
+
+def play_stats(conn, *, level):
+    """Counts the games of a level, including the rolled up ones
+
+    Args:
+        conn: sqlite3 connection object
+        level (str): The difficulty level of the games
+    Returns:
+        tuple: Number of games, number of won games, and the fastest won
+            run time, or None if no game was won
+    """
+    games, won, best_run_time = conn.execute(
+        """SELECT SUM(games), SUM(won), MIN(best_run_time) FROM (
+               SELECT games, won, best_run_time FROM play_history_daily
+               WHERE level = ?
+               UNION ALL
+               SELECT COUNT(*), SUM(game_won),
+                      MIN(CASE WHEN game_won THEN game_run_time END)
+               FROM play_history WHERE level = ?)""",
+        (level, level)).fetchone()
+    return games or 0, won or 0, best_run_time
+
+
+def get_setting(conn, name):
+    """Returns a stored setting
+
+    Args:
+        conn: sqlite3 connection object
+        name (str): Name of the setting
+    Returns:
+        str: Value of the setting, or None if it isn't set
+    """
+    row = conn.execute('SELECT value FROM settings WHERE name = ?',
+                       (name,)).fetchone()
+    return row[0] if row is not None else None
+
+
+def set_setting(conn, name, value):
+    """Stores a setting
+
+    Args:
+        conn: sqlite3 connection object
+        name (str): Name of the setting
+        value (str): Value of the setting
+    """
+    conn.execute("""INSERT INTO settings(name, value) VALUES (?,?)
+                    ON CONFLICT(name) DO UPDATE SET value = excluded.value""",
+                 (name, value))
+    conn.commit()
+
+
+@contextmanager
+def immediate_transaction(conn):
+    """Runs the statements of the with block in one transaction which holds
+    the database's write lock from the start, so no other process can write
+    between its reads and writes
+
+    Args:
+        conn: sqlite3 connection object
+    """
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def top_times(conn, *, level):
+    """Selects the completed fastest times of a level. Of equal times the
+    newest ranks first
+
+    Args:
+        conn: sqlite3 connection object
+        level (str): Level of the leaderboard
+    Returns:
+        list: (game run time, username) tuples, fastest first
+    """
+    return conn.execute("""SELECT game_run_time, username FROM fastest_times
+                           WHERE level = ? AND pending = 0
+                           ORDER BY game_run_time, id DESC
+                           LIMIT ?""", (level, NUM_FASTEST_TIMES)).fetchall()
+
+
+def reserve_fastest_time(conn, *, level, game_run_time, game_uuid=None):
+    """Adds a pending leaderboard entry for a time if it ranks in the top
+    times of its level
+
+    Args:
+        conn: sqlite3 connection object
+        level (str): Level of the leaderboard
+        game_run_time (int): Run time of the won game
+        game_uuid (str): UUID of the won game. Defaults to None in which case
+            a random UUID is used
+    Returns:
+        tuple: The id of the pending entry, the rank of the time, and the
+            current top times as returned by top_times, or None if the time
+            doesn't rank
+    """
+    with immediate_transaction(conn):
+        conn.execute("""DELETE FROM fastest_times
+                        WHERE pending = 1 AND reserved_at < ?""",
+                     (time.time() - PENDING_TIMEOUT,))
+        times = top_times(conn, level=level)
+        rank = 1 + sum(1 for entry in times if entry[0] < game_run_time)
+        if rank > NUM_FASTEST_TIMES:
+            return None
+        cur = conn.execute(f"""INSERT INTO fastest_times(level,
+                                                         game_run_time,
+                                                         username, pending,
+                                                         reserved_at, uuid)
+                               VALUES (?,?,'',1,?,
+                                       COALESCE(?, {NEW_UUID_SQL}))""",
+                           (level, game_run_time, time.time(), game_uuid))
+    return cur.lastrowid, rank, times
+
+
+def complete_fastest_time(conn, *, entry_id, username):
+    """Sets the username of a pending leaderboard entry and deletes the
+    completed entries of its level that no longer rank
+
+    Args:
+        conn: sqlite3 connection object
+        entry_id (int): Id returned by reserve_fastest_time
+        username (str): Name of the player
+    Returns:
+        bool: If the entry was still there to complete
+    """
+    with immediate_transaction(conn):
+        entry = conn.execute("""SELECT level FROM fastest_times
+                                WHERE id = ? AND pending = 1""",
+                             (entry_id,)).fetchone()
+        if entry is None:
+            return False
+        conn.execute("""UPDATE fastest_times SET username = ?, pending = 0
+                        WHERE id = ?""", (username, entry_id))
+        conn.execute("""DELETE FROM fastest_times
+                        WHERE level = ? AND pending = 0 AND id NOT IN (
+                            SELECT id FROM fastest_times
+                            WHERE level = ? AND pending = 0
+                            ORDER BY game_run_time, id DESC
+                            LIMIT ?)""",
+                     (entry[0], entry[0], NUM_FASTEST_TIMES))
+    return True
+
+
+def cancel_fastest_time(conn, *, entry_id):
+    """Deletes a pending leaderboard entry
+
+    Args:
+        conn: sqlite3 connection object
+        entry_id (int): Id returned by reserve_fastest_time
+    """
+    with immediate_transaction(conn):
+        conn.execute('DELETE FROM fastest_times WHERE id = ? AND pending = 1',
+                     (entry_id,))
@@ -2,16 +2,57 @@
 Basic minesweeper unit tests
 """
 
-# pylint: disable=protected-access
+# pylint: disable=protected-access,too-many-lines
 
-from unittest import main, TestCase
-from board import Board
-from game import Game
-from tile import Tile
+import asyncio
+import itertools
+import gzip
+import json
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timezone
+from unittest import main, skipIf, TestCase
+from batch_env import HIDDEN, REWARD_LOSS, BatchEnv, np
+from benchmark import (find_regressions, measure_tile_memory, midgame_state,
+                       run_suite)
+from bitboard import BitBoard
+from catalog import (DEPTH_COMBINED, DEPTH_SINGLE, _next_moves,
+                     catalog_histogram, fill_catalog, find_board, rate_board,
+                     start_tile)
+from board import CHORD_REVEAL, Board
+from board_pool import BoardPool, generate_layout
+from delta import (FLAGGED as FLAGGED_CODE, HIDDEN as HIDDEN_CODE,
+                   DeltaDecoder, DeltaEncoder, DeltaError, visible_state)
+from engine import GameEngine, LOST, PLAYING, WON
+from endless_board import EndlessBoard, FLAGGED, REVEALED
+from game import Game, leaderboard_level
+from heatmap import MoveLog, heat_colors, load_heatmaps, record_game
+from maintenance import cutoff, roll_up_games, run_maintenance
+from merge import merge_databases
+from metrics import efficiency, three_bv, three_bv_per_second
+from minesweeper_details import DISPLAY_OFFSET, TILE_SIZE
+from minesweeper_server import GameServer
+from scheduler import SLICE_MS, Scheduler
+from save_game import FLAGGED as SAVED_FLAGGED, SaveFile, SaveFileError
+from neighbors import neighbor_table
+from race import RaceClient, RaceHub, encode_message
+from seeds import daily_seed, format_seed, parse_seed
+from solver import Solver
+from storage import (NUM_FASTEST_TIMES, Storage, cancel_fastest_time,
+                     complete_fastest_time, most_efficient_games,
+                     play_stats, reserve_fastest_time, top_times)
+from tile import BLANK, FLAG, UNCOVERED, Tile
+from tracing import LOGIC, MOVE, RENDER, Tracer
 
 # Test constants
 COLUMN = 4
 ROW = 4
+SEED = 12345
 
 
 class BoardTests(TestCase):
@@ -40,6 +81,194 @@ class BoardTests(TestCase):
         num_tiles = len(board.tiles)
         self.assertEqual(num_tiles, num_expected_tiles)
 
+    def test_seeded_mines(self):
+        """Tests that the seed and first tile fully determine the mines"""
+        boards = [Board(level='hard', seed=SEED) for _ in range(2)]
+        for board in boards:
+            board.set_the_mines(board.tiles[f'{COLUMN},{ROW}'])
+        for name, tile in boards[0].tiles.items():
+            self.assertEqual(boards[1].tiles[name].is_mine, tile.is_mine)
+
+    def test_no_per_tile_debug_logging(self):
+        """Tests that setting the mines doesn't log a message per tile"""
+        board = Board(level='hard', seed=SEED)
+        with self.assertLogs(level='DEBUG') as logs:
+            board.set_the_mines(board.tiles[f'{COLUMN},{ROW}'])
+        self.assertEqual(len(logs.records), 1)
+
+    def test_first_tile_is_safe(self):
+        """Tests that the first tile and its neighbors never have a mine,
+        even when the layout had to be moved"""
+        for seed in range(20):
+            board = Board(level='hard', seed=seed)
+            tile = board.tiles[f'{COLUMN},{ROW}']
+            board.set_the_mines(tile)
+            self.assertFalse(tile.is_mine)
+            self.assertIsNone(tile.num_adjacent_mines)
+            self.assertEqual(sum(tile.is_mine for tile in board.tile_list),
+                             board.mines)
+
+
+class BoardPoolTests(TestCase):
+    """Basic tests for the board pool"""
+    def test_moved_mine_counts(self):
+        """Tests that the counts stay correct after mines are moved"""
+        board = Board(level='hard', seed=SEED)
+        layout = generate_layout(columns=board.columns, rows=board.rows,
+                                 mines=board.mines, seed=SEED)
+        board.set_the_mines(board.tiles[f'{COLUMN},{ROW}'], layout=layout)
+        counts = [tile.num_adjacent_mines for tile in board.tile_list]
+        board.set_adjacent_mine_counts()
+        self.assertEqual(counts, [tile.num_adjacent_mines
+                                  for tile in board.tile_list])
+
+    def test_pooled_layout_matches_seed(self):
+        """Tests that a pooled layout gives the same board as its seed"""
+        pool = BoardPool('medium')
+        pool.start()
+        try:
+            layout = pool.take(timeout=5)
+        finally:
+            pool.stop()
+        boards = [Board(level='medium'), Board(level='medium',
+                                               seed=layout.seed)]
+        boards[0].set_the_mines(boards[0].tiles[f'{COLUMN},{ROW}'],
+                                layout=layout)
+        boards[1].set_the_mines(boards[1].tiles[f'{COLUMN},{ROW}'])
+        self.assertEqual(boards[0].seed, layout.seed)
+        self.assertEqual([tile.is_mine for tile in boards[0].tile_list],
+                         [tile.is_mine for tile in boards[1].tile_list])
+
+    def test_pool_refills(self):
+        """Tests that the pool is filled up to its size again"""
+        pool = BoardPool('easy', size=2)
+        self.assertIsNone(pool.take())
+        pool.start()
+        try:
+            pool.take(timeout=5)
+            for _ in range(500):
+                if len(pool) == 2:
+                    break
+                time.sleep(0.01)
+            self.assertEqual(len(pool), 2)
+        finally:
+            pool.stop()
+
+
+@skipIf(np is None, 'NumPy is not installed')
+class BatchEnvTests(TestCase):
+    """Basic tests for the batch environment"""
+    def setUp(self):
+        """Creates a batch environment of easy boards"""
+        self.env = BatchEnv(num_envs=3, level='easy', seed=7)
+        self.observations, _ = self.env.reset()
+        self.center = 4 * 9 + 4
+
+    def test_first_reveal_is_safe(self):
+        """Tests that the first reveal of every board flood fills from a
+        tile without adjacent mines"""
+        self.assertTrue((self.observations == HIDDEN).all())
+        observations, rewards, terminated, _, _ = self.env.step(
+            [self.center] * 3)
+        self.assertFalse(terminated.any())
+        self.assertTrue((observations[:, 4, 4] == 0).all())
+        self.assertTrue((rewards > 0).all())
+
+    def test_slots_are_seeded_independently(self):
+        """Tests that a slot's boards only depend on the seed and the
+        slot"""
+        single = BatchEnv(num_envs=1, level='easy', seed=7)
+        single.reset()
+        observations, _, _, _, _ = self.env.step([self.center, 0, 80])
+        single_observations, _, _, _, _ = single.step([self.center])
+        self.assertTrue((observations[0] == single_observations[0]).all())
+
+    def test_win_and_loss_reset_the_board(self):
+        """Tests the rewards of a lost and a won board, and that both are
+        reset automatically"""
+        _, rewards, _, _, _ = self.env.step([self.center] * 3)
+        total_reward = rewards[0]
+        mines = self.env._mines.reshape(3, -1).copy()
+        _, rewards, terminated, _, infos = self.env.step(
+            [self.center, mines[1].argmax(), self.center])
+        self.assertEqual(rewards[1], REWARD_LOSS)
+        self.assertTrue(terminated[1])
+        self.assertFalse(infos['won'][1])
+        self.assertFalse(self.env._placed[1])
+        while not terminated[0]:
+            hidden_safe = ~self.env._uncovered[0].reshape(-1) & ~mines[0]
+            _, rewards, terminated, _, infos = self.env.step(
+                [hidden_safe.argmax(), self.center, self.center])
+            total_reward += rewards[0]
+        self.assertTrue(infos['won'][0])
+        self.assertAlmostEqual(total_reward, 1)
+        self.assertFalse(self.env._placed[0])
+
+
+class BitBoardTests(TestCase):
+    """Basic tests for the bitboard class"""
+    def setUp(self):
+        """Starts a seeded game with its first reveal, which sets the mines,
+        and creates the equivalent bitboard"""
+        self.game = GameEngine(level='hard', seed=SEED)
+        self.events = self.game.reveal(column=COLUMN, row=ROW)
+        self.bitboard = BitBoard.from_board(self.game.board)
+
+    def test_adjacent_mine_counts(self):
+        """Tests that the bit-parallel counts match the board's counts"""
+        for tile in self.game.board.tiles.values():
+            self.assertEqual(
+                self.bitboard.count_adjacent_mines(column=tile.column,
+                                                   row=tile.row),
+                tile.num_adjacent_mines or 0)
+
+    def test_flood_fill(self):
+        """Tests that the flood fill uncovers the same tiles as the game's
+        first reveal"""
+        self.assertEqual(self.game.status, PLAYING)
+        bitboard = BitBoard(columns=self.game.board.columns,
+                            rows=self.game.board.rows)
+        bitboard.set_mines([(tile.column, tile.row)
+                            for tile in self.game.board.tiles.values()
+                            if tile.is_mine])
+        uncovered = bitboard.reveal(column=COLUMN, row=ROW)
+        self.assertEqual(sorted(bitboard.positions(uncovered)),
+                         sorted((event['column'], event['row'])
+                                for event in self.events))
+        self.assertEqual(bitboard.uncovered, self.bitboard.uncovered)
+
+    def test_win_check(self):
+        """Tests that the board is cleared when the game is won"""
+        self.assertFalse(self.bitboard.check_if_all_tiles_cleared())
+        for tile in self.game.board.tiles.values():
+            if tile.is_hidden and not tile.is_mine:
+                self.game.reveal(column=tile.column, row=tile.row)
+        self.assertEqual(self.game.status, WON)
+        self.assertTrue(BitBoard.from_board(
+            self.game.board).check_if_all_tiles_cleared())
+        self.bitboard.uncover(self.bitboard.safe_mask)
+        self.assertTrue(self.bitboard.check_if_all_tiles_cleared())
+        self.assertFalse(self.bitboard.exploded)
+
+
+class NeighborTableTests(TestCase):
+    """Basic tests for the neighbor tables"""
+    def setUp(self):
+        """Gets the neighbor table of the hard level before each test"""
+        self.table = neighbor_table(30, 16)
+
+    def test_edge_handling(self):
+        """Tests that corner, edge, and inner tiles have the right number
+        of neighbors"""
+        self.assertEqual(len(self.table.neighbors(0)), 3)
+        self.assertEqual(len(self.table.neighbors(1)), 5)
+        self.assertEqual(len(self.table.neighbors(COLUMN * 16 + ROW)), 8)
+        self.assertEqual(len(self.table.neighbors(30 * 16 - 1)), 3)
+
+    def test_table_is_shared(self):
+        """Tests that boards with the same geometry share one table"""
+        self.assertIs(Board(level='hard').neighbor_table, self.table)
+
 
 class GameTests(TestCase):
     """Basic tests for the minesweeper game class"""
@@ -65,6 +294,138 @@ class GameTests(TestCase):
         self.game._set_button_unclicked('right')
         self.assertFalse(self.game._is_right_clicked)
 
+    def test_middle_button_clicked(self):
+        """Tests that the middle button has its own clicked flag"""
+        self.game._set_button_clicked('middle')
+        self.assertTrue(self.game._is_middle_clicked)
+        self.assertFalse(self.game._is_right_clicked)
+
+    def test_release_off_the_tiles(self):
+        """Tests that releasing a button away from the tiles only clears
+        its clicked flag"""
+        self.game._set_button_clicked('right')
+        self.game._check_button_click(None, 'right')
+        self.assertFalse(self.game._is_right_clicked)
+        self.assertEqual(self.game._clicks, 0)
+
+    def test_no_name_prompt_on_close(self):
+        """Tests that a fastest time recorded while the board closes is
+        dropped instead of asking for a name"""
+        temp_dir = tempfile.mkdtemp()
+        storage = Storage(os.path.join(temp_dir, 'minesweeper.db'))
+        try:
+            self.game.game_run_time = 5
+            self.game._closing_game = True
+            self.game._check_for_fastest_time(storage.conn)
+            num_rows = storage.conn.execute(
+                'SELECT COUNT(*) FROM fastest_times').fetchone()[0]
+        finally:
+            storage.close()
+            shutil.rmtree(temp_dir)
+        self.assertEqual(num_rows, 0)
+
+    def test_daily_leaderboard_level(self):
+        """Tests that the daily challenge gets a leaderboard for each day"""
+        self.assertEqual(leaderboard_level('easy'), 'easy')
+        self.assertTrue(leaderboard_level('daily').startswith('daily-'))
+        self.assertEqual(leaderboard_level('daily', date(2024, 1, 1)),
+                         'daily-2024-01-01')
+
+    def test_daily_ignores_seed(self):
+        """Tests that the daily challenge is always played on the daily
+        seed"""
+        with self.assertLogs(level='WARNING'):
+            game = Game(level='daily', seed=SEED)
+        self.assertEqual(game._seed, daily_seed())
+
+
+class SeedTests(TestCase):
+    """Basic tests for the seed helper functions"""
+    def test_daily_seed(self):
+        """Tests that the daily seed only changes with the day"""
+        self.assertEqual(daily_seed(date(2024, 1, 1)),
+                         daily_seed(date(2024, 1, 1)))
+        self.assertNotEqual(daily_seed(date(2024, 1, 1)),
+                            daily_seed(date(2024, 1, 2)))
+
+    def test_format_seed(self):
+        """Tests that a formatted seed can be parsed back"""
+        seed = (1 << 64) - 1
+        self.assertEqual(parse_seed(format_seed(seed)), seed)
+
+
+class SolverTests(TestCase):
+    """Basic tests for the solver"""
+    def test_simple_position(self):
+        """Tests a row where the first number only leaves one tile for its
+        mine, which the second number already has"""
+        with Solver(columns=4, rows=1, mines=1, processes=0) as solver:
+            state = bytes((1, HIDDEN_CODE, 1, HIDDEN_CODE))
+            solution = solver.solve(state)
+            self.assertEqual(solution.mines, [1])
+            self.assertEqual(solution.safe, [3])
+            self.assertEqual(solver.hint(state), 3)
+
+    def test_interior_never_certain(self):
+        """Tests that the tiles away from the numbers aren't ruled safe when
+        the frontier's expected mine count reaches the mines left"""
+        state = bytearray([HIDDEN_CODE]) * 36
+        for index, number in ((7, 2), (9, 3), (15, 4), (21, 5), (31, 1)):
+            state[index] = number
+        with Solver(columns=6, rows=6, mines=7, processes=0) as solver:
+            solution = solver.solve(state)
+        # Tile 33 is away from the numbers and has a mine on the board
+        # this position comes from
+        self.assertNotIn(33, solution.safe)
+        self.assertGreater(solution.probabilities[33], 0.0)
+        self.assertGreater(solution.interior, 0.0)
+
+    def test_matches_enumeration(self):
+        """Tests the probabilities of the frontier against every mine
+        arrangement that satisfies the numbers, weighted by the odds of
+        their mine count"""
+        table = neighbor_table(6, 5)
+        layout = generate_layout(columns=6, rows=5, mines=6, seed=SEED)
+        state = bytearray([HIDDEN_CODE]) * 30
+        for index in random.Random(SEED).sample(sorted(set(range(30)) - layout.mines), 14):
+            state[index] = layout.counts[index]
+        odds = 6 / (state.count(HIDDEN_CODE) - 6)
+        numbers = [index for index, code in enumerate(state) if code <= 8 and
+                   any(state[neighbor] > 8
+                       for neighbor in table.neighbors(index))]
+        frontier = sorted({neighbor for index in numbers
+                           for neighbor in table.neighbors(index)
+                           if state[neighbor] > 8})
+        weights = [0.0] * 30
+        total = 0.0
+        for mines in itertools.product((0, 1), repeat=len(frontier)):
+            placed = {index for index, mine in zip(frontier, mines) if mine}
+            if all(len(placed.intersection(table.neighbors(index))) ==
+                   state[index] for index in numbers):
+                weight = odds ** len(placed)
+                total += weight
+                for index in placed:
+                    weights[index] += weight
+        with Solver(columns=6, rows=5, mines=6, processes=0) as solver:
+            solution = solver.solve(state)
+        for index in frontier:
+            self.assertAlmostEqual(solution.probabilities[index],
+                                   weights[index] / total)
+
+    def test_pool_matches_inline(self):
+        """Tests that the workers find the same solution as the calling
+        process"""
+        state, mines = midgame_state(size=60, density=0.15, cleared=0.4)
+        with Solver(columns=60, rows=60, mines=mines,
+                    processes=0) as solver:
+            inline = solver.solve(state)
+        with Solver(columns=60, rows=60, mines=mines, processes=2,
+                    inline_tiles=4) as solver:
+            pooled = solver.solve(state)
+        self.assertGreater(inline.num_components, 1)
+        self.assertTrue(inline.safe)
+        self.assertEqual(pooled.probabilities, inline.probabilities)
+
 
 class TileTests(TestCase):
     """Basic tests for the minesweeper tile class"""
@@ -80,6 +441,944 @@ class TileTests(TestCase):
         """Tests that the tile is instantiated as hidden"""
         self.assertTrue(self.tile.is_hidden)
 
+    def test_no_instance_dict(self):
+        """Tests that the tile only has its slots"""
+        self.assertFalse(hasattr(self.tile, '__dict__'))
+        with self.assertRaises(AttributeError):
+            setattr(self.tile, 'button', None)
+
+    def test_flag_and_uncover_update_state(self):
+        """Tests that the flag and hidden properties share one state"""
+        self.tile.is_flag_set = True
+        self.assertEqual(self.tile.state, FLAG)
+        self.assertTrue(self.tile.is_hidden)
+        self.tile.is_flag_set = False
+        self.assertEqual(self.tile.state, BLANK)
+        self.tile.is_hidden = False
+        self.assertEqual(self.tile.state, UNCOVERED)
+        self.assertFalse(self.tile.is_flag_set)
+
+    def test_position(self):
+        """Tests that the position is computed from the column and row"""
+        self.assertEqual(self.tile.position,
+                         (COLUMN * TILE_SIZE, ROW * TILE_SIZE + DISPLAY_OFFSET))
+
+
+class EndlessBoardTests(TestCase):
+    """Basic tests for the endless board class"""
+    def setUp(self):
+        """Creates a new EndlessBoard object before each test"""
+        self.board = EndlessBoard(SEED, max_loaded_chunks=4)
+
+    def test_no_chunks_before_reveal(self):
+        """Tests that no chunks are generated until the board is touched"""
+        self.assertEqual(self.board.num_loaded_chunks, 0)
+
+    def test_origin_is_safe(self):
+        """Tests that the first reveal at the world origin is safe"""
+        revealed = self.board.reveal(column=0, row=0)
+        self.assertFalse(self.board.exploded)
+        self.assertEqual(revealed[0], (0, 0, 0))
+
+    def test_mine_free_reveal_is_bounded(self):
+        """Tests that a board without mines can be requested and that a
+        reveal on it stops at the edge of the chunks it may reach"""
+        board = EndlessBoard(SEED, mines_per_chunk=0, max_reveal_chunks=3)
+        revealed = board.reveal(column=0, row=0)
+        self.assertFalse(board.exploded)
+        self.assertEqual(len(revealed), 3 * 16 * 16)
+        self.assertTrue(all(num_mines == 0 for _, _, num_mines in revealed))
+
+    def test_mines_are_deterministic(self):
+        """Tests that the same seed always generates the same mines"""
+        other_board = EndlessBoard(SEED)
+        for column in range(-20, 20):
+            self.assertEqual(self.board.is_mine(column=column, row=column * 3),
+                             other_board.is_mine(column=column,
+                                                 row=column * 3))
+
+    def test_evicted_state_is_restored(self):
+        """Tests that evicting a chunk keeps the player state"""
+        self.board.reveal(column=0, row=0)
+        self.board.toggle_flag(column=100, row=100)
+        for chunk_column in range(10, 20):
+            self.board.is_mine(column=chunk_column * 16, row=0)
+        self.assertEqual(self.board.num_loaded_chunks, 4)
+        self.assertEqual(self.board.get_state(column=0, row=0), REVEALED)
+        self.assertEqual(self.board.get_state(column=100, row=100), FLAGGED)
+
+
+class StorageTests(TestCase):
+    """Basic tests for the storage class"""
+    def setUp(self):
+        """Creates a temporary database path"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'minesweeper.db')
+
+    def tearDown(self):
+        """Removes the temporary database directory"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_old_database_is_migrated(self):
+        """Tests that a play history table without a seed column gets one"""
+        conn = sqlite3.connect(self.path)
+        conn.execute('CREATE TABLE play_history (id integer PRIMARY KEY, '
+                     'level text NOT NULL, finished int NOT NULL, '
+                     'start_time text NOT NULL)')
+        conn.commit()
+        conn.close()
+        storage = Storage(self.path)
+        columns = [info[1] for info in storage.conn.execute(
+            'PRAGMA table_info(play_history)')]
+        storage.close()
+        self.assertIn('seed', columns)
+        self.assertIn('three_bv', columns)
+        self.assertIn('three_bv_per_second', columns)
+
+    def test_most_efficient_games(self):
+        """Tests that won games are ranked by their 3BV per second"""
+        storage = Storage(self.path)
+        for game_won, speed in ((1, 1.5), (0, None), (1, 2.5), (1, None)):
+            storage.conn.execute(
+                'INSERT INTO play_history(level, game_won, game_run_time, '
+                'finished, start_time, three_bv, clicks, three_bv_per_second)'
+                " VALUES ('easy', ?, 10, 1, '', 20, 30, ?)", (game_won, speed))
+        games = most_efficient_games(storage.conn, level='easy')
+        storage.close()
+        self.assertEqual([game[0] for game in games], [2.5, 1.5])
+
+    def test_fastest_times_from_two_processes(self):
+        """Tests that interleaved leaderboard updates from two connections
+        keep the fastest times of each level"""
+        first = Storage(self.path)
+        second = Storage(self.path)
+        for game_run_time in range(100, 100 + NUM_FASTEST_TIMES):
+            entry_id, _, _ = reserve_fastest_time(
+                first.conn, level='easy', game_run_time=game_run_time)
+            complete_fastest_time(first.conn, entry_id=entry_id,
+                                  username='first')
+        reserve_fastest_time(first.conn, level='hard', game_run_time=500)
+        # Both games finish while the leaderboard is full
+        first_id, first_rank, _ = reserve_fastest_time(
+            first.conn, level='easy', game_run_time=50)
+        second_id, second_rank, times = reserve_fastest_time(
+            second.conn, level='easy', game_run_time=105)
+        self.assertEqual((first_rank, second_rank), (1, 6))
+        self.assertEqual(len(times), NUM_FASTEST_TIMES)
+        self.assertIsNone(reserve_fastest_time(second.conn, level='easy',
+                                               game_run_time=200))
+        self.assertTrue(complete_fastest_time(second.conn,
+                                              entry_id=second_id,
+                                              username='second'))
+        self.assertTrue(complete_fastest_time(first.conn, entry_id=first_id,
+                                              username='first'))
+        leaderboard = top_times(first.conn, level='easy')
+        num_rows = first.conn.execute(
+            "SELECT COUNT(*) FROM fastest_times WHERE level = 'easy'"
+            ).fetchone()[0]
+        hard_rows = first.conn.execute(
+            "SELECT COUNT(*) FROM fastest_times WHERE level = 'hard'"
+            ).fetchone()[0]
+        first.close()
+        second.close()
+        self.assertEqual([entry[0] for entry in leaderboard],
+                         [50, 100, 101, 102, 103, 104, 105, 105, 106, 107])
+        self.assertEqual(leaderboard[6][1], 'second')
+        self.assertEqual(num_rows, NUM_FASTEST_TIMES)
+        self.assertEqual(hard_rows, 1)
+
+    def test_cancelled_fastest_time(self):
+        """Tests that a cancelled entry is dropped without touching the
+        others"""
+        storage = Storage(self.path)
+        entry_id, _, _ = reserve_fastest_time(storage.conn, level='easy',
+                                              game_run_time=30)
+        complete_fastest_time(storage.conn, entry_id=entry_id,
+                              username='player')
+        entry_id, rank, _ = reserve_fastest_time(storage.conn, level='easy',
+                                                 game_run_time=20)
+        self.assertEqual(rank, 1)
+        self.assertEqual(top_times(storage.conn, level='easy'),
+                         [(30, 'player')])
+        cancel_fastest_time(storage.conn, entry_id=entry_id)
+        self.assertFalse(complete_fastest_time(storage.conn,
+                                               entry_id=entry_id,
+                                               username='late'))
+        self.assertEqual(top_times(storage.conn, level='easy'),
+                         [(30, 'player')])
+        storage.close()
+
+
+class MetricsTests(TestCase):
+    """Basic tests for the board metrics"""
+    def test_three_bv_matches_clicks_needed(self):
+        """Tests that the 3BV is the number of clicks it takes to clear a
+        board by clicking every opening and then every tile left"""
+        for seed in range(5):
+            board = Board(level='medium', seed=seed)
+            board.set_the_mines(board.tiles[f'{COLUMN},{ROW}'])
+            expected = board.count_three_bv()
+            clicks = 0
+            for tile in board.tile_list:
+                if (tile.is_hidden and not tile.is_mine and
+                        tile.num_adjacent_mines is None):
+                    board.reveal_tiles([tile])
+                    clicks += 1
+            clicks += board.num_hidden_safe_tiles
+            self.assertEqual(expected, clicks)
+
+    def test_three_bv_of_simple_boards(self):
+        """Tests the 3BV of boards without mines and with every tile
+        numbered"""
+        self.assertEqual(three_bv(columns=4, rows=3, mines=[],
+                                  counts=bytes(12)), 1)
+        # A mine in the middle of a 3x3 board leaves 8 isolated numbers
+        self.assertEqual(three_bv(columns=3, rows=3, mines=[4],
+                                  counts=[1, 1, 1, 1, 0, 1, 1, 1, 1]), 8)
+
+    def test_efficiency(self):
+        """Tests the efficiency and 3BV per second"""
+        self.assertEqual(efficiency(three_bv_value=30, clicks=40), 75)
+        self.assertIsNone(efficiency(three_bv_value=30, clicks=0))
+        self.assertEqual(three_bv_per_second(three_bv_value=30, seconds=20),
+                         1.5)
+        self.assertIsNone(three_bv_per_second(three_bv_value=30, seconds=0))
+
+
+class HeatmapTests(TestCase):
+    """Basic tests for the click heatmaps"""
+    def setUp(self):
+        """Creates a temporary database"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage = Storage(os.path.join(self.temp_dir, 'minesweeper.db'))
+
+    def tearDown(self):
+        """Closes and removes the temporary database"""
+        self.storage.close()
+        shutil.rmtree(self.temp_dir)
+
+    @skipIf(np is None, 'NumPy is not installed')
+    def test_heatmaps(self):
+        """Tests that the moves of the games are accumulated and normalized
+        by the board size"""
+        board = Board('easy')
+        for exploded_index in (None, 80):
+            move_log = MoveLog()
+            move_log.moves = [(0, 1.0), (9, 3.0), (0, 2.0)]
+            move_log.first_index = 0
+            move_log.exploded_index = exploded_index
+            record_game(self.storage.conn, level='easy', board=board,
+                        move_log=move_log)
+        games, heatmaps = load_heatmaps(self.storage.conn, level='easy')
+        self.assertEqual(games, 2)
+        self.assertEqual(heatmaps['first_clicks'].shape, (9, 9))
+        self.assertEqual(heatmaps['first_clicks'][0, 0], 81)
+        # Flat index 80 is the last row of the last column
+        self.assertEqual(heatmaps['explosions'][8, 8], 81)
+        self.assertEqual(heatmaps['explosions'].sum(), 81)
+        self.assertEqual(heatmaps['think_time'][0, 0], 1.5)
+        self.assertEqual(heatmaps['think_time'][0, 1], 3.0)
+        self.assertEqual(heat_colors(heatmaps['think_time'])[0][1], '#c80000')
+        self.assertIsNone(load_heatmaps(self.storage.conn, level='hard'))
+        with self.assertRaises(ValueError):
+            record_game(self.storage.conn, level='easy', board=Board('hard'),
+                        move_log=MoveLog())
+
+
+class CatalogTests(TestCase):
+    """Basic tests for the board catalog"""
+    def setUp(self):
+        """Creates a temporary database"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage = Storage(os.path.join(self.temp_dir, 'minesweeper.db'))
+
+    def tearDown(self):
+        """Closes and removes the temporary database"""
+        self.storage.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_rating_matches_board(self):
+        """Tests that a board is rated with the mines a game of its seed
+        gets when started from the start tile"""
+        with Solver(columns=9, rows=9, mines=10, processes=0) as solver:
+            rating = rate_board(solver, SEED)
+        board = Board('easy', SEED)
+        column, row = start_tile(board.columns, board.rows)
+        board.set_the_mines(board.tiles[f'{column},{row}'])
+        self.assertEqual(rating.seed, SEED)
+        self.assertEqual(rating.three_bv, board.count_three_bv())
+        self.assertGreaterEqual(rating.guesses, 0)
+        self.assertIn(rating.deduction_depth, (DEPTH_SINGLE, DEPTH_COMBINED))
+
+    def test_flag_decides_deduction(self):
+        """Tests that a flagged mine is used when the numbers are combined,
+        which the solver can't do while it treats the flag as hidden"""
+        state = bytearray((2, HIDDEN_CODE, 1, HIDDEN_CODE, HIDDEN_CODE, 1, 2,
+                           3, HIDDEN_CODE, FLAGGED_CODE, HIDDEN_CODE,
+                           HIDDEN_CODE, HIDDEN_CODE, HIDDEN_CODE,
+                           HIDDEN_CODE))
+        with Solver(columns=5, rows=3, mines=4, processes=0) as solver:
+            self.assertNotIn(solver.solve(state).probabilities[1],
+                             (0.0, 1.0))
+            # The layout is only used to tell how a guess went
+            safe, mines, depth = _next_moves(solver, state, [9], None)
+        self.assertEqual(depth, DEPTH_COMBINED)
+        self.assertEqual(safe, {4, 8, 10})
+        self.assertEqual(mines, {1, 3, 11})
+
+    def test_fill_and_find(self):
+        """Tests that the catalog is filled up to the target histogram and
+        searched by difficulty"""
+        conn = self.storage.conn
+        target = {(0, DEPTH_SINGLE): 3, (1, DEPTH_COMBINED): 1}
+        self.assertEqual(fill_catalog(conn, level='easy', target=target,
+                                      seeds=range(200), processes=0), 4)
+        self.assertEqual(catalog_histogram(conn, level='easy'), target)
+        self.assertEqual(fill_catalog(conn, level='easy', target=target,
+                                      seeds=range(200), processes=0), 0)
+        rating = find_board(conn, level='easy', max_guesses=0,
+                            three_bv_range=(None, 100))
+        self.assertEqual((rating.guesses, rating.deduction_depth),
+                         (0, DEPTH_SINGLE))
+        rating = find_board(conn, level='easy',
+                            deduction_depth=DEPTH_COMBINED)
+        self.assertEqual(rating.guesses, 1)
+        self.assertIsNone(find_board(conn, level='easy',
+                                     three_bv_range=(100, None)))
+        self.assertIsNone(find_board(conn, level='hard'))
+
+
+class MaintenanceTests(TestCase):
+    """Basic tests for the database maintenance"""
+    def setUp(self):
+        """Creates a database with a game every 5 hours for 100 days"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'minesweeper.db')
+        self.archive_path = os.path.join(self.temp_dir, 'archive.jsonl.gz')
+        self.now = time.time()
+        storage = Storage(self.path)
+        for game in range(480):
+            start_time = datetime.fromtimestamp(self.now - game * 5 * 3600,
+                                                timezone.utc)
+            storage.conn.execute(
+                'INSERT INTO play_history(level, game_won, game_run_time, '
+                'finished, start_time) VALUES (?,?,?,?,?)',
+                ('easy', game % 2, game + 1, int(game % 3 > 0), start_time))
+        storage.conn.commit()
+        self.stats = play_stats(storage.conn, level='easy')
+        storage.close()
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_roll_up_games(self):
+        """Tests that old and abandoned games are rolled up and archived
+        without changing the statistics, except for the kept games"""
+        storage = Storage(self.path)
+        num_games = roll_up_games(storage.conn,
+                                  before=cutoff(self.now, 30),
+                                  abandoned_before=cutoff(self.now, 7),
+                                  archive_path=self.archive_path,
+                                  keep_ids=[480])
+        num_rows = storage.conn.execute(
+            'SELECT COUNT(*) FROM play_history').fetchone()[0]
+        kept = storage.conn.execute(
+            'SELECT COUNT(*) FROM play_history WHERE id = 480').fetchone()[0]
+        stats = play_stats(storage.conn, level='easy')
+        storage.close()
+        with gzip.open(self.archive_path, 'rt') as archive:
+            archived = [json.loads(line) for line in archive]
+        self.assertEqual(num_games + num_rows, 480)
+        self.assertEqual(len(archived), num_games)
+        self.assertEqual(kept, 1)
+        # 144 games in the last 30 days, minus the unfinished ones older
+        # than 7 days
+        self.assertLess(num_rows, 144)
+        self.assertEqual(stats, self.stats)
+
+    def test_interrupted_archive(self):
+        """Tests that the games archived by a roll up that didn't commit
+        aren't archived twice"""
+        storage = Storage(self.path)
+        num_games = roll_up_games(storage.conn, before=cutoff(self.now, 60),
+                                  abandoned_before=cutoff(self.now, 60),
+                                  archive_path=self.archive_path)
+        # A roll up that was killed after appending to the archive
+        with gzip.open(self.archive_path, 'at', encoding='utf-8') as archive:
+            archive.write(json.dumps({'id': 0}) + '\n')
+        num_games += roll_up_games(storage.conn,
+                                   before=cutoff(self.now, 30),
+                                   abandoned_before=cutoff(self.now, 30),
+                                   archive_path=self.archive_path)
+        storage.close()
+        with gzip.open(self.archive_path, 'rt') as archive:
+            ids = [json.loads(line)['id'] for line in archive]
+        self.assertEqual(len(ids), num_games)
+        self.assertNotIn(0, ids)
+
+    def test_maintenance_runs_once_a_day(self):
+        """Tests that the maintenance only runs when it's due"""
+        self.assertGreater(run_maintenance(self.path, now=self.now,
+                                           archive_path=self.archive_path,
+                                           retention_days=30), 0)
+        self.assertIsNone(run_maintenance(self.path, now=self.now + 60,
+                                          archive_path=self.archive_path))
+        conn = sqlite3.connect(self.path)
+        auto_vacuum = conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+        free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        conn.close()
+        self.assertEqual(auto_vacuum, 2)
+        self.assertEqual(free_pages, 0)
+
+
+class MergeTests(TestCase):
+    """Basic tests for merging the databases of several machines"""
+    def setUp(self):
+        """Creates the databases of 12 machines, each with 5 games and their
+        fastest times"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.sources = []
+        for machine in range(12):
+            path = os.path.join(self.temp_dir, f'machine{machine}.db')
+            storage = Storage(path)
+            for game in range(5):
+                run_time = 10 * game + machine + 1
+                storage.conn.execute(
+                    'INSERT INTO play_history(level, game_won, game_run_time, '
+                    'finished, start_time) VALUES (?,1,?,1,?)',
+                    ('easy', run_time, str(datetime.now(timezone.utc))))
+                entry_id = reserve_fastest_time(storage.conn, level='easy',
+                                                game_run_time=run_time)[0]
+                complete_fastest_time(storage.conn, entry_id=entry_id,
+                                      username=f'machine{machine}')
+            storage.close()
+            self.sources.append(path)
+        self.path = os.path.join(self.temp_dir, 'merged.db')
+
+    def tearDown(self):
+        """Removes the temporary directory"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_merge(self):
+        """Tests that the games are merged once and the leaderboard holds
+        the fastest times of every machine"""
+        conn = sqlite3.connect(self.path)
+        self.assertEqual(merge_databases(conn, self.sources, batch_size=5),
+                         (60, NUM_FASTEST_TIMES))
+        self.assertEqual(merge_databases(conn, self.sources[:3]), (0, 0))
+        num_games = conn.execute(
+            'SELECT COUNT(*) FROM play_history').fetchone()[0]
+        times = top_times(conn, level='easy')
+        conn.close()
+        self.assertEqual(num_games, 60)
+        self.assertEqual(times, [(machine + 1, f'machine{machine}')
+                                 for machine in range(NUM_FASTEST_TIMES)])
+
+
+class SaveFileTests(TestCase):
+    """Basic tests for the save file class"""
+    def setUp(self):
+        """Creates a board with its mines set and a temporary save path"""
+        self.board = Board(level='medium')
+        self.board.set_the_mines(self.board.tiles[f'{COLUMN},{ROW}'])
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'medium_game.sav')
+
+    def tearDown(self):
+        """Removes the temporary save directory"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_restore_board(self):
+        """Tests that a resumed board has the same mines and tile states"""
+        save_file = SaveFile.create(self.path, board=self.board, db_id=7,
+                                    day=date(2024, 1, 1))
+        flag_tile = self.board.tiles['0,0']
+        flag_tile.is_flag_set = True
+        save_file.write_tile(flag_tile)
+        save_file.write_elapsed_time(12.5)
+        save_file.close()
+
+        resumed_board = Board(level='medium')
+        resumed_file = SaveFile(self.path)
+        resumed_file.restore_board(resumed_board)
+        self.assertEqual(resumed_file.db_id, 7)
+        self.assertEqual(resumed_file.day, date(2024, 1, 1))
+        self.assertEqual(resumed_file.elapsed_time, 12.5)
+        self.assertEqual(resumed_file.get_state(0), SAVED_FLAGGED)
+        self.assertEqual(resumed_board.num_mines_left, self.board.mines - 1)
+        for name, tile in self.board.tiles.items():
+            self.assertEqual(resumed_board.tiles[name].is_mine, tile.is_mine)
+            self.assertEqual(resumed_board.tiles[name].num_adjacent_mines,
+                             tile.num_adjacent_mines)
+        resumed_file.close()
+
+    def test_unsupported_format(self):
+        """Tests that a file without the save file header is rejected"""
+        with open(self.path, 'wb') as save_file:
+            save_file.write(b'not a save file at all')
+        with self.assertRaises(SaveFileError):
+            SaveFile(self.path)
+
+
+class GameEngineTests(TestCase):
+    """Basic tests for the headless game engine class"""
+    def setUp(self):
+        """Creates a new seeded GameEngine object before each test"""
+        self.game = GameEngine(level='easy', seed=SEED)
+
+    def test_first_reveal_is_safe(self):
+        """Tests that the first reveal flood fills without exploding"""
+        events = self.game.reveal(column=COLUMN, row=ROW)
+        self.assertEqual(self.game.status, PLAYING)
+        self.assertEqual(events[0], {'type': 'reveal', 'column': COLUMN,
+                                     'row': ROW, 'mines': 0})
+        self.assertGreater(len(events), 1)
+
+    def test_toggle_flag(self):
+        """Tests that toggling a flag twice removes it"""
+        events = self.game.toggle_flag(column=0, row=0)
+        self.assertTrue(events[0]['flagged'])
+        events = self.game.toggle_flag(column=0, row=0)
+        self.assertFalse(events[0]['flagged'])
+        self.assertEqual(self.game.board.num_mines_left, self.game.board.mines)
+
+    def test_reveal_mine(self):
+        """Tests that revealing a mine loses the game"""
+        self.game.reveal(column=COLUMN, row=ROW)
+        mine = next(tile for tile in self.game.board.tiles.values()
+                    if tile.is_mine)
+        events = self.game.reveal(column=mine.column, row=mine.row)
+        self.assertEqual(self.game.status, LOST)
+        self.assertEqual(events[-1]['exploded'], [mine.column, mine.row])
+
+    def _numbered_tile(self):
+        """Returns an uncovered tile with adjacent mines and hidden safe
+        neighbors after the first reveal"""
+        self.game.reveal(column=COLUMN, row=ROW)
+        return next(tile for tile in self.game.board.tile_list
+                    if not tile.is_hidden and tile.num_adjacent_mines and
+                    any(neighbor.is_hidden and not neighbor.is_mine
+                        for neighbor in self.game.neighbors(tile)))
+
+    def test_chord_reveals_each_tile_once(self):
+        """Tests that a chord is one traversal without repeated tiles"""
+        tile = self._numbered_tile()
+        for neighbor in self.game.neighbors(tile):
+            if neighbor.is_mine:
+                neighbor.is_flag_set = True
+        changes = self.game.board.chord(tile)
+        self.assertTrue(changes.revealed)
+        self.assertEqual(len(changes.revealed), len(set(changes.revealed)))
+        self.assertEqual(self.game.board.num_hidden_safe_tiles,
+                         self.game.board.count_hidden_safe_tiles())
+
+    def test_chord_policy(self):
+        """Tests that a mismatched chord is only revealed by the reveal
+        policy"""
+        tile = self._numbered_tile()
+        self.assertEqual(self.game.chord(column=tile.column, row=tile.row),
+                         [])
+        self.game.chord_policy = CHORD_REVEAL
+        events = self.game.chord(column=tile.column, row=tile.row)
+        self.assertEqual(self.game.status, LOST)
+        self.assertIn('exploded', events[-1])
+
+
+class DeltaTests(TestCase):
+    """Basic tests for the delta encoder and decoder classes"""
+    def setUp(self):
+        """Creates a seeded game with a delta encoder and decoder"""
+        self.game = GameEngine(level='hard', seed=SEED)
+        self.encoder = DeltaEncoder(columns=30, rows=16, keyframe_interval=5)
+        self.decoder = DeltaDecoder(columns=30, rows=16)
+
+    def test_reconstructed_board(self):
+        """Tests that random moves reconstruct the engine's board"""
+        rng = random.Random(SEED)
+        events = self.game.reveal(column=COLUMN, row=ROW)
+        self.decoder.apply(self.encoder.encode(events, self.game.status))
+        while not self.game.is_over:
+            column = rng.randrange(30)
+            row = rng.randrange(16)
+            if rng.random() < 0.2:
+                events = self.game.toggle_flag(column=column, row=row)
+            else:
+                events = self.game.reveal(column=column, row=row)
+            self.decoder.apply(self.encoder.encode(events, self.game.status))
+            self.assertEqual(self.decoder.state, visible_state(self.game))
+        self.assertEqual(self.decoder.status, self.game.status)
+
+    def test_flood_fill_is_run_length_encoded(self):
+        """Tests that a flood fill is sent as runs of revealed tiles"""
+        events = self.game.reveal(column=COLUMN, row=ROW)
+        delta = self.encoder.encode(events, self.game.status)
+        num_revealed = sum(len(digits) for _, digits in delta['reveal'])
+        self.assertEqual(num_revealed, len(events))
+        self.assertLess(len(delta['reveal']), len(events))
+
+    def test_missed_delta(self):
+        """Tests that a missed delta is detected"""
+        self.encoder.encode(self.game.reveal(column=COLUMN, row=ROW),
+                            self.game.status)
+        delta = self.encoder.encode(self.game.toggle_flag(column=0, row=0),
+                                    self.game.status)
+        with self.assertRaises(DeltaError):
+            self.decoder.apply(delta)
+        self.decoder.apply(self.encoder.keyframe(self.game.status))
+        self.assertEqual(self.decoder.state, self.encoder.state)
+
+
+class GameServerTests(TestCase):
+    """Basic tests for the game server class"""
+    def setUp(self):
+        """Creates a new GameServer object before each test"""
+        self.server = GameServer(max_games=2)
+
+    def test_new_game_and_reveal(self):
+        """Tests that a move responds with change events"""
+        response = self.server.handle_request({'command': 'new', 'id': 'a'})
+        self.assertTrue(response['ok'])
+        self.assertEqual(response['id'], 'a')
+        response = self.server.handle_request(
+            {'command': 'reveal', 'game': response['game'],
+             'column': COLUMN, 'row': ROW})
+        self.assertTrue(response['ok'])
+        self.assertEqual(response['events'][0]['type'], 'reveal')
+        self.assertIn('reveal', self.server.latency_percentiles())
+
+    def test_max_games(self):
+        """Tests that the server refuses games past its limit"""
+        for _ in range(2):
+            self.server.handle_request({'command': 'new'})
+        response = self.server.handle_request({'command': 'new'})
+        self.assertFalse(response['ok'])
+
+    def test_loopback_client(self):
+        """Tests the line-delimited JSON protocol over loopback"""
+        async def run_client():
+            server = await self.server.start(host='127.0.0.1', port=0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b'{"command": "new", "level": "hard"}\n'
+                         b'not json\n')
+            await writer.drain()
+            responses = [json.loads(await reader.readline())
+                         for _ in range(2)]
+            writer.close()
+            server.close()
+            await self.server.close()
+            await server.wait_closed()
+            return responses
+
+        responses = asyncio.run(run_client())
+        self.assertEqual(responses[0]['columns'], 30)
+        self.assertFalse(responses[1]['ok'])
+
+
+class FakeRoot():
+    """Stands in for a Tk root by queueing the after callbacks"""
+    def __init__(self):
+        """Initializes a FakeRoot object without any callbacks"""
+        self.callbacks = {}
+        self._next_id = 0
+
+    def after(self, _, callback):
+        """Queues a callback and returns its id"""
+        self._next_id += 1
+        self.callbacks[self._next_id] = callback
+        return self._next_id
+
+    def after_cancel(self, after_id):
+        """Removes a queued callback"""
+        self.callbacks.pop(after_id)
+
+    def run_next(self):
+        """Runs the oldest queued callback
+
+        Returns:
+            bool: If there was a callback to run
+        """
+        if not self.callbacks:
+            return False
+        self.callbacks.pop(min(self.callbacks))()
+        return True
+
+
+class SchedulerTests(TestCase):
+    """Basic tests for the scheduler class"""
+    def setUp(self):
+        """Creates a scheduler on a fake root"""
+        self.root = FakeRoot()
+        self.scheduler = Scheduler(self.root)
+
+    def test_tasks_run_in_order_in_slices(self):
+        """Tests that tasks run one after another and that a long task is
+        split into slices with progress reports"""
+        finished = []
+        progress = []
+
+        def slow_work(name):
+            for step in range(4):
+                time.sleep(SLICE_MS / 1000)
+                yield (step + 1) / 4
+            return name
+
+        self.scheduler.spawn(slow_work('first'), on_done=finished.append,
+                             on_progress=progress.append)
+        self.scheduler.spawn(slow_work('second'), on_done=finished.append)
+        num_slices = 0
+        while self.root.run_next():
+            num_slices += 1
+        self.assertEqual(finished, ['first', 'second'])
+        self.assertGreaterEqual(num_slices, 8)
+        self.assertEqual(progress, [0.25, 0.5, 0.75, 1.0])
+        self.assertTrue(self.scheduler.idle)
+
+    def test_cancel(self):
+        """Tests that a cancelled task stops without calling on_done"""
+        finished = []
+        task = self.scheduler.spawn((step for step in range(10)),
+                                    on_done=finished.append)
+        task.cancel()
+        while self.root.run_next():
+            pass
+        self.assertEqual(finished, [])
+        self.assertTrue(task.cancelled)
+
+    def test_worker_result_is_delivered_on_the_loop(self):
+        """Tests that a worker's result is passed on by the event loop"""
+        results = []
+        task = self.scheduler.run_in_thread(lambda: 6 * 7,
+                                            on_done=results.append)
+        deadline = time.time() + 5
+        while not results and time.time() < deadline:
+            self.root.run_next()
+            time.sleep(0.001)
+        self.assertEqual(results, [42])
+        self.assertTrue(task.done)
+
+
+class RaceTests(TestCase):
+    """Basic tests for the race hub and client"""
+    def setUp(self):
+        """Creates a seeded race hub for two players"""
+        self.hub = RaceHub(level='medium', seed=SEED, players=2)
+
+    def test_simulated_players(self):
+        """Tests that the race starts once both players joined and that
+        progress is only forwarded to the other player"""
+        async def run_players():
+            server = await self.hub.start()
+            port = server.sockets[0].getsockname()[1]
+            players = [await asyncio.open_connection('127.0.0.1', port)
+                       for _ in range(2)]
+            messages = []
+            for name, (reader, writer) in zip(['Alice', 'Bob'], players):
+                writer.write(encode_message({'type': 'join', 'name': name}))
+                messages.append(json.loads(await reader.readline()))
+            for reader, _ in players:
+                self.assertEqual(json.loads(await reader.readline()),
+                                 {'type': 'start'})
+            players[0][1].write(encode_message(
+                {'type': 'progress', 'cleared': 40, 'flags': 2, 'time': 9,
+                 'status': 'playing'}))
+            messages.append(json.loads(await players[1][0].readline()))
+            for _, writer in players:
+                writer.close()
+            server.close()
+            await self.hub.close()
+            await server.wait_closed()
+            return messages
+
+        welcome, _, progress = asyncio.run(run_players())
+        self.assertEqual(parse_seed(welcome['seed']), SEED)
+        self.assertEqual(progress['name'], 'Alice')
+        self.assertEqual(progress['cleared'], 40)
+
+    def test_infinite_progress(self):
+        """Tests that a progress message with an infinite count is ignored
+        and the player's later progress is still forwarded"""
+        async def run_players():
+            server = await self.hub.start()
+            port = server.sockets[0].getsockname()[1]
+            players = [await asyncio.open_connection('127.0.0.1', port)
+                       for _ in range(2)]
+            for name, (reader, writer) in zip(['Alice', 'Bob'], players):
+                writer.write(encode_message({'type': 'join', 'name': name}))
+                await reader.readline()
+            for reader, _ in players:
+                await reader.readline()
+            players[0][1].write(b'{"type": "progress", "cleared": Infinity}\n')
+            players[0][1].write(encode_message(
+                {'type': 'progress', 'cleared': 40, 'flags': 2, 'time': 9,
+                 'status': 'playing'}))
+            progress = json.loads(await players[1][0].readline())
+            for _, writer in players:
+                writer.close()
+            server.close()
+            await self.hub.close()
+            await server.wait_closed()
+            return progress
+
+        with self.assertLogs(level='WARNING'):
+            progress = asyncio.run(run_players())
+        self.assertEqual(progress['cleared'], 40)
+
+    def test_client(self):
+        """Tests that a race client gets the board and sees the progress of
+        a simulated opponent"""
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        server = asyncio.run_coroutine_threadsafe(self.hub.start(),
+                                                  loop).result(5)
+        port = server.sockets[0].getsockname()[1]
+
+        async def opponent():
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(encode_message({'type': 'join', 'name': 'Bob'}))
+            writer.write(encode_message({'type': 'progress', 'cleared': 12,
+                                         'flags': 0, 'time': 3,
+                                         'status': 'playing'}))
+            await writer.drain()
+            return reader, writer
+
+        _, writer = asyncio.run_coroutine_threadsafe(opponent(),
+                                                     loop).result(5)
+        client = RaceClient(host='127.0.0.1', port=port, name='Alice')
+        try:
+            client.connect(timeout=5)
+            for _ in range(500):
+                client.poll()
+                if client.opponents:
+                    break
+                time.sleep(0.01)
+            self.assertEqual(client.seed, SEED)
+            self.assertTrue(client.started)
+            self.assertIn('Bob: 12%', client.summary())
+        finally:
+            client.close()
+
+            async def shut_down():
+                writer.close()
+                server.close()
+                await self.hub.close()
+                await server.wait_closed()
+
+            asyncio.run_coroutine_threadsafe(shut_down(), loop).result(5)
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(5)
+            loop.close()
+
+
+    def test_client_malformed_message(self):
+        """Tests that a line from the hub that isn't a message object ends
+        the connection instead of the reading task failing"""
+        async def handle(_, writer):
+            writer.write(encode_message({'type': 'welcome', 'player': 1,
+                                         'level': 'medium',
+                                         'seed': format_seed(SEED),
+                                         'start': [8, 8], 'players': 1}))
+            writer.write(b'[]\n')
+            await writer.drain()
+            writer.close()
+
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        server = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(handle, '127.0.0.1', 0), loop).result(5)
+        client = RaceClient(host='127.0.0.1',
+                            port=server.sockets[0].getsockname()[1],
+                            name='Alice')
+        try:
+            with self.assertLogs(level='WARNING'):
+                client.connect(timeout=5)
+                # The reading task ends normally instead of dying with the
+                # error
+                self.assertIsNone(client._task.result(5))
+        finally:
+            client.close()
+            server.close()
+            asyncio.run_coroutine_threadsafe(server.wait_closed(),
+                                             loop).result(5)
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(5)
+            loop.close()
+
+
+class BenchmarkTests(TestCase):
+    """Basic tests for the benchmark suite"""
+    def test_run_suite(self):
+        """Tests that every hot path is timed for each size and density"""
+        results = run_suite(sizes=[9], densities=[0.05, 0.3], repeat=1)
+        self.assertEqual(len(results), 22)
+        self.assertIn('chord/9x9/0.30', results)
+
+    def test_find_regressions(self):
+        """Tests that only slowdowns past the threshold are flagged"""
+        baseline = {'a': {'min': 0.010}, 'b': {'min': 0.010},
+                    'c': {'min': 0.00001}}
+        current = {'a': {'min': 0.012}, 'b': {'min': 0.0105},
+                   'c': {'min': 0.00005}}
+        regressions = find_regressions(baseline, current, threshold=10)
+        self.assertEqual([regression[0] for regression in regressions], ['a'])
+
+    def test_tile_memory(self):
+        """Tests that a tile takes less than a fifth of the 397 bytes it
+        used to"""
+        self.assertLess(measure_tile_memory(50)['tile_bytes'], 397 / 5)
+
+
+class TracerTests(TestCase):
+    """Basic tests for the tracer class"""
+    def setUp(self):
+        """Creates a new enabled Tracer object before each test"""
+        self.tracer = Tracer(capacity=3)
+        self.tracer.enabled = True
+
+    def test_move_breakdown(self):
+        """Tests that nested spans are summed by exclusive time"""
+        self.tracer.begin('click', MOVE)
+        self.tracer.begin('select', LOGIC)
+        self.tracer.begin('button', RENDER)
+        self.tracer.end()
+        self.tracer.end()
+        self.tracer.end()
+        move = self.tracer.moves[0]
+        self.assertAlmostEqual(move['logic'] + move['render'] +
+                               move['storage'] + move['input'],
+                               move['total'])
+        self.assertEqual(len(self.tracer.spans), 3)
+
+    def test_sampled_instants(self):
+        """Tests that only every nth instant event is recorded"""
+        self.tracer.sample_interval = 10
+        for count in range(25):
+            self.tracer.instant('mine placed', LOGIC, count=count)
+        self.assertEqual([event[4]['count'] for event in self.tracer.instants],
+                         [0, 10, 20])
+
+    def test_ring_buffer(self):
+        """Tests that only the most recent spans are kept"""
+        for _ in range(5):
+            self.tracer.begin('button', RENDER)
+            self.tracer.end()
+        self.assertEqual(len(self.tracer.spans), 3)
+
+    def test_export_chrome_trace(self):
+        """Tests that the spans are exported as trace events"""
+        self.tracer.begin('click', MOVE)
+        self.tracer.end()
+        temp_dir = tempfile.mkdtemp()
+        path = os.path.join(temp_dir, 'trace.json')
+        self.tracer.export_chrome_trace(path)
+        with open(path, encoding='utf-8') as trace_file:
+            events = json.load(trace_file)['traceEvents']
+        shutil.rmtree(temp_dir)
+        self.assertEqual([event['ph'] for event in events], ['X', 'C'])
+
 
 if __name__ == '__main__':
     main()
@@ -1,13 +1,24 @@
 """
 Module with the Tile class
+
+Tiles only hold the game state. Boards can have millions of them, so they
+use __slots__ and a single integer state code instead of separate flags and
+button type strings, and their screen position is computed on demand. The
+tkinter widgets of the tiles are kept by the BoardDisplay.
 """
 
-from tkinter import Button, Label
 from minesweeper_details import DISPLAY_OFFSET, TILE_SIZE
 
+# Tile state codes
+BLANK = 0
+FLAG = 1
+UNCOVERED = 2
+
 
 class Tile():
     """Class that represents a tile on the minesweeper board"""
+    __slots__ = ('column', 'row', 'is_mine', 'num_adjacent_mines', 'state')
+
     def __init__(self, *, column, row):
         """Initializes a Tile object
 
@@ -15,63 +26,38 @@ class Tile():
             column (int): Column number where the tile is located
             row (int): Row number where the tile is located
         """
-        self.is_mine = False  # Instantiate the tile without a mine
-        self.is_hidden = True
-        self.num_adjacent_mines = None
-        self.is_flag_set = False
         self.column = column
         self.row = row
-        self.position = {'x': None, 'y': None}
-        self.button = None
-        self.button_type = None
-        self.position['x'] = self.column * TILE_SIZE
-        self.position['y'] = self.row * TILE_SIZE + DISPLAY_OFFSET
-
-    def create_button(self, display):
-        """Creates the button
-
-        Args:
-            display: Root of the tkinter display
-        """
-        self.button = Button(display, relief='raised')
-        self.button.place(x=self.position['x'],
-                          y=self.position['y'],
-                          height=TILE_SIZE,
-                          width=TILE_SIZE)
-
-    def create_label(self, display):
-        """Creates the label. Label was chosen here instead of creating a
-        button and setting the state to 'disabled' because that causes
-        all button images to look weird and there is apparently no work
-        around for that problem
-
-        Args:
-            display: Root of the tkinter display
-        """
-        self.button = Label(display, relief='raised')
-        self.button.place(x=self.position['x'],
-                          y=self.position['y'],
-                          height=TILE_SIZE,
-                          width=TILE_SIZE)
-
-    def set_button_color(self, *, bg_color, fg_color=None):
-        """Sets the button color
-
-        Args:
-            bg_color (str): Button background color
-            fg_color (str): Button foreground color. Defaults to None
-        """
-        self.button.configure(background=bg_color,
-                              activebackground=bg_color)
-        if fg_color is not None:
-            self.button.configure(foreground=fg_color,
-                                  activeforeground=fg_color)
-
-    def disable_button(self, display):
-        """Disables the button by creating a label
-
-        Args:
-            display: Root of the tkinter display
-        """
-        self.button.destroy()
-        self.create_label(display)
+        self.is_mine = False  # Instantiate the tile without a mine
+        self.num_adjacent_mines = None
+        self.state = BLANK
+
+    @property
+    def is_hidden(self):
+        """bool: If the tile hasn't been uncovered"""
+        return self.state != UNCOVERED
+
+    @is_hidden.setter
+    def is_hidden(self, is_hidden):
+        if not is_hidden:
+            self.state = UNCOVERED
+        elif self.state == UNCOVERED:
+            self.state = BLANK
+
+    @property
+    def is_flag_set(self):
+        """bool: If the tile has a flag"""
+        return self.state == FLAG
+
+    @is_flag_set.setter
+    def is_flag_set(self, is_flag_set):
+        if is_flag_set:
+            self.state = FLAG
+        elif self.state == FLAG:
+            self.state = BLANK
+
+    @property
+    def position(self):
+        """tuple: The x and y pixel position of the tile on the display"""
+        return (self.column * TILE_SIZE,
+                self.row * TILE_SIZE + DISPLAY_OFFSET)
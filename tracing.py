@@ -0,0 +1,195 @@
+"""
+Module with the Tracer class used for optional per-move latency tracing.
+
+Functions on the click path are wrapped with the traced decorator. While
+tracing is disabled the wrapper only checks a flag before calling the
+function. While it is enabled every call is recorded as a span in a ring
+buffer, and the exclusive time of the spans inside each move is summed per
+category (logic, render, storage, and input for modal windows). The spans
+can be exported as Chrome trace-event JSON and opened in chrome://tracing or
+Perfetto.
+
+Per-tile events on the hot paths are recorded as sampled instant events
+instead of debug log messages. Call sites check TRACER.enabled first so
+that nothing is formatted while tracing is disabled.
+
+Tracing can be enabled at startup by setting the MINESWEEPER_TRACE
+environment variable, or toggled at runtime from the board display.
+"""
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+# Span categories. A move span is the outermost span of a user action
+MOVE = 'move'
+LOGIC = 'logic'
+RENDER = 'render'
+STORAGE = 'storage'
+# Time spent waiting for the user in a modal window, kept out of the others
+INPUT = 'input'
+BREAKDOWN_CATEGORIES = (LOGIC, RENDER, STORAGE, INPUT)
+
+
+class Tracer():
+    """Class that records spans and per-move time breakdowns"""
+    def __init__(self, *, capacity=100000, move_capacity=1000,
+                 sample_interval=100):
+        """Initializes a Tracer object
+
+        Args:
+            capacity (int): Number of spans and instant events kept in the
+                ring buffers. Defaults to 100000
+            move_capacity (int): Number of move breakdowns kept in the ring
+                buffer. Defaults to 1000
+            sample_interval (int): Only every nth instant event with the
+                same name is recorded. Defaults to 100
+        """
+        self.enabled = False
+        self.sample_interval = sample_interval
+        self.spans = deque(maxlen=capacity)
+        self.instants = deque(maxlen=capacity)
+        self.moves = deque(maxlen=move_capacity)
+        self._local = threading.local()
+        self._instant_counts = {}
+
+    def toggle(self):
+        """Enables tracing if it's disabled, or disables it if it's enabled
+
+        Returns:
+            bool: If tracing is enabled after the toggle
+        """
+        self.enabled = not self.enabled
+        logging.info(f'Tracing is now '
+                     f'{"enabled" if self.enabled else "disabled"}')
+        return self.enabled
+
+    def clear(self):
+        """Removes all the recorded spans and moves"""
+        self.spans.clear()
+        self.instants.clear()
+        self.moves.clear()
+        self._instant_counts.clear()
+
+    def instant(self, name, category, **args):
+        """Records a sampled instant event, for example a per-tile event
+        that would be too expensive to log
+
+        Args:
+            name (str): Name of the event
+            category (str): Category of the event
+            **args: Structured event details
+        """
+        count = self._instant_counts.get(name, 0)
+        self._instant_counts[name] = count + 1
+        if count % self.sample_interval == 0:
+            self.instants.append((name, category, time.perf_counter(),
+                                  threading.get_ident(),
+                                  dict(args, sample=count)))
+
+    def _stack(self):
+        """Returns the open spans of the current thread
+
+        Returns:
+            list: [name, category, start time, child time, breakdown] lists
+        """
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def begin(self, name, category):
+        """Opens a span
+
+        Args:
+            name (str): Name of the span
+            category (str): Category of the span
+        """
+        stack = self._stack()
+        breakdown = None
+        if category == MOVE and not stack:
+            breakdown = dict.fromkeys(BREAKDOWN_CATEGORIES, 0.0)
+        elif stack:
+            breakdown = stack[-1][4]
+        stack.append([name, category, time.perf_counter(), 0.0, breakdown])
+
+    def end(self):
+        """Closes the most recently opened span of the current thread"""
+        end_time = time.perf_counter()
+        stack = self._stack()
+        name, category, start_time, child_time, breakdown = stack.pop()
+        duration = end_time - start_time
+        self.spans.append((name, category, start_time, duration,
+                           threading.get_ident()))
+        if stack:
+            stack[-1][3] += duration
+        if breakdown is None:
+            return
+        # The move span's own time is spent in the click handling logic
+        breakdown_category = LOGIC if category == MOVE else category
+        breakdown[breakdown_category] += duration - child_time
+        if category == MOVE and not stack:
+            self.moves.append(dict(breakdown, name=name, start=start_time,
+                                   total=duration))
+
+    def export_chrome_trace(self, path):
+        """Writes the recorded spans and move breakdowns as Chrome trace-event
+        JSON
+
+        Args:
+            path (str): Path of the trace file
+        """
+        pid = os.getpid()
+        events = [{'name': name, 'cat': category, 'ph': 'X',
+                   'ts': start_time * 1e6, 'dur': duration * 1e6,
+                   'pid': pid, 'tid': tid}
+                  for name, category, start_time, duration, tid in self.spans]
+        events.extend({'name': name, 'cat': category, 'ph': 'i', 's': 't',
+                       'ts': event_time * 1e6, 'pid': pid, 'tid': tid,
+                       'args': args}
+                      for name, category, event_time, tid, args
+                      in self.instants)
+        for move in self.moves:
+            events.append({'name': 'move breakdown (ms)', 'ph': 'C',
+                           'ts': move['start'] * 1e6, 'pid': pid,
+                           'args': {category: move[category] * 1000
+                                    for category in BREAKDOWN_CATEGORIES}})
+        with open(path, 'w', encoding='utf-8') as trace_file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'},
+                      trace_file)
+        logging.info(f'Exported {len(events)} trace events to {path}')
+
+
+TRACER = Tracer()
+TRACER.enabled = bool(os.environ.get('MINESWEEPER_TRACE'))
+
+
+def traced(category, name=None):
+    """Decorator that records each call of the decorated function as a span
+    while tracing is enabled
+
+    Args:
+        category (str): Category of the span
+        name (str): Name of the span. Defaults to None in which case the
+            function name is used
+    Returns:
+        The decorator
+    """
+    def decorator(function):
+        span_name = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return function(*args, **kwargs)
+            TRACER.begin(span_name, category)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                TRACER.end()
+        return wrapper
+    return decorator